@@ -1,25 +1,39 @@
 import click
-import json
+import csv
 import logging
 import os
 import shlex
 import subprocess
-import time
+import sys
 import traceback
 
 from datetime import datetime
 from sgfmill import sgf
-from threading import Thread
 from tqdm import tqdm
 from typing import Tuple, List, Union, Literal
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.board import GoBoard, IllegalMove  # noqa: E402
+from app.engine import EngineClient  # noqa: E402
+from app.engine_monitor import ThroughputMonitor  # noqa: E402
+from app.engine_trace import Tracer  # noqa: E402
+
 Color = Union[Literal["B"], Literal["W"]]
 Move = Union[None, Literal["pass"], Tuple[int, int]]
 
-KATAGO_DIR = r'C:\Users\User\.katrain'
-KATAGO_EXECUTABLE = 'katago-v1.13.0-opencl-windows-x64.exe'
-KATAGO_MODEL = r'kata1-b18c384nbt-s9131461376-d4087399203.bin.gz'
-KATAGO_CONFIG = 'analysis_config.cfg'
+# Override with environment variables, e.g. to run against adhoc/katago_simulator.py on a machine without KataGo
+KATAGO_DIR = os.environ.get('KATAGO_DIR', r'C:\Users\User\.katrain')
+KATAGO_EXECUTABLE = os.environ.get('KATAGO_EXECUTABLE', 'katago-v1.13.0-opencl-windows-x64.exe')
+KATAGO_MODEL = os.environ.get('KATAGO_MODEL', r'kata1-b18c384nbt-s9131461376-d4087399203.bin.gz')
+KATAGO_CONFIG = os.environ.get('KATAGO_CONFIG', 'analysis_config.cfg')
+
+# Analysis is stored on each move node as private SGF properties, one value per field in this order,
+# e.g. KP[-3.2500][12.0000][0.4100][-0.1800][-0.2200][500][0.4300]
+ANALYSIS_FIELDS = ('scoreLead', 'scoreStdev', 'lcb', 'utility', 'utilityLcb', 'visits', 'winrate')
+ANALYSIS_PROPERTIES = {'play': 'KP', 'pass': 'KQ'}
+SIDECAR_COLUMNS = ['game', 'move_number', 'color', 'move'] + [
+    f"{perspective}_{field}" for perspective in ANALYSIS_PROPERTIES for field in ANALYSIS_FIELDS]
 
 
 def setup_logger():
@@ -48,10 +62,14 @@ def sgfmill_to_gtp(move: Move, board_size: int) -> str:
 
 
 class KataGo:
-    def __init__(self, katago_path: str, config_path: str, model_path: str):
+    def __init__(self, katago_path: str, config_path: str, model_path: str, query_log: str = None,
+                 cache_size: int = 0, tracer: Tracer = None):
         self.katago_path = katago_path
         self.config_path = config_path
         self.model_path = model_path
+        self.query_log = query_log
+        self.cache_size = cache_size
+        self.tracer = tracer
         self.query_counter = 0
         self.katago = None
         self.stderrthread = None
@@ -110,40 +128,15 @@ class KataGo:
             "-config", self.config_path
         ]
 
-        self.katago = subprocess.Popen(
-            katago_command,
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-
+        # Queries from this script go in the 'batch' lane, so a shared engine keeps headroom for web queries
+        self.client = EngineClient(katago_command, cache_size=self.cache_size, query_log=self.query_log,
+                                   tracer=self.tracer)
+        self.katago = self.client.process
         logging.info("KataGo process initialized")
-        self.stderrthread = Thread(target=self.printforever)
-        self.stderrthread.start()
-
-    def printforever(self):
-        while self.katago and self.katago.poll() is None:
-            data = self.katago.stderr.readline()
-            if data:
-                print("KataGo: ", data.strip())
-            time.sleep(0.1)  # Small sleep to prevent busy-waiting
-        if self.katago:
-            data = self.katago.stderr.read()
-            if data:
-                print("KataGo: ", data.strip())
 
     def close(self):
         if self.katago:
-            self.katago.terminate()
-            try:
-                self.katago.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self.katago.kill()
-                self.katago.wait()
-            self.katago.stdin.close()
-            self.katago.stdout.close()
-            self.katago.stderr.close()
+            self.client.close()
             self.katago = None
         logging.info("Closed KataGo instance")
 
@@ -151,8 +144,10 @@ class KataGo:
 def parse_sgf_file(file_path: str) -> Tuple[List[Tuple[Color, Move]], int, float, str]:
     with open(file_path, 'rb') as f:
         sgf_content = f.read()
-    game = sgf.Sgf_game.from_bytes(sgf_content)
+    return parse_sgf_game(sgf.Sgf_game.from_bytes(sgf_content))
+
 
+def parse_sgf_game(game: sgf.Sgf_game) -> Tuple[List[Tuple[Color, Move]], int, float, str]:
     root = game.get_root()
     board_size = game.get_size()
     komi = float(game.get_komi())
@@ -190,66 +185,170 @@ def process_single_move_response(katago_result):
     }
 
 
-def analyze_moves(katago, moves, rules, komi, board_size, move_limit=None):
+def stored_position_id(board, to_move):
+    # analysis_store needs NumPy, so it is only imported once maps are being stored
+    from analysis_store import position_id
+    return position_id(board, to_move)
+
+
+def analyze_moves(katago, moves, rules, komi, board_size, move_limit=None, store=None, monitor=None):
+    """Analyse every position of the game, with and without a pass.
+
+    All positions are queued at once and the engine client keeps a bounded
+    number in flight.  With ``store`` (an analysis_store.AnalysisStore),
+    ownership and policy are also requested and kept for each analysed position.
+    With ``monitor`` (an engine_monitor.ThroughputMonitor), its status line
+    replaces the progress bar.
+    """
     results = []
 
     # Convert moves to GTP format
     move_list = [[color, sgfmill_to_gtp(move, board_size)] for color, move in moves]
     total_moves = len(move_list) if move_limit is None else min(len(move_list), move_limit)
+    # Replayed alongside the queries to key the stored maps
+    board = GoBoard(board_size) if store else None
+
+    if monitor:
+        # Started before queueing, so cache lookups and the client's own queueing time are counted
+        monitor.total = 2 * total_moves
+        monitor.start()
 
     # Analyze each move, including the initial empty board state
+    queued = []
+    for move_number, move in enumerate(move_list[:total_moves]):
+        current_moves = move_list[:move_number]
+        submitted = submit_board_state(katago, current_moves, rules, komi, board_size, move_number, board is not None)
+        queued.append([(entry, stored_position_id(board, entry[3]) if board else None) for entry in submitted])
+        if board:
+            color, point = moves[move_number]
+            try:
+                if point is None or point == 'pass':
+                    board.pass_move()
+                else:
+                    board.play(point[0], point[1], color)
+            except IllegalMove as e:
+                logging.warning(f"Not storing ownership/policy after move {move_number + 1}: {e}")
+                board = None
+
+    if monitor:
+        try:
+            for position in queued:
+                for entry, key in position:
+                    results.append(collect_result(entry, key, store, katago.tracer))
+        finally:
+            monitor.stop()
+        return results
+
     with tqdm(total=total_moves, desc="Analyzing moves") as pbar:
-        for move_number, move in enumerate(move_list[:total_moves]):
-            current_moves = move_list[:move_number]
-            result = analyze_board_state(katago, current_moves, rules, komi, board_size, move_number)
-            results.extend(result)
+        for position in queued:
+            for entry, key in position:
+                results.append(collect_result(entry, key, store, katago.tracer))
             pbar.update(1)
 
     return results
 
 
-def analyze_board_state(katago, move_list, rules, komi, board_size, move_number):
-    results = []
+def submit_board_state(katago, move_list, rules, komi, board_size, move_number, include_maps=False):
+    """Queue the play and pass queries for one position.
+
+    Returns [(move_number, perspective, query_moves, player to move, future)].
+    """
+    submitted = []
+    next_player = 'W' if len(move_list) % 2 == 1 else 'B'
     for perspective in ['play', 'pass']:
         query_moves = move_list.copy()
+        to_move = next_player
         if perspective == 'pass':
             current_player = 'W' if len(move_list) % 2 == 1 else 'B'
             query_moves.append([current_player, 'pass'])
+            to_move = 'B' if current_player == 'W' else 'W'
 
         query = {
-            "id": str(katago.query_counter),
             "initialStones": [],
             "moves": query_moves,
             "rules": rules,
             "komi": komi,
             "boardXSize": board_size,
             "boardYSize": board_size,
-            "includePolicy": False,
+            "includePolicy": include_maps,
+            "includeOwnership": include_maps,
             "analyzeTurns": [len(query_moves)]
         }
-
-        query_json = json.dumps(query)
-        logging.debug(f"Sending query to KataGo: {query_json}")
-        katago.katago.stdin.write(query_json + "\n")
-        katago.katago.stdin.flush()
-
-        line = katago.katago.stdout.readline().strip()
-        logging.debug(f"Raw response from KataGo: {line}")
-
-        try:
-            katago_result = json.loads(line)
-            results.append((move_number, perspective, query_moves, katago_result))
-        except json.JSONDecodeError as e:
-            logging.error(f"Failed to parse KataGo response: {e}")
-            logging.error(f"Raw response: {line}")
-            raise Exception(f"KataGo returned invalid JSON: {line}")
-
+        submitted.append((move_number, perspective, query_moves, to_move, katago.client.analyse(query, lane='batch')))
         katago.query_counter += 1
-
-    return results
-
-
-def generate_sgf_output(output_file, moves, board_size, komi, rules, results):
+    return submitted
+
+
+def collect_result(entry, key=None, store=None, tracer=None):
+    """Wait for one submitted query; returns (move_number, perspective, query_moves, result)."""
+    move_number, perspective, query_moves, _, future = entry
+    started = tracer.now() if tracer else None
+    katago_result = future.result()[0]
+    if tracer:
+        span = {'id': katago_result.get('id'), 'turn': katago_result.get('turnNumber'), 'perspective': perspective}
+        processing = tracer.now()
+        tracer.complete('wait', started, processing, cat='client', **span)
+    if key is not None:
+        store.add_result(key, katago_result)
+        # The maps are stored; keep the in-memory results as small as before
+        katago_result.pop('ownership', None)
+        katago_result.pop('policy', None)
+    if tracer:
+        tracer.complete('process', processing, cat='client', **span)
+    return move_number, perspective, query_moves, katago_result
+
+
+def analyze_board_state(katago, move_list, rules, komi, board_size, move_number, board=None, store=None):
+    submitted = submit_board_state(katago, move_list, rules, komi, board_size, move_number, board is not None)
+    return [collect_result(entry, stored_position_id(board, entry[3]) if board is not None else None, store, katago.tracer)
+            for entry in submitted]
+
+
+def format_analysis_value(field, value):
+    """Fixed formatting, so identical analysis always serialises identically."""
+    if field == 'visits':
+        return str(int(value))
+    return f"{float(value):.4f}"
+
+
+def parse_analysis_property(values):
+    """Turn the raw values of a KP/KQ property back into a dict keyed by ANALYSIS_FIELDS."""
+    return {field: int(value) if field == 'visits' else float(value)
+            for field, value in zip(ANALYSIS_FIELDS, values)}
+
+
+def read_analysis(node):
+    """{'play': {...}, 'pass': {...}} for one analysed node, with missing perspectives left out."""
+    analysis = {}
+    for perspective, identifier in ANALYSIS_PROPERTIES.items():
+        if node.has_property(identifier):
+            analysis[perspective] = parse_analysis_property(
+                [value.decode('ascii') for value in node.get_raw_list(identifier)])
+    return analysis
+
+
+def append_sidecar(sidecar_file, game_name, rows):
+    """Append one row per analysed position to a corpus-wide CSV, writing the header for a new file."""
+    game_name = game_name.replace(',', '_')  # load_sidecar reads plain, unquoted CSV
+    new_file = not os.path.exists(sidecar_file) or os.path.getsize(sidecar_file) == 0
+    with open(sidecar_file, 'a', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(SIDECAR_COLUMNS)
+        for move_number, color, move_str, values in rows:
+            writer.writerow([game_name, move_number, color, move_str, *values])
+
+
+def load_sidecar(sidecar_file):
+    """Load a sidecar CSV in one read as a NumPy structured array, one record per position."""
+    import numpy as np
+
+    dtype = [('game', 'U256'), ('move_number', 'i4'), ('color', 'U1'), ('move', 'U4')]
+    dtype += [(column, 'i4' if column.endswith('_visits') else 'f8') for column in SIDECAR_COLUMNS[4:]]
+    return np.atleast_1d(np.loadtxt(sidecar_file, dtype=dtype, delimiter=',', skiprows=1, encoding='utf-8'))
+
+
+def generate_sgf_output(output_file, moves, board_size, komi, rules, results, comments=True, sidecar_file=None):
     game = sgf.Sgf_game(size=board_size)
     root = game.get_root()
 
@@ -262,6 +361,9 @@ def generate_sgf_output(output_file, moves, board_size, komi, rules, results):
 
     # We silently discard the first position.  No point analyzing an empty board
 
+    by_position = {(r[0], r[1]): r for r in results}
+    sidecar_rows = []
+
     # Create the main line with moves and analysis
     for move_number, (color, move) in enumerate(moves):
         color = color.lower()
@@ -270,8 +372,8 @@ def generate_sgf_output(output_file, moves, board_size, komi, rules, results):
         node.set_move(color, move)
 
         # Find analysis results for this move
-        play_result = next((r for r in results if r[0] == move_number and r[1] == 'play'), None)
-        pass_result = next((r for r in results if r[0] == move_number and r[1] == 'pass'), None)
+        play_result = by_position.get((move_number, 'play'))
+        pass_result = by_position.get((move_number, 'pass'))
 
         if play_result and pass_result:
             play_data = process_single_move_response(play_result[3])
@@ -279,14 +381,22 @@ def generate_sgf_output(output_file, moves, board_size, komi, rules, results):
 
             if play_data and pass_data:
                 move_str = sgfmill_to_gtp(move, board_size) if move else "pass"
-                comment = f"Move {move_number + 1} ({move_str}) analysis:\n"
-                comment += f"Play: Score: {play_data['scoreLead']:.4f} ±{play_data['scoreStdev']:.4f}\n"
-                comment += f"      LCB: {play_data['lcb']:.4f}, Utility: {play_data['utility']:.4f}, UtilityLCB: {play_data['utilityLcb']:.4f}\n"
-                comment += f"      Visits: {play_data['visits']}, Winrate: {play_data['winrate']:.4f}\n"
-                comment += f"Pass: Score: {pass_data['scoreLead']:.4f} ±{pass_data['scoreStdev']:.4f}\n"
-                comment += f"      LCB: {pass_data['lcb']:.4f}, Utility: {pass_data['utility']:.4f}, UtilityLCB: {pass_data['utilityLcb']:.4f}\n"
-                comment += f"      Visits: {pass_data['visits']}, Winrate: {pass_data['winrate']:.4f}\n"
-                node.set("C", comment)
+                values = []
+                for perspective, data in (('play', play_data), ('pass', pass_data)):
+                    formatted = [format_analysis_value(field, data[field]) for field in ANALYSIS_FIELDS]
+                    node.set_raw_list(ANALYSIS_PROPERTIES[perspective], [value.encode('ascii') for value in formatted])
+                    values.extend(formatted)
+                sidecar_rows.append((move_number + 1, color.upper(), move_str, values))
+
+                if comments:
+                    comment = f"Move {move_number + 1} ({move_str}) analysis:\n"
+                    comment += f"Play: Score: {play_data['scoreLead']:.4f} ±{play_data['scoreStdev']:.4f}\n"
+                    comment += f"      LCB: {play_data['lcb']:.4f}, Utility: {play_data['utility']:.4f}, UtilityLCB: {play_data['utilityLcb']:.4f}\n"
+                    comment += f"      Visits: {play_data['visits']}, Winrate: {play_data['winrate']:.4f}\n"
+                    comment += f"Pass: Score: {pass_data['scoreLead']:.4f} ±{pass_data['scoreStdev']:.4f}\n"
+                    comment += f"      LCB: {pass_data['lcb']:.4f}, Utility: {pass_data['utility']:.4f}, UtilityLCB: {pass_data['utilityLcb']:.4f}\n"
+                    comment += f"      Visits: {pass_data['visits']}, Winrate: {pass_data['winrate']:.4f}\n"
+                    node.set("C", comment)
 
     # Write the SGF to the output file
     with open(output_file, "wb") as f:
@@ -294,11 +404,31 @@ def generate_sgf_output(output_file, moves, board_size, komi, rules, results):
 
     logging.info(f"Analysis results written to SGF file: {output_file}")
 
+    if sidecar_file:
+        append_sidecar(sidecar_file, os.path.basename(output_file), sidecar_rows)
+        logging.info(f"Appended {len(sidecar_rows)} position(s) to sidecar: {sidecar_file}")
+
 @click.command()
 @click.argument('input_file', type=click.Path(exists=True))
 @click.argument('output_file', type=click.Path())
 @click.option('--verbose/--no-verbose', default=True, show_default=True, help="Increase output verbosity")
-def add_passes_to_kifu(input_file, output_file, verbose):
+@click.option('--comments/--no-comments', default=True, show_default=True,
+              help="Also describe the analysis in a human-readable C[] comment on each move")
+@click.option('--sidecar', type=click.Path(dir_okay=False),
+              help="Append one row per position to this corpus-wide CSV (see load_sidecar)")
+@click.option('--store', type=click.Path(dir_okay=False),
+              help="Also request ownership and policy and append them, quantised, to this analysis store")
+@click.option('--metrics-file', type=click.Path(dir_okay=False),
+              help="Append throughput metrics as JSON lines and show a status line instead of the progress bar")
+@click.option('--metrics-interval', type=float, default=5.0, show_default=True, help="Seconds between metrics samples")
+@click.option('--log-queries', type=click.Path(dir_okay=False),
+              help="Append every raw query and reply to this file")
+@click.option('--cache-size', type=int, default=0, show_default=True,
+              help="Answer repeated identical queries from this many cached results")
+@click.option('--trace', 'trace_file', type=click.Path(dir_okay=False),
+              help="Write a Chrome/Perfetto trace of every query's phases to this JSON file")
+def add_passes_to_kifu(input_file, output_file, verbose, comments, sidecar, store, metrics_file, metrics_interval,
+                       log_queries, cache_size, trace_file):
     """Add KataGo analysis to a kifu file."""
     setup_logger()
 
@@ -311,12 +441,21 @@ def add_passes_to_kifu(input_file, output_file, verbose):
         katago_path = os.path.join(KATAGO_DIR, KATAGO_EXECUTABLE)
         katago_model = os.path.join(KATAGO_DIR, KATAGO_MODEL)
         katago_config = os.path.join(KATAGO_DIR, KATAGO_CONFIG)
-        katago = KataGo(katago_path, katago_config, katago_model)
-
-        results = analyze_moves(katago, moves, rules, komi, board_size)
+        tracer = Tracer(trace_file) if trace_file else None
+        katago = KataGo(katago_path, katago_config, katago_model, query_log=log_queries, cache_size=cache_size,
+                        tracer=tracer)
+        monitor = ThroughputMonitor(katago.client, interval=metrics_interval, metrics_file=metrics_file) \
+            if metrics_file else None
+
+        if store:
+            from analysis_store import AnalysisStore
+            with AnalysisStore(store, board_size) as analysis_store:
+                results = analyze_moves(katago, moves, rules, komi, board_size, store=analysis_store, monitor=monitor)
+        else:
+            results = analyze_moves(katago, moves, rules, komi, board_size, monitor=monitor)
 
         # Write results directly to the output file (SGF)
-        generate_sgf_output(output_file, moves, board_size, komi, rules, results)
+        generate_sgf_output(output_file, moves, board_size, komi, rules, results, comments, sidecar)
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
@@ -325,6 +464,9 @@ def add_passes_to_kifu(input_file, output_file, verbose):
         if 'katago' in locals():
             katago.close()
             logging.info("Closed KataGo instance")
+            if katago.tracer:
+                events = katago.tracer.save()
+                logging.info(f"Wrote {events} trace events to {katago.tracer.path}")
 
 if __name__ == "__main__":
     add_passes_to_kifu()
\ No newline at end of file
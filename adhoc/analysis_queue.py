@@ -0,0 +1,548 @@
+"""Job queue for running add_passes_to_kifu analysis on many workers and hosts.
+
+A corpus is split into jobs of consecutive positions from one game (a whole
+game per job by default).  Workers lease one job at a time, send all of its
+positions to their local engine at once, as add_passes_to_kifu does for a
+whole game, and report the results back.  Leases are renewed while the
+results come in; a job whose lease runs out (the worker died or lost its
+engine) goes back to the queue until it has used up its attempts.
+``collect`` turns finished games into analysed SGF files.
+
+The queue is a single SQLite file in rollback-journal mode, owned by one
+coordinator host.  Keep it on that host's local disk: SQLite's locking is
+only as good as the filesystem's, and NFS and SMB mounts are known to lose or
+fake the locks, which can corrupt the queue.  ``serve`` exposes leasing over
+HTTP, so workers on other hosts never touch the file; adding a host is just
+starting workers on it that point at the coordinator.  Workers on the
+coordinator itself may open the file directly with ``--db`` instead.
+
+    python adhoc/analysis_queue.py enqueue --db queue.db games.zip more_games/
+    python adhoc/analysis_queue.py serve --db queue.db --port 8765        (on the coordinator)
+    python adhoc/analysis_queue.py worker --server http://coordinator:8765 --processes 4   (on every host)
+    python adhoc/analysis_queue.py status --db queue.db
+    python adhoc/analysis_queue.py collect --db queue.db --output-dir analysed --sidecar corpus.csv
+    python adhoc/analysis_queue.py requeue --db queue.db     (after fixing whatever made jobs fail)
+
+The HTTP endpoint has no authentication beyond an optional shared token
+(--token or ANALYSIS_QUEUE_TOKEN, given to both ``serve`` and the workers);
+only expose it on a network you trust.
+
+Workers use the engine named by KATAGO_DIR/KATAGO_EXECUTABLE/KATAGO_MODEL/
+KATAGO_CONFIG, so pointing those at katago_simulator.py runs the whole
+pipeline on one box without KataGo.
+"""
+import hmac
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import traceback
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import click
+
+import add_passes_to_kifu
+from sgf_archives import iter_games, iter_sgf_members, member_source
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_PORT = 8765
+RENEWALS_PER_LEASE = 4       # renew this many times per lease period while results arrive
+REQUEST_RETRIES = 5          # a worker waits this many times for an unreachable coordinator
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    board_size INTEGER NOT NULL,
+    komi REAL NOT NULL,
+    rules TEXT NOT NULL,
+    moves TEXT NOT NULL,
+    collected_at REAL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    first_move INTEGER NOT NULL,
+    last_move INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    error TEXT,
+    result TEXT,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, id);
+CREATE INDEX IF NOT EXISTS jobs_game ON jobs (game_id);
+"""
+
+
+def connect(db_path):
+    # Autocommit mode; transactions that must not interleave take BEGIN IMMEDIATE
+    connection = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    # Not WAL (see above); this also switches back queues created in WAL mode
+    connection.execute("PRAGMA journal_mode=DELETE")
+    connection.execute("PRAGMA busy_timeout=60000")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def trim_result(katago_result):
+    """Keep only what generate_sgf_output reads, so results stay small in the queue."""
+    return {'moveInfos': katago_result.get('moveInfos', [])[:1], 'rootInfo': katago_result.get('rootInfo', {})}
+
+
+# Enqueueing
+
+def enqueue_paths(connection, paths, moves_per_job=0):
+    """Add a job set for every game in ``paths`` not already queued; returns (games, jobs) added."""
+    games_added = 0
+    jobs_added = 0
+    for path in paths:
+        archive_name = os.path.basename(os.path.normpath(path))
+        for member_name, data in iter_sgf_members(path):
+            try:
+                games = list(iter_games(data))
+            except ValueError as e:
+                logging.error(f"Skipping {member_name}: {e}")
+                continue
+            for index, game in enumerate(games):
+                name = member_source(archive_name, member_name) + (f"#{index}" if len(games) > 1 else '')
+                moves, board_size, komi, rules = add_passes_to_kifu.parse_sgf_game(game)
+                if not moves:
+                    continue
+                connection.execute("BEGIN IMMEDIATE")
+                cursor = connection.execute(
+                    "INSERT OR IGNORE INTO games (name, board_size, komi, rules, moves) VALUES (?, ?, ?, ?, ?)",
+                    (name, board_size, komi, rules, json.dumps(moves)))
+                if cursor.rowcount:
+                    step = moves_per_job or len(moves)
+                    connection.executemany(
+                        "INSERT INTO jobs (game_id, first_move, last_move) VALUES (?, ?, ?)",
+                        [(cursor.lastrowid, first, min(first + step, len(moves)))
+                         for first in range(0, len(moves), step)])
+                    games_added += 1
+                    jobs_added += -(-len(moves) // step)
+                connection.execute("COMMIT")
+    return games_added, jobs_added
+
+
+# Leasing
+
+def claim_job(connection, worker, lease_seconds, max_attempts):
+    """Lease the oldest runnable job, or return None if there is none."""
+    now = time.time()
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        connection.execute(
+            "UPDATE jobs SET state = 'failed', error = coalesce(error, 'lease expired') "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?", (now, max_attempts))
+        row = connection.execute(
+            "SELECT jobs.id, first_move, last_move, board_size, komi, rules, moves, name FROM jobs "
+            "JOIN games ON games.id = jobs.game_id "
+            "WHERE (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) AND attempts < ? "
+            "ORDER BY jobs.id LIMIT 1", (now, max_attempts)).fetchone()
+        if row:
+            connection.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE id = ?", (worker, now + lease_seconds, row[0]))
+        connection.execute("COMMIT")
+    except Exception:
+        connection.execute("ROLLBACK")
+        raise
+    if not row:
+        return None
+    job_id, first_move, last_move, board_size, komi, rules, moves, name = row
+    return {'id': job_id, 'first_move': first_move, 'last_move': last_move, 'board_size': board_size,
+            'komi': komi, 'rules': rules, 'moves': [(color, tuple(move) if move else move)
+                                                     for color, move in json.loads(moves)], 'name': name}
+
+
+def renew_lease(connection, job_id, worker, lease_seconds):
+    """Extend our lease; False means another worker has taken the job over."""
+    cursor = connection.execute(
+        "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker = ? AND state = 'leased'",
+        (time.time() + lease_seconds, job_id, worker))
+    return cursor.rowcount == 1
+
+
+def complete_job(connection, job_id, worker, results):
+    cursor = connection.execute(
+        "UPDATE jobs SET state = 'done', result = ?, error = NULL, finished_at = ? "
+        "WHERE id = ? AND worker = ? AND state = 'leased'",
+        (json.dumps(results), time.time(), job_id, worker))
+    return cursor.rowcount == 1
+
+
+def fail_job(connection, job_id, worker, error, max_attempts):
+    connection.execute(
+        "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+        "error = ?, lease_expires = NULL WHERE id = ? AND worker = ? AND state = 'leased'",
+        (max_attempts, error, job_id, worker))
+
+
+# Queue access: directly on the coordinator, over HTTP everywhere else
+
+class LocalQueue:
+    """Leasing on a queue database opened directly."""
+
+    def __init__(self, db_path, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.connection = connect(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    def claim(self, worker):
+        job = claim_job(self.connection, worker, self.lease_seconds, self.max_attempts)
+        if job is not None:
+            job['lease_seconds'] = self.lease_seconds
+        return job
+
+    def renew(self, job_id, worker):
+        return renew_lease(self.connection, job_id, worker, self.lease_seconds)
+
+    def complete(self, job_id, worker, results):
+        return complete_job(self.connection, job_id, worker, results)
+
+    def fail(self, job_id, worker, error):
+        fail_job(self.connection, job_id, worker, error, self.max_attempts)
+
+    def close(self):
+        self.connection.close()
+
+
+class RemoteQueue:
+    """The same calls as LocalQueue, made against a coordinator running ``serve``."""
+
+    def __init__(self, url, token=None, timeout=60):
+        self.url = url.rstrip('/')
+        self.token = token
+        self.timeout = timeout
+
+    def claim(self, worker):
+        job = self._post('claim', worker=worker)['job']
+        if job is not None:
+            job['moves'] = [(color, tuple(move) if move else move) for color, move in job['moves']]
+        return job
+
+    def renew(self, job_id, worker):
+        return self._post('renew', job_id=job_id, worker=worker)['ok']
+
+    def complete(self, job_id, worker, results):
+        return self._post('complete', job_id=job_id, worker=worker, results=results)['ok']
+
+    def fail(self, job_id, worker, error):
+        self._post('fail', job_id=job_id, worker=worker, error=error)
+
+    def close(self):
+        pass
+
+    def _post(self, action, **payload):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        request = urllib.request.Request(f"{self.url}/{action}", data=json.dumps(payload).encode(), headers=headers)
+        for attempt in range(1, REQUEST_RETRIES + 1):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError:
+                raise
+            except (urllib.error.URLError, OSError) as e:
+                # The coordinator is restarting or briefly unreachable; the lease outlasts a short wait
+                if attempt == REQUEST_RETRIES:
+                    raise
+                logging.warning(f"Queue request {action} failed ({e}); retrying")
+                time.sleep(2 * attempt)
+
+
+def open_queue(db_path=None, server_url=None, token=None,
+               lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    if server_url:
+        return RemoteQueue(server_url, token)
+    return LocalQueue(db_path, lease_seconds, max_attempts)
+
+
+# Coordinator
+
+class QueueRequestHandler(BaseHTTPRequestHandler):
+    timeout = 60  # a stalled client must not hold up the other workers
+
+    def do_POST(self):
+        queue = self.server.queue
+        token = self.server.token
+        if token and not hmac.compare_digest(self.headers.get('Authorization', ''), f"Bearer {token}"):
+            return self._reply(401, {'error': "Bad or missing token"})
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            action = self.path.strip('/')
+            if action == 'claim':
+                reply = {'job': queue.claim(payload['worker'])}
+            elif action == 'renew':
+                reply = {'ok': queue.renew(payload['job_id'], payload['worker'])}
+            elif action == 'complete':
+                reply = {'ok': queue.complete(payload['job_id'], payload['worker'], payload['results'])}
+            elif action == 'fail':
+                queue.fail(payload['job_id'], payload['worker'], payload['error'])
+                reply = {}
+            else:
+                return self._reply(404, {'error': f"Unknown action {action}"})
+        except (ValueError, KeyError, TypeError) as e:
+            return self._reply(400, {'error': f"Bad request: {e}"})
+        self._reply(200, reply)
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def serve_queue(db_path, host, port, lease_seconds, max_attempts, token=None):
+    """Serve leasing for the queue at ``db_path`` until interrupted.
+
+    Requests are handled one at a time on a single connection: each is one
+    short SQLite transaction, and SQLite runs one writer at a time anyway.
+    """
+    server = HTTPServer((host, port), QueueRequestHandler)
+    server.queue = LocalQueue(db_path, lease_seconds, max_attempts)
+    server.token = token
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        server.queue.close()
+
+
+# Workers
+
+def open_engine():
+    return add_passes_to_kifu.KataGo(
+        os.path.join(add_passes_to_kifu.KATAGO_DIR, add_passes_to_kifu.KATAGO_EXECUTABLE),
+        os.path.join(add_passes_to_kifu.KATAGO_DIR, add_passes_to_kifu.KATAGO_CONFIG),
+        os.path.join(add_passes_to_kifu.KATAGO_DIR, add_passes_to_kifu.KATAGO_MODEL))
+
+
+def run_job(queue, katago, job, worker):
+    """Analyse the job's positions; returns the results, or None if the lease was lost.
+
+    Every position is submitted before any result is awaited, so the engine
+    batches them like a whole game in add_passes_to_kifu.  A result row is
+    [move_number, perspective, trimmed result]: the moves are in the game row.
+    """
+    move_list = [[color, add_passes_to_kifu.sgfmill_to_gtp(move, job['board_size'])] for color, move in job['moves']]
+    submitted = []
+    for move_number in range(job['first_move'], job['last_move']):
+        submitted.extend(add_passes_to_kifu.submit_board_state(
+            katago, move_list[:move_number], job['rules'], job['komi'], job['board_size'], move_number))
+    results = []
+    renew_every = job['lease_seconds'] / RENEWALS_PER_LEASE
+    renewed = time.monotonic()
+    for entry in submitted:
+        move_number, perspective, _, katago_result = add_passes_to_kifu.collect_result(entry, tracer=katago.tracer)
+        results.append([move_number, perspective, trim_result(katago_result)])
+        if time.monotonic() - renewed >= renew_every:
+            if not queue.renew(job['id'], worker):
+                logging.warning(f"Lost the lease on job {job['id']}; abandoning it")
+                return None
+            renewed = time.monotonic()
+    return results
+
+
+def work(queue, poll_seconds, max_jobs=0):
+    """Worker loop: lease, analyse, report, until the queue is empty (or forever with ``poll_seconds``)."""
+    worker = worker_name()
+    katago = None
+    done = 0
+    try:
+        while not max_jobs or done < max_jobs:
+            job = queue.claim(worker)
+            if job is None:
+                if not poll_seconds:
+                    break
+                time.sleep(poll_seconds)
+                continue
+
+            if katago is None:
+                katago = open_engine()
+            started = time.perf_counter()
+            try:
+                results = run_job(queue, katago, job, worker)
+            except Exception as e:
+                logging.error(f"Job {job['id']} ({job['name']}) failed: {e}")
+                logging.debug(traceback.format_exc())
+                queue.fail(job['id'], worker, str(e))
+                # The engine may be the cause; start a fresh one for the next job
+                katago.close()
+                katago = None
+                continue
+            if results is None:
+                # Drop the abandoned job's queries still waiting in the engine
+                katago.close()
+                katago = None
+            elif queue.complete(job['id'], worker, results):
+                done += 1
+                logging.info(f"Job {job['id']} ({job['name']}, moves {job['first_move']}-{job['last_move']}) "
+                             f"done in {time.perf_counter() - started:.1f}s")
+    finally:
+        if katago:
+            katago.close()
+        queue.close()
+    return done
+
+
+def worker_process(args):
+    queue_args, poll_seconds, max_jobs = args
+    return work(open_queue(**queue_args), poll_seconds, max_jobs)
+
+
+# Results
+
+def collect_games(connection, output_dir, comments=True, sidecar_file=None):
+    """Write an analysed SGF for every game whose jobs are all done; returns the number written."""
+    os.makedirs(output_dir, exist_ok=True)
+    rows = connection.execute(
+        "SELECT games.id, name, board_size, komi, rules, moves FROM games "
+        "WHERE collected_at IS NULL AND NOT EXISTS "
+        "(SELECT 1 FROM jobs WHERE jobs.game_id = games.id AND state != 'done')").fetchall()
+    for game_id, name, board_size, komi, rules, moves in rows:
+        results = []
+        for (result,) in connection.execute("SELECT result FROM jobs WHERE game_id = ? ORDER BY first_move", (game_id,)):
+            # Rows are [move_number, perspective, result]; generate_sgf_output ignores the query moves
+            results.extend((r[0], r[1], None, r[-1]) for r in json.loads(result))
+        moves = [(color, tuple(move) if move else move) for color, move in json.loads(moves)]
+        file_name = name.replace('/', '_').replace('#', '_') + '.sgf'
+        add_passes_to_kifu.generate_sgf_output(os.path.join(output_dir, file_name), moves, board_size, komi, rules,
+                                               results, comments, sidecar_file)
+        connection.execute("UPDATE games SET collected_at = ? WHERE id = ?", (time.time(), game_id))
+    return len(rows)
+
+
+def queue_status(connection):
+    counts = dict(connection.execute("SELECT state, count(*) FROM jobs GROUP BY state").fetchall())
+    workers = connection.execute(
+        "SELECT worker, count(*) FROM jobs WHERE state = 'leased' AND lease_expires >= ? GROUP BY worker",
+        (time.time(),)).fetchall()
+    recent = connection.execute(
+        "SELECT count(*), min(finished_at), max(finished_at) FROM jobs WHERE state = 'done' AND finished_at >= ?",
+        (time.time() - 600,)).fetchone()
+    games = connection.execute(
+        "SELECT count(*), count(collected_at) FROM games").fetchone()
+    return counts, workers, recent, games
+
+
+# CLI
+
+@click.group()
+@click.option('--verbose', is_flag=True, help="Log every finished job")
+def cli(verbose):
+    """Distributed analysis job queue."""
+    logging.basicConfig(level=logging.INFO if verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+@cli.command()
+@click.option('--db', 'db_path', required=True, type=click.Path(dir_okay=False), help="Queue database")
+@click.option('--moves-per-job', type=int, default=0, show_default=True,
+              help="Positions per job; 0 makes each game one job")
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True))
+def enqueue(db_path, moves_per_job, paths):
+    """Queue every game in SGF files, collections, archives or directories."""
+    connection = connect(db_path)
+    games, jobs = enqueue_paths(connection, paths, moves_per_job)
+    click.echo(f"Queued {games} game(s) as {jobs} job(s)")
+
+
+@cli.command()
+@click.option('--db', 'db_path', required=True, type=click.Path(exists=True, dir_okay=False), help="Queue database")
+@click.option('--host', default='0.0.0.0', show_default=True, help="Address to listen on")
+@click.option('--port', type=int, default=DEFAULT_PORT, show_default=True)
+@click.option('--lease', 'lease_seconds', type=float, default=DEFAULT_LEASE_SECONDS, show_default=True,
+              help="Seconds a job stays leased without progress before others may take it")
+@click.option('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS, show_default=True)
+@click.option('--token', envvar='ANALYSIS_QUEUE_TOKEN', help="Shared secret workers must send")
+def serve(db_path, host, port, lease_seconds, max_attempts, token):
+    """Serve the queue to workers on other hosts."""
+    click.echo(f"Serving {db_path} on {host}:{port}")
+    serve_queue(db_path, host, port, lease_seconds, max_attempts, token)
+
+
+@cli.command()
+@click.option('--db', 'db_path', type=click.Path(exists=True, dir_okay=False),
+              help="Queue database, for workers on the coordinator host")
+@click.option('--server', 'server_url', help="URL of the coordinator running serve, e.g. http://coordinator:8765")
+@click.option('--token', envvar='ANALYSIS_QUEUE_TOKEN', help="Shared secret the coordinator expects")
+@click.option('--processes', type=int, default=1, show_default=True, help="Worker processes to run on this host")
+@click.option('--lease', 'lease_seconds', type=float, default=DEFAULT_LEASE_SECONDS, show_default=True,
+              help="With --db: seconds a job stays leased without progress before others may take it")
+@click.option('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS, show_default=True, help="With --db")
+@click.option('--poll', 'poll_seconds', type=float, default=0, show_default=True,
+              help="Keep waiting for new jobs, checking this often; 0 exits once the queue is empty")
+@click.option('--max-jobs', type=int, default=0, help="Exit after this many jobs per process")
+def worker(db_path, server_url, token, processes, lease_seconds, max_attempts, poll_seconds, max_jobs):
+    """Run jobs from the queue on the local engine."""
+    if bool(db_path) == bool(server_url):
+        raise click.UsageError("Give exactly one of --db and --server")
+    started = time.perf_counter()
+    queue_args = {'db_path': db_path, 'server_url': server_url, 'token': token,
+                  'lease_seconds': lease_seconds, 'max_attempts': max_attempts}
+    args = (queue_args, poll_seconds, max_jobs)
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            done = sum(pool.map(worker_process, [args] * processes))
+    else:
+        done = worker_process(args)
+    click.echo(f"Finished {done} job(s) in {time.perf_counter() - started:.1f}s")
+
+
+@cli.command()
+@click.option('--db', 'db_path', required=True, type=click.Path(exists=True, dir_okay=False), help="Queue database")
+def status(db_path):
+    """Show job counts, active workers and recent throughput."""
+    counts, workers, recent, games = queue_status(connect(db_path))
+    click.echo("Jobs: " + ", ".join(f"{state} {counts.get(state, 0)}"
+                                    for state in ('pending', 'leased', 'done', 'failed')))
+    click.echo(f"Games: {games[0]} queued, {games[1]} collected")
+    finished, first, last = recent
+    if finished > 1 and last > first:
+        click.echo(f"Last 10 minutes: {finished} job(s), {finished / (last - first) * 60:.1f} jobs/min")
+    for name, leased in workers:
+        click.echo(f"  {name}: {leased} job(s) leased")
+
+
+@cli.command()
+@click.option('--db', 'db_path', required=True, type=click.Path(exists=True, dir_okay=False), help="Queue database")
+@click.option('--output-dir', required=True, type=click.Path(file_okay=False), help="Where analysed SGFs are written")
+@click.option('--comments/--no-comments', default=True, show_default=True)
+@click.option('--sidecar', type=click.Path(dir_okay=False), help="Also append every position to this CSV")
+def collect(db_path, output_dir, comments, sidecar):
+    """Write analysed SGFs for finished games."""
+    written = collect_games(connect(db_path), output_dir, comments, sidecar)
+    click.echo(f"Wrote {written} analysed game(s) to {output_dir}")
+
+
+@cli.command()
+@click.option('--db', 'db_path', required=True, type=click.Path(exists=True, dir_okay=False), help="Queue database")
+def requeue(db_path):
+    """Give failed jobs a fresh set of attempts."""
+    cursor = connect(db_path).execute(
+        "UPDATE jobs SET state = 'pending', attempts = 0, worker = NULL WHERE state = 'failed'")
+    click.echo(f"Requeued {cursor.rowcount} failed job(s)")
+
+
+if __name__ == "__main__":
+    cli()
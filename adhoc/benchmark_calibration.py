@@ -0,0 +1,102 @@
+"""Benchmark for the rating calibration in app/calibration.py on synthetic responses.
+
+Draws true abilities and difficulties, simulates --responses answers from the
+Rasch model, then times:
+
+    full         one fit over every response from the N(0, 2) prior
+    incremental  a fit over the first 90%, then an incremental fit over the
+                 last 10% starting from those ratings
+
+and reports how well each recovers the true ratings, and how far the
+incremental result is from the full refit.  Only the NumPy fit is timed; the
+database round trip is the same as any bulk load.
+
+    python adhoc/benchmark_calibration.py --responses 5000000 --users 100000 --problems 20000
+"""
+import json
+import os
+import sys
+import time
+
+import click
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.calibration import PRIOR_INFORMATION, MAX_INFORMATION, fit_ratings
+
+
+def synthetic_responses(responses, users, problems, seed):
+    rng = np.random.default_rng(seed)
+    ability = rng.normal(0, 1, users)
+    difficulty = rng.normal(0, 1.2, problems)
+    # Some users answer far more than others
+    user_weights = rng.pareto(1.5, users) + 1
+    user_index = rng.choice(users, responses, p=user_weights / user_weights.sum())
+    problem_index = rng.integers(0, problems, responses)
+    correct = rng.random(responses) < 1 / (1 + np.exp(difficulty[problem_index] - ability[user_index]))
+    return ability, difficulty, user_index, problem_index, correct
+
+
+def fit_from_prior(users, problems, correct, user_count, problem_count, prior=None):
+    if prior is None:
+        prior = (np.zeros(user_count), np.full(user_count, PRIOR_INFORMATION),
+                 np.zeros(problem_count), np.full(problem_count, PRIOR_INFORMATION))
+    ability, user_information, difficulty, problem_information = prior
+    started = time.perf_counter()
+    result = fit_ratings(users, problems, correct, ability, np.minimum(user_information, MAX_INFORMATION),
+                         difficulty, np.minimum(problem_information, MAX_INFORMATION))
+    return result, time.perf_counter() - started
+
+
+def recovery(fitted, truth, counts, minimum=5):
+    seen = counts >= minimum
+    return float(np.corrcoef(fitted[seen], truth[seen])[0, 1])
+
+
+@click.command()
+@click.option('--responses', type=int, default=2_000_000, show_default=True)
+@click.option('--users', type=int, default=50_000, show_default=True)
+@click.option('--problems', type=int, default=10_000, show_default=True)
+@click.option('--seed', type=int, default=1, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help="Write results as JSON")
+def benchmark(responses, users, problems, seed, output):
+    """Time full and incremental rating fits on synthetic responses."""
+    true_ability, true_difficulty, user_index, problem_index, correct = synthetic_responses(
+        responses, users, problems, seed)
+    user_counts = np.bincount(user_index, minlength=users)
+    problem_counts = np.bincount(problem_index, minlength=problems)
+    click.echo(f"{responses} responses, {users} users, {problems} problems, {correct.mean():.1%} correct")
+
+    (ability, _, difficulty, _), full_seconds = fit_from_prior(user_index, problem_index, correct, users, problems)
+
+    split = int(responses * 0.9)
+    first, first_seconds = fit_from_prior(user_index[:split], problem_index[:split], correct[:split], users, problems)
+    (inc_ability, _, inc_difficulty, _), inc_seconds = fit_from_prior(
+        user_index[split:], problem_index[split:], correct[split:], users, problems, prior=first)
+
+    results = {
+        'full': {'seconds': full_seconds,
+                 'ability_r': recovery(ability, true_ability, user_counts),
+                 'difficulty_r': recovery(difficulty, true_difficulty, problem_counts)},
+        'incremental': {'seconds': inc_seconds, 'first_90pct_seconds': first_seconds,
+                        'ability_r': recovery(inc_ability, true_ability, user_counts),
+                        'difficulty_r': recovery(inc_difficulty, true_difficulty, problem_counts),
+                        'max_difficulty_gap': float(np.abs(inc_difficulty - difficulty).max()),
+                        'mean_difficulty_gap': float(np.abs(inc_difficulty - difficulty).mean())},
+    }
+    click.echo(f"{'fit':<14}{'seconds':>10}{'ability r':>12}{'difficulty r':>14}")
+    for name, stats in results.items():
+        click.echo(f"{name:<14}{stats['seconds']:>10.2f}{stats['ability_r']:>12.3f}{stats['difficulty_r']:>14.3f}")
+    click.echo(f"incremental vs full difficulty: mean gap {results['incremental']['mean_difficulty_gap']:.3f}, "
+               f"max {results['incremental']['max_difficulty_gap']:.3f} logits")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'responses': responses, 'users': users, 'problems': problems, 'seed': seed,
+                       'results': results}, f, indent=2)
+        click.echo(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,302 @@
+"""Benchmarks for the offline SGF pipelines.
+
+Generates seeded SGF fixtures (tsumego trees of varying size and variation
+depth, and game records of varying length) and times each stage separately:
+
+    parse               sgf.Sgf_game.from_bytes / add_passes_to_kifu.parse_sgf_file
+    solution_search     manage_problems.find_solution_path + has_tenuki_paths
+    problem_generation  manage_problems.create_output_sgf_string for main and tenuki problems
+    source_tagging      download_gogameguru.add_source_url_to_sgf
+    import              Problem.load_sgf_files into a scratch SQLite database
+    analysis_output     add_passes_to_kifu.generate_sgf_output with synthetic engine results
+    replay              app.board.GoBoard replaying a game record (ops are moves)
+    replay_sgfmill      the same replay on sgfmill.boards.Board, for comparison
+
+Each stage reports ops/sec and peak traced memory.  Results are written as JSON;
+pass a previous run with --compare to see the ratio per stage.
+
+    python adhoc/benchmark_sgf_pipeline.py --output bench.json
+    python adhoc/benchmark_sgf_pipeline.py --compare bench.json
+"""
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import click
+from sgfmill import boards, sgf
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import manage_problems  # noqa: E402
+import add_passes_to_kifu  # noqa: E402
+import download_gogameguru  # noqa: E402
+from app.board import GoBoard, IllegalMove  # noqa: E402
+
+# (name, setup stones, variation depth, branching factor)
+TSUMEGO_FIXTURES = [
+    ('tsumego_small', 12, 3, 2),
+    ('tsumego_medium', 24, 5, 3),
+    ('tsumego_deep', 36, 8, 3),
+]
+# (name, number of moves)
+GAME_FIXTURES = [
+    ('game_short', 60),
+    ('game_full', 250),
+]
+
+
+def to_sgf_coord(row, col):
+    return f"{chr(97 + col)}{chr(97 + row)}"
+
+
+def generate_tsumego(rng, size, stones, depth, branching):
+    """A corner problem with a full variation tree; exactly one leaf is marked Correct."""
+    corner = [(r, c) for r in range(9) for c in range(9)]
+    setup = rng.sample(corner, stones)
+    free = [p for p in corner if p not in setup]
+    correct_path = [rng.randrange(branching) for _ in range(depth)]
+
+    def subtree(level, used, on_correct_path, color):
+        if level == depth:
+            return ''
+        out = []
+        choices = rng.sample([p for p in free if p not in used], branching)
+        for i, point in enumerate(choices):
+            node = f";{color}[{to_sgf_coord(*point)}]"
+            correct = on_correct_path and i == correct_path[level]
+            if correct and level == depth - 1:
+                node += "C[Correct. The group is dead.]"
+            elif level == depth - 1:
+                node += "C[Wrong, the group lives.]"
+            node += subtree(level + 1, used | {point}, correct, 'W' if color == 'B' else 'B')
+            out.append(f"({node})")
+        return ''.join(out)
+
+    half = len(setup) // 2
+    black = ''.join(f"[{to_sgf_coord(*p)}]" for p in setup[:half])
+    white = ''.join(f"[{to_sgf_coord(*p)}]" for p in setup[half:])
+    root = f"(;FF[4]GM[1]SZ[{size}]SO[benchmark]AB{black}AW{white}"
+    return (root + subtree(0, frozenset(), True, 'B') + ")").encode()
+
+
+def generate_game(rng, size, moves):
+    points = rng.sample([(r, c) for r in range(size) for c in range(size)], moves)
+    body = ''.join(f";{'B' if i % 2 == 0 else 'W'}[{to_sgf_coord(*p)}]" for i, p in enumerate(points))
+    return f"(;FF[4]GM[1]SZ[{size}]KM[6.5]RU[Japanese]{body})".encode()
+
+
+def synthetic_results(moves):
+    rng = random.Random(len(moves))
+    results = []
+    for move_number in range(len(moves)):
+        for perspective in ('play', 'pass'):
+            results.append((move_number, perspective, [], {'moveInfos': [{
+                'scoreLead': rng.uniform(-20, 20), 'scoreStdev': rng.uniform(5, 25), 'lcb': rng.random(),
+                'utility': rng.uniform(-1, 1), 'utilityLcb': rng.uniform(-1, 1), 'visits': 500,
+                'winrate': rng.random()}]}))
+    return results
+
+
+def measure(fn, ops, min_time):
+    """Time repeated calls of ``fn`` (which performs ``ops`` operations) and trace its peak memory."""
+    fn()  # warm up
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_call = elapsed / calls
+    return {'ops': ops * calls, 'seconds': elapsed, 'ops_per_sec': ops / per_call, 'peak_kib': peak / 1024}
+
+
+def bench_tsumego(name, data, workdir, min_time):
+    results = {}
+    path = os.path.join(workdir, f"{name}.sgf")
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    results['parse'] = measure(lambda: sgf.Sgf_game.from_bytes(data), 1, min_time)
+
+    game = sgf.Sgf_game.from_bytes(data)
+    root = game.get_root()
+
+    def search():
+        annotation = manage_problems.annotate_tree(root)
+        manage_problems.find_solution_path(root, annotation)
+        manage_problems.has_tenuki_paths(root, annotation)
+    results['solution_search'] = measure(search, 1, min_time)
+
+    annotation = manage_problems.annotate_tree(root)
+    solution_path = manage_problems.find_solution_path(root, annotation)
+    tenuki_children = [child for child in root if child not in solution_path]
+
+    def generate():
+        manage_problems.create_output_sgf_string(game, solution_path, is_tenuki=False, annotation=annotation)
+        for child in tenuki_children:
+            manage_problems.create_output_sgf_string(game, [root, child], is_tenuki=True, annotation=annotation)
+    results['problem_generation'] = measure(generate, 1 + len(tenuki_children), min_time)
+
+    tagged = os.path.join(workdir, f"{name}_tagged.sgf")
+    results['source_tagging'] = measure(
+        lambda: download_gogameguru.add_source_url_to_sgf(path, tagged, f"bench/{name}.sgf"), 1, min_time)
+
+    return results
+
+
+def bench_game(name, data, workdir, min_time):
+    results = {}
+    path = os.path.join(workdir, f"{name}.sgf")
+    with open(path, 'wb') as f:
+        f.write(data)
+
+    results['parse'] = measure(lambda: add_passes_to_kifu.parse_sgf_file(path), 1, min_time)
+
+    moves, board_size, komi, rules = add_passes_to_kifu.parse_sgf_file(path)
+    engine_results = synthetic_results(moves)
+    output = os.path.join(workdir, f"{name}_analysed.sgf")
+    results['analysis_output'] = measure(
+        lambda: add_passes_to_kifu.generate_sgf_output(output, moves, board_size, komi, rules, engine_results),
+        len(moves), min_time)
+
+    def replay():
+        board = GoBoard(board_size)
+        for color, (row, col) in moves:
+            try:
+                board.play(row, col, color)
+            except IllegalMove:
+                pass  # Generated games are random, so the odd suicide is expected
+    results['replay'] = measure(replay, len(moves), min_time)
+
+    def replay_sgfmill():
+        board = boards.Board(board_size)
+        for color, (row, col) in moves:
+            if board.get(row, col) is None:
+                board.play(row, col, color.lower())
+    results['replay_sgfmill'] = measure(replay_sgfmill, len(moves), min_time)
+
+    return results
+
+
+def bench_import(rng, workdir, count):
+    """Import ``count`` generated problems into an empty database, timing only load_sgf_files."""
+    from app.flask_app import create_app
+    from app.problem import Problem
+    from config import Config
+
+    sgf_dir = os.path.join(workdir, 'processed')
+    os.makedirs(sgf_dir, exist_ok=True)
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(workdir, 'import.db')}"
+        SGF_PROCESSED_DIR = sgf_dir
+
+    app = create_app(BenchmarkConfig)
+    logging.getLogger('app.logger').setLevel(logging.WARNING)
+    app.logger.setLevel(logging.WARNING)
+
+    data = generate_tsumego(rng, 19, 24, 3, 2)
+    game = sgf.Sgf_game.from_bytes(data)
+    solution_path = manage_problems.find_solution_path(game.get_root())
+    template = manage_problems.create_output_sgf_string(game, solution_path)
+    for i in range(count):
+        with open(os.path.join(sgf_dir, f"problem_{i}.sgf"), 'w', encoding='utf-8') as f:
+            # Unique comment per file so the content hashes differ
+            f.write(template.replace('Correct answer: YES', f'Correct answer: YES #{i}'))
+
+    with app.app_context():
+        tracemalloc.start()
+        started = time.perf_counter()
+        Problem.load_sgf_files()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'ops': count, 'seconds': elapsed, 'ops_per_sec': count / elapsed, 'peak_kib': peak / 1024}
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, baseline=None):
+    click.echo(f"{'fixture':<16}{'stage':<20}{'ops/sec':>12}{'peak KiB':>12}{'vs base':>10}")
+    for fixture, stages in results.items():
+        for stage, stats in stages.items():
+            ratio = ''
+            base = (baseline or {}).get(fixture, {}).get(stage)
+            if base:
+                ratio = f"{stats['ops_per_sec'] / base['ops_per_sec']:.2f}x"
+            click.echo(f"{fixture:<16}{stage:<20}{stats['ops_per_sec']:>12.1f}{stats['peak_kib']:>12.1f}{ratio:>10}")
+
+
+@click.command()
+@click.option('--output', type=click.Path(dir_okay=False), help="Write results as JSON")
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False), help="Previous JSON run to compare against")
+@click.option('--min-time', type=float, default=1.0, show_default=True, help="Seconds to spend per stage")
+@click.option('--import-count', type=int, default=500, show_default=True, help="Problems to import in the import stage")
+@click.option('--seed', type=int, default=1, show_default=True)
+def benchmark(output, compare, min_time, import_count, seed):
+    """Time each offline SGF pipeline stage on generated fixtures."""
+    logging.disable(logging.INFO)
+    manage_problems.VerbosityLevel.current = manage_problems.VerbosityLevel.ERROR
+
+    rng = random.Random(seed)
+    workdir = tempfile.mkdtemp(prefix='sgf_bench_')
+    results = {}
+    try:
+        for name, stones, depth, branching in TSUMEGO_FIXTURES:
+            results[name] = bench_tsumego(name, generate_tsumego(rng, 19, stones, depth, branching), workdir, min_time)
+        for name, moves in GAME_FIXTURES:
+            results[name] = bench_game(name, generate_game(rng, 19, moves), workdir, min_time)
+        results['corpus'] = {'import': bench_import(rng, workdir, import_count)}
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    if output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'seed': seed,
+                'min_time': min_time,
+            },
+            'results': results,
+        }
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    benchmark()
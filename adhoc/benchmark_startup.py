@@ -0,0 +1,119 @@
+"""Startup-time benchmark for the Flask app.
+
+Starts fresh interpreters and times, in each one:
+
+    import         importing app.flask_app
+    create_app     building the app against a scratch SQLite database that already has its schema
+    first_request  the first GET /login through the test client (templates, deferred imports)
+
+and the whole process from spawn to exit.  Reports the median and best of
+--runs; results can be written as JSON and compared like benchmark_sgf_pipeline.
+
+    python adhoc/benchmark_startup.py --runs 10 --output startup.json
+    python adhoc/benchmark_startup.py --compare startup.json
+"""
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import click
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+import app.flask_app as flask_app
+imported = time.perf_counter()
+from config import Config
+
+class StartupConfig(Config):
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(os.getcwd(), 'startup.db')
+    SGF_PROCESSED_DIR = os.path.join(os.getcwd(), 'no-sgf-import')
+    GOOGLE_CLIENT_ID = 'startup-benchmark'
+
+app = flask_app.create_app(StartupConfig)
+built = time.perf_counter()
+status = app.test_client().get('/login').status_code
+served = time.perf_counter()
+print(json.dumps({'import': imported - started, 'create_app': built - imported,
+                  'first_request': served - built, 'status': status}))
+"""
+
+PHASES = ('import', 'create_app', 'first_request', 'process')
+
+
+def run_probe(workdir):
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', PROBE], cwd=workdir, env=env, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise click.ClickException(f"Startup probe failed:\n{completed.stderr[-2000:]}")
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+    if timings.pop('status') >= 500:
+        raise click.ClickException("GET /login failed in the startup probe")
+    timings['process'] = elapsed
+    return timings
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+@click.command()
+@click.option('--runs', type=int, default=5, show_default=True, help="Fresh processes to time")
+@click.option('--output', type=click.Path(dir_okay=False), help="Write results as JSON")
+@click.option('--compare', type=click.Path(exists=True, dir_okay=False), help="Previous JSON run to compare against")
+def benchmark(runs, output, compare):
+    """Time app import, construction and first request in fresh processes."""
+    workdir = tempfile.mkdtemp(prefix='startup_bench_')
+    try:
+        run_probe(workdir)  # Creates the schema, so the timed runs start from an existing database
+        samples = [run_probe(workdir) for _ in range(runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {phase: {'median_ms': statistics.median(s[phase] for s in samples) * 1000,
+                       'best_ms': min(s[phase] for s in samples) * 1000} for phase in PHASES}
+
+    baseline = None
+    if compare:
+        with open(compare) as f:
+            baseline = json.load(f)['results']
+    click.echo(f"{'phase':<16}{'median ms':>12}{'best ms':>12}{'vs base':>10}")
+    for phase, stats in results.items():
+        ratio = ''
+        if baseline and phase in baseline:
+            ratio = f"{stats['median_ms'] / baseline[phase]['median_ms']:.2f}x"
+        click.echo(f"{phase:<16}{stats['median_ms']:>12.1f}{stats['best_ms']:>12.1f}{ratio:>10}")
+
+    if output:
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'runs': runs,
+            },
+            'results': results,
+        }
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        click.echo(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    benchmark()
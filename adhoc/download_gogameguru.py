@@ -47,10 +47,11 @@ def copy_and_rename_sgfs(source_directory, destination_directory):
                 add_source_url_to_sgf(source_file_path, destination_file_path, relative_path)
 
 
-# Directory containing the downloaded SGF files
-source_dir = 'downloaded'
+if __name__ == "__main__":
+    # Directory containing the downloaded SGF files
+    source_dir = 'downloaded'
 
-# Directory to save the renamed SGF files
-destination_dir = 'sgf/raw'
+    # Directory to save the renamed SGF files
+    destination_dir = 'sgf/raw'
 
-copy_and_rename_sgfs(source_dir, destination_dir)
\ No newline at end of file
+    copy_and_rename_sgfs(source_dir, destination_dir)
@@ -0,0 +1,202 @@
+"""Generate ladder problems: "can the player to move capture the marked stone in a ladder?"
+
+Positions come from seeded random setups (a ladder start plus stones scattered
+in its path, some of which break it) and/or from game records, where every
+group of the opponent's with two liberties is a candidate.  Each one is read
+with app.ladder; only ladders whose main line runs at least --min-plies moves
+are kept, so the answer has to be read out rather than seen.  Records go
+through manage_problems' DatabaseImporter and/or are written to the processed
+directory, like converted problems.
+
+    python adhoc/generate_ladders.py --random 5000 --to-db
+    python adhoc/generate_ladders.py --games games.zip --min-plies 16
+"""
+import os
+import random
+import sys
+import time
+
+import click
+from sgfmill import sgf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.board import GoBoard, IllegalMove, board_from_sgf_game  # noqa: E402
+from app.ladder import LadderReader, ladder_candidates  # noqa: E402
+from manage_problems import OUTPUT_DIR, DatabaseImporter  # noqa: E402
+from sgf_archives import iter_games, iter_sgf_members, member_source  # noqa: E402
+
+OPENING_MOVES = 20  # game positions before this many moves are not searched
+MAX_TARGET_STONES = 3
+
+
+def ladder_record(board, target, attacker, ladder, source=None):
+    """A problem record (Problem columns, less board_image) for the ladder on ``target``."""
+    game = sgf.Sgf_game(board.side)
+    root = game.get_root()
+    black, white = board.stone_lists()
+    root.set_setup_stones(black, white)
+    root.set('PL', attacker)
+    root.set('RU', 'Japanese')
+    root.set('KM', 0.0)
+    root.set('TR', {target})
+    answer = 'YES' if ladder.captured else 'NO'
+    root.set('C', f"Can {attacker.upper()} capture the marked stone in a ladder? Correct answer: {answer}")
+    if source:
+        root.set('SO', source)
+    return {
+        'problem_type': 'ladder',
+        'color_to_move': attacker,
+        'correct_response_play': answer,
+        'correct_response_tenuki': 'NO' if ladder.captured else 'YES',
+        'sgf_content': game.serialise().decode('utf-8'),
+        'source': source,
+        'position_key': board.position_key(attacker),
+    }
+
+
+def random_ladder_board(rng, size, stones):
+    """A ladder start heading for a random corner with ``stones`` random stones in its path.
+
+    Returns (board, target, attacker), or None if the setup came out illegal.
+    """
+    dr, dc = rng.choice((1, -1)), rng.choice((1, -1))
+    margin = 3
+    row = rng.randrange(margin, size // 2) if dr == 1 else rng.randrange(size // 2, size - margin)
+    col = rng.randrange(margin, size // 2) if dc == 1 else rng.randrange(size // 2, size - margin)
+    attacker = rng.choice('bw')
+    defender = 'w' if attacker == 'b' else 'b'
+    # The defender has liberties ahead of it on both axes; the attacker holds the points behind
+    placed = {(row, col): defender, (row, col - dc): attacker, (row - dr, col): attacker, (row - dr, col + dc): attacker}
+
+    rows = range(row + 1, size) if dr == 1 else range(0, row)
+    cols = range(col + 1, size) if dc == 1 else range(0, col)
+    for _ in range(stones):
+        point = (rng.choice(rows), rng.choice(cols))
+        placed.setdefault(point, rng.choice('bw'))
+
+    board = GoBoard(size)
+    try:
+        board.setup([p for p, c in placed.items() if c == 'b'], [p for p, c in placed.items() if c == 'w'])
+    except IllegalMove:
+        return None
+    if board.get(row, col) != defender or board.liberties(row, col) != 2:
+        return None
+    return board, (row, col), attacker
+
+
+def random_problems(count, size, stones, min_plies, seed, reader, seen_keys):
+    """Yield ``count`` new records, half of them ladders that work and half ladders that fail."""
+    rng = random.Random(seed)
+    wanted = {True: (count + 1) // 2, False: count // 2}
+    while wanted[True] or wanted[False]:
+        setup = random_ladder_board(rng, size, rng.randint(0, stones))
+        if setup is None:
+            continue
+        board, target, attacker = setup
+        ladder = reader.read(board, target)
+        if ladder.captured is None or ladder.plies < min_plies or not wanted[ladder.captured]:
+            continue
+        record = ladder_record(board, target, attacker, ladder, f"generated:ladder/{seed}")
+        if record['position_key'] in seen_keys:
+            continue
+        seen_keys.add(record['position_key'])
+        wanted[ladder.captured] -= 1
+        yield record
+
+
+def game_problems(paths, min_plies, reader, seen_keys, every=1):
+    """Yield records for the long ladders found while replaying every game in ``paths``."""
+    for path in paths:
+        archive_name = os.path.basename(os.path.normpath(path))
+        for member_name, data in iter_sgf_members(path):
+            try:
+                games = list(iter_games(data))
+            except ValueError as e:
+                click.echo(f"Skipping {member_name}: {e}", err=True)
+                continue
+            for index, game in enumerate(games):
+                source = member_source(archive_name, member_name) + (f"#{index}" if len(games) > 1 else '')
+                try:
+                    board, plays = board_from_sgf_game(game)
+                except (ValueError, IllegalMove) as e:
+                    click.echo(f"Skipping {source}: {e}", err=True)
+                    continue
+                for move_number, (color, move) in enumerate(plays, 1):
+                    try:
+                        if move is None:
+                            board.pass_move()
+                        else:
+                            board.play(*move, color)
+                    except IllegalMove:
+                        break
+                    if move_number < OPENING_MOVES or move_number % every:
+                        continue
+                    attacker = 'w' if color == 'b' else 'b'
+                    for target in ladder_candidates(board, attacker):
+                        if len(board.stones[board.group[board.point(*target)]]) > MAX_TARGET_STONES:
+                            continue
+                        ladder = reader.read(board, target)
+                        if ladder.captured is None or ladder.plies < min_plies:
+                            continue
+                        record = ladder_record(board, target, attacker, ladder, f"{source}@{move_number}")
+                        if record['position_key'] not in seen_keys:
+                            seen_keys.add(record['position_key'])
+                            yield record
+
+
+@click.command()
+@click.option('--random', 'random_count', type=int, default=0, help="Generate this many problems from random setups")
+@click.option('--games', type=click.Path(exists=True), multiple=True,
+              help="Mine ladders from the games in an archive, collection or directory; repeatable")
+@click.option('--size', type=int, default=19, show_default=True, help="Board size for random setups")
+@click.option('--stones', type=int, default=6, show_default=True, help="Most random stones placed in a ladder's path")
+@click.option('--min-plies', type=int, default=12, show_default=True, help="Shortest main line worth a problem")
+@click.option('--every', type=int, default=1, show_default=True, help="With --games, search every Nth position")
+@click.option('--seed', type=int, default=1, show_default=True)
+@click.option('--to-db', is_flag=True, help="Insert the problems straight into the Problem table")
+@click.option('--write-files/--no-write-files', default=None,
+              help="Also write problem SGFs to the output directory (default: only without --to-db)")
+def generate_ladders(random_count, games, size, stones, min_plies, every, seed, to_db, write_files):
+    """Generate ladder-reading problems from random setups and game records."""
+    if not random_count and not games:
+        raise click.UsageError("Give --random N and/or --games PATH")
+    if write_files is None:
+        write_files = not to_db
+    if write_files:
+        os.makedirs(OUTPUT_DIR, exist_ok=True)
+    importer = DatabaseImporter() if to_db else None
+    reader = LadderReader()
+
+    started = time.perf_counter()
+    seen_keys = set()
+    sources = []
+    if random_count:
+        sources.append(random_problems(random_count, size, stones, min_plies, seed, reader, seen_keys))
+    if games:
+        sources.append(game_problems(games, min_plies, reader, seen_keys, max(1, every)))
+
+    generated = {True: 0, False: 0}
+    for records in sources:
+        for record in records:
+            record['board_image'] = f"ladder_{record['position_key']}.sgf"
+            generated[record['correct_response_play'] == 'YES'] += 1
+            if write_files:
+                with open(os.path.join(OUTPUT_DIR, record['board_image']), 'w', encoding='utf-8') as f:
+                    f.write(record['sgf_content'])
+            if importer:
+                importer.add([record])
+    if importer:
+        importer.flush()
+
+    elapsed = time.perf_counter() - started
+    total = generated[True] + generated[False]
+    click.echo(f"Generated {total} ladder problem(s) ({generated[True]} working, {generated[False]} broken) "
+               f"in {elapsed:.1f}s: {total / elapsed * 60 if elapsed else 0:.0f} problems/min, "
+               f"{reader.hits} memoised reads")
+    if importer:
+        click.echo(f"Inserted {importer.inserted} problem(s) into the database, skipped {importer.duplicates} duplicate(s)")
+
+
+if __name__ == "__main__":
+    generate_ladders()
@@ -10,16 +10,25 @@ import traceback
 from datetime import datetime
 from threading import Thread
 from sgfmill import sgf
-from sgfmill.boards import Board
-from typing import Tuple, List, Union, Literal, Any, Dict
+from typing import Tuple, List, Union, Literal, Any, Dict, TYPE_CHECKING
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.board import GoBoard  # noqa: E402
+
+if TYPE_CHECKING:
+    from analysis_store import AnalysisStore  # Needs NumPy; only imported with KATAGO_ANALYSIS_STORE set
 
 Color = Union[Literal["B"], Literal["W"]]
 Move = Union[None, Literal["pass"], Tuple[int, int]]
 
-KATAGO_DIR = r'C:\Users\User\.katrain'
-KATAGO_EXECUTABLE = 'katago-v1.13.0-opencl-windows-x64.exe'
-KATAGO_MODEL = r'kata1-b18c384nbt-s9131461376-d4087399203.bin.gz'
-KATAGO_CONFIG = 'analysis_config.cfg'
+# Override with environment variables, e.g. to run against adhoc/katago_simulator.py on a machine without KataGo
+KATAGO_DIR = os.environ.get('KATAGO_DIR', r'C:\Users\User\.katrain')
+KATAGO_EXECUTABLE = os.environ.get('KATAGO_EXECUTABLE', 'katago-v1.13.0-opencl-windows-x64.exe')
+KATAGO_MODEL = os.environ.get('KATAGO_MODEL', r'kata1-b18c384nbt-s9131461376-d4087399203.bin.gz')
+KATAGO_CONFIG = os.environ.get('KATAGO_CONFIG', 'analysis_config.cfg')
+# Set to a file path to keep every turn's ownership and policy (see analysis_store.py)
+KATAGO_ANALYSIS_STORE = os.environ.get('KATAGO_ANALYSIS_STORE')
 
 
 def setup_logger():
@@ -155,17 +164,16 @@ def parse_sgf_file(file_path: str) -> Tuple[List[Tuple[Color, Move]], int, float
 
 
 def run_katago_analysis(katago: KataGo, board_size: int, komi: float, moves: List[Tuple[Color, Move]],
-                        rules: str) -> Dict:
-    """Run KataGo analysis by sending a single query with all moves and return the raw response."""
-    board = Board(board_size)
+                        rules: str, store: 'AnalysisStore' = None) -> Dict:
+    """Run KataGo analysis by sending a single query with all moves and return the raw response.
+
+    With ``store``, ownership is requested too, and every turn's response is
+    read so its ownership and policy can be kept.
+    """
+    board = GoBoard(board_size)
 
     # Initialize the board with all initial stones
-    initial_stones = []
-    for y in range(board_size):
-        for x in range(board_size):
-            color = board.get(y, x)
-            if color:
-                initial_stones.append((color.upper(), sgfmill_to_gtp((y, x), board_size)))
+    initial_stones = [(color.upper(), sgfmill_to_gtp(point, board_size)) for color, point in board.list_stones()]
 
     # Prepare the full moves list for the query
     move_list = [(color, sgfmill_to_gtp(move, board_size)) for color, move in moves]
@@ -180,6 +188,7 @@ def run_katago_analysis(katago: KataGo, board_size: int, komi: float, moves: Lis
         "boardXSize": board_size,
         "boardYSize": board_size,
         "includePolicy": True,
+        "includeOwnership": store is not None,
         "minVisits": 2500,
         "maxVisits": 5000,
         "analyzeTurns": list(range(len(moves)))  # Analyze all turns
@@ -201,6 +210,23 @@ def run_katago_analysis(katago: KataGo, board_size: int, komi: float, moves: Lis
     line = katago.katago.stdout.readline().strip()
     katago_result = json.loads(line)
 
+    if store is not None:
+        from analysis_store import position_id
+
+        # One response per analysed turn, in whatever order the engine finishes them
+        turn_keys = []
+        for color, move in moves:
+            turn_keys.append(position_id(board, color))
+            if move is None or move == "pass":
+                board.pass_move()
+            else:
+                board.play(move[0], move[1], color)
+        store.add_result(turn_keys[katago_result['turnNumber']], katago_result)
+        for _ in range(len(moves) - 1):
+            response = json.loads(katago.katago.stdout.readline())
+            store.add_result(turn_keys[response['turnNumber']], response)
+        store.flush()
+
     # Debug: Print the response from KataGo
 #    logging.debug(f"KataGo response: {katago_result}")
 
@@ -272,7 +298,11 @@ if __name__ == "__main__":
 
     try:
         # Run analysis and get the raw response
-        raw_katago_results = run_katago_analysis(katago, board_size, komi, moves, rules)
+        store = None
+        if KATAGO_ANALYSIS_STORE:
+            from analysis_store import AnalysisStore
+            store = AnalysisStore(KATAGO_ANALYSIS_STORE, board_size)
+        raw_katago_results = run_katago_analysis(katago, board_size, komi, moves, rules, store)
         logging.debug("Raw katago results")
         logging.debug(raw_katago_results)
 
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Deterministic stand-in for ``katago analysis``.
+
+Speaks the KataGo analysis JSON protocol on stdin/stdout so the engine code
+paths can run on a machine without KataGo or a GPU.  It accepts the same
+command line as the real engine, so pointing KATAGO_DIR/KATAGO_EXECUTABLE at
+this file is enough:
+
+    katago_simulator.py analysis -config sim.cfg -model ignored.bin.gz [-override-config k=v,k=v]
+    katago_simulator.py tuner ...        (no-op, exits 0)
+
+Queries honour ``id``, ``moves``, ``initialStones``, ``analyzeTurns``,
+``maxVisits``, ``priority``, ``reportDuringSearchEvery``, ``includePolicy`` and
+``includeOwnership``, plus the ``query_version`` and ``terminate`` actions.
+Results are a pure function of the position and ``simSeed``.  Captures are not
+simulated; a point is treated as occupied once any stone has been placed on it.
+
+Simulator settings are read from the -config file (KataGo ``key = value``
+format), then -override-config, then KATAGO_SIM_<KEY> environment variables:
+
+    maxVisits              default visits when a query has none (500)
+    numAnalysisThreads     positions searched concurrently (2)
+    simLatencyPerVisitMs   simulated search cost per visit (0.02)
+    simBatchSize           positions a thread takes off the queue at once (1)
+    simBatchOverhead       extra cost per additional position in a batch (0.1)
+    simReorderReplies      shuffle the replies of a batch before writing them (false)
+    simCrashAfterQueries   exit abruptly on receiving this query (0 = never)
+    simCrashProbability    chance that any query crashes the engine (0.0)
+    simSeed                seed for every generated value (0)
+"""
+import hashlib
+import itertools
+import json
+import math
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+GTP_COLUMNS = "ABCDEFGHJKLMNOPQRSTUVWXYZ"
+VERSION = "1.13.0"
+
+DEFAULTS = {
+    'maxVisits': 500,
+    'numAnalysisThreads': 2,
+    'simLatencyPerVisitMs': 0.02,
+    'simBatchSize': 1,
+    'simBatchOverhead': 0.1,
+    'simReorderReplies': False,
+    'simCrashAfterQueries': 0,
+    'simCrashProbability': 0.0,
+    'simSeed': 0,
+}
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def coerce(key, value):
+    default = DEFAULTS.get(key)
+    if isinstance(default, bool):
+        return str(value).strip().lower() in ('1', 'true', 'yes')
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+
+def load_settings(argv):
+    settings = dict(DEFAULTS)
+    config_path = None
+    overrides = ''
+    for i, arg in enumerate(argv):
+        if arg == '-config' and i + 1 < len(argv):
+            config_path = argv[i + 1]
+        elif arg == '-override-config' and i + 1 < len(argv):
+            overrides = argv[i + 1]
+
+    pairs = []
+    if config_path and os.path.exists(config_path):
+        with open(config_path) as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if '=' in line:
+                    pairs.append(line.split('=', 1))
+    pairs.extend(pair.split('=', 1) for pair in overrides.split(',') if '=' in pair)
+    for key in DEFAULTS:
+        env_value = os.environ.get(f"KATAGO_SIM_{key.upper()}")
+        if env_value is not None:
+            pairs.append((key, env_value))
+
+    for key, value in pairs:
+        key = key.strip()
+        if key in DEFAULTS:
+            settings[key] = coerce(key, value.strip())
+    return settings
+
+
+class Task:
+    """One (query, turn) pair; KataGo answers each analysed turn separately."""
+
+    def __init__(self, query, turn):
+        self.query = query
+        self.turn = turn
+
+
+class Simulator:
+    def __init__(self, settings):
+        self.settings = settings
+        # (-priority, arrival order, task): like KataGo, higher priority first, then first come first served
+        self.tasks = queue.PriorityQueue()
+        self.arrivals = itertools.count()
+        self.write_lock = threading.Lock()
+        self.terminated = set()
+        self.crash_rng = random.Random(settings['simSeed'])
+        self.query_count = 0
+
+    def write(self, payload):
+        line = json.dumps(payload)
+        with self.write_lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    def run(self):
+        workers = [threading.Thread(target=self.worker, daemon=True)
+                   for _ in range(max(1, self.settings['numAnalysisThreads']))]
+        for worker in workers:
+            worker.start()
+        log("Started, ready to begin handling requests")
+
+        for line in sys.stdin:
+            line = line.strip()
+            if line:
+                self.handle(line)
+
+        # stdin closed: like KataGo, finish what was queued and then exit
+        for _ in workers:
+            self.tasks.put((math.inf, next(self.arrivals), None))
+        for worker in workers:
+            worker.join()
+
+    def handle(self, line):
+        try:
+            query = json.loads(line)
+        except json.JSONDecodeError as e:
+            self.write({'error': f"Could not parse input line as json request: {e}"})
+            return
+
+        self.query_count += 1
+        crash_after = self.settings['simCrashAfterQueries']
+        if (crash_after and self.query_count >= crash_after) or \
+                self.crash_rng.random() < self.settings['simCrashProbability']:
+            log(f"Simulated crash while handling query {query.get('id')}")
+            os._exit(3)
+
+        query_id = query.get('id')
+        if query_id is None:
+            self.write({'error': "Request must have a field 'id'"})
+            return
+
+        action = query.get('action')
+        if action == 'query_version':
+            self.write({'id': query_id, 'action': action, 'version': VERSION, 'git_hash': 'simulator'})
+            return
+        if action == 'terminate':
+            self.terminated.add(query.get('terminateId'))
+            self.write({'id': query_id, 'action': action, 'terminateId': query.get('terminateId')})
+            return
+        if action is not None:
+            self.write({'id': query_id, 'error': f"'action' field must be one of the supported actions, got {action}"})
+            return
+
+        moves = query.get('moves', [])
+        turns = query.get('analyzeTurns', [len(moves)])
+        bad = [t for t in turns if not isinstance(t, int) or t < 0 or t > len(moves)]
+        if bad:
+            self.write({'id': query_id, 'error': f"Invalid analyzeTurns value {bad[0]}", 'field': 'analyzeTurns'})
+            return
+        priority = query.get('priority', 0)
+        for turn in turns:
+            self.tasks.put((-priority, next(self.arrivals), Task(query, turn)))
+
+    def worker(self):
+        batch_size = max(1, self.settings['simBatchSize'])
+        per_visit = self.settings['simLatencyPerVisitMs'] / 1000.0
+        overhead = self.settings['simBatchOverhead']
+        while True:
+            task = self.tasks.get()[2]
+            if task is None:
+                return
+            batch = [task]
+            stop = False
+            while len(batch) < batch_size:
+                try:
+                    extra = self.tasks.get_nowait()[2]
+                except queue.Empty:
+                    break
+                if extra is None:
+                    stop = True
+                    break
+                batch.append(extra)
+
+            batch = [t for t in batch if t.query['id'] not in self.terminated]
+            if batch:
+                self.search(batch, per_visit * (1 + overhead * (len(batch) - 1)))
+            if stop:
+                return
+
+    def search(self, batch, per_visit):
+        visits = [int(t.query.get('maxVisits', self.settings['maxVisits'])) for t in batch]
+        total_time = max(visits) * per_visit
+        report_every = min((t.query.get('reportDuringSearchEvery') or 0) for t in batch) or None
+
+        started = time.perf_counter()
+        if report_every:
+            next_report = report_every
+            while next_report < total_time:
+                time.sleep(max(0.0, started + next_report - time.perf_counter()))
+                for task, task_visits in zip(batch, visits):
+                    if task.query.get('reportDuringSearchEvery') and task.query['id'] not in self.terminated:
+                        so_far = max(1, int(task_visits * next_report / total_time))
+                        self.write(self.response(task, so_far, during_search=True))
+                next_report += report_every
+        time.sleep(max(0.0, started + total_time - time.perf_counter()))
+
+        replies = [self.response(task, task_visits, during_search=False) for task, task_visits in zip(batch, visits)]
+        if self.settings['simReorderReplies']:
+            random.Random(self.settings['simSeed'] + len(replies)).shuffle(replies)
+        for reply in replies:
+            self.write(reply)
+
+    def response(self, task, visits, during_search):
+        query = task.query
+        x_size = query.get('boardXSize', 19)
+        y_size = query.get('boardYSize', 19)
+        moves = query.get('moves', [])[:task.turn]
+
+        key = json.dumps([self.settings['simSeed'], x_size, y_size, query.get('rules'), query.get('komi'),
+                          query.get('initialStones', []), moves])
+        rng = random.Random(int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], 'big'))
+
+        occupied = {point.upper() for _, point in query.get('initialStones', [])}
+        occupied.update(point.upper() for _, point in moves)
+        empty = [f"{GTP_COLUMNS[x]}{y + 1}" for y in range(y_size) for x in range(x_size)
+                 if f"{GTP_COLUMNS[x]}{y + 1}" not in occupied]
+        if moves:
+            current_player = 'W' if moves[-1][0].upper() == 'B' else 'B'
+        else:
+            current_player = query.get('initialPlayer', 'B').upper()
+
+        root_score = rng.gauss(0, 8)
+        root_winrate = 1 / (1 + math.exp(-root_score / 5))
+        candidates = rng.sample(empty, min(10, len(empty))) + ['pass']
+        move_infos = []
+        remaining = visits
+        for order, move in enumerate(candidates):
+            move_visits = remaining // 2 if order < len(candidates) - 1 else remaining
+            remaining -= move_visits
+            score = root_score - abs(rng.gauss(0, 1.5)) * order
+            winrate = 1 / (1 + math.exp(-score / 5))
+            move_infos.append({
+                'move': move, 'order': order, 'visits': move_visits,
+                'winrate': winrate, 'scoreLead': score, 'scoreMean': score,
+                'scoreSelfplay': score, 'scoreStdev': 10 + rng.random() * 10,
+                'lcb': winrate - 0.02, 'utility': (winrate - 0.5) * 2, 'utilityLcb': (winrate - 0.5) * 2 - 0.05,
+                'prior': rng.random() / (order + 1), 'pv': [move],
+            })
+
+        result = {
+            'id': query['id'],
+            'isDuringSearch': during_search,
+            'turnNumber': task.turn,
+            'moveInfos': move_infos,
+            'rootInfo': {'currentPlayer': current_player, 'visits': visits, 'winrate': root_winrate,
+                         'scoreLead': root_score, 'scoreSelfplay': root_score,
+                         'utility': (root_winrate - 0.5) * 2},
+        }
+        if query.get('includePolicy'):
+            priors = [rng.random() if f"{GTP_COLUMNS[x]}{y_size - y}" not in occupied else -1.0
+                      for y in range(y_size) for x in range(x_size)] + [rng.random() * 0.01]
+            total = sum(p for p in priors if p > 0)
+            result['policy'] = [p / total if p > 0 else p for p in priors]
+        if query.get('includeOwnership'):
+            result['ownership'] = [rng.uniform(-1, 1) for _ in range(x_size * y_size)]
+        return result
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] not in ('analysis', 'tuner'):
+        log("Usage: katago_simulator.py analysis -config CONFIG -model MODEL [-override-config k=v,...]")
+        return 1
+    if argv[1] == 'tuner':
+        log("Simulator: nothing to tune")
+        return 0
+    Simulator(load_settings(argv[2:])).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,227 @@
+"""Offline load test for the Flask app.
+
+Builds (or reuses) a seeded SQLite database of synthetic problems, boots
+``create_app`` against it and drives concurrent simulated users through full
+challenges: /play, then /problem/<id>/<n> and /submit_response for every problem.
+Login is bypassed by writing the Flask-Login session key directly, so no Google
+round-trip is involved.
+
+    python adhoc/load_test.py --problems 10000 --problems 100000 --users 16
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import click
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+BOARD_SIZE = 19
+INSERT_BATCH = 10000
+ROUTES = ['/play', '/problem/<id>/<n>', '/submit_response']
+
+
+def make_config(db_path):
+    class LoadTestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+        SGF_PROCESSED_DIR = os.path.join(os.path.dirname(db_path), 'no-sgf-import')
+        GOOGLE_CLIENT_ID = 'load-test'
+    return LoadTestConfig
+
+
+def synthetic_problem(rng, index):
+    """A corner position shaped like the converter's output, unique per index."""
+    corner = [(r, c) for r in range(7) for c in range(7)]
+    stones = rng.sample(corner, rng.randint(8, 20))
+    half = len(stones) // 2
+    black = ''.join(f"[{chr(97 + c)}{chr(97 + r)}]" for r, c in stones[:half])
+    white = ''.join(f"[{chr(97 + c)}{chr(97 + r)}]" for r, c in stones[half:])
+    is_tenuki = rng.random() < 0.5
+    color_to_play = 'W' if is_tenuki else 'B'
+    problem_type = rng.choice(['kill', 'save'])
+    answer = 'NO' if is_tenuki else 'YES'
+    sgf_content = (f"(;FF[4]GM[1]CA[UTF-8]AP[Tsumego Solver:1.0]ST[2]RU[Japanese]SZ[{BOARD_SIZE}]KM[0.00]"
+                   f"PL[{color_to_play}]SO[loadtest:{index}]"
+                   f"C[Can {color_to_play} {problem_type} the marked stone? Correct answer: {answer}]"
+                   f"AB{black}AW{white})")
+    return {
+        'id': uuid.UUID(int=rng.getrandbits(128)),
+        'hash': hashlib.sha256(sgf_content.encode()).hexdigest(),
+        'problem_type': 'tsumego',
+        'board_image': f"loadtest_{index}.sgf",
+        'color_to_move': color_to_play.lower(),
+        'correct_response_play': answer,
+        'correct_response_tenuki': 'NO' if answer == 'YES' else 'YES',
+        'sgf_content': sgf_content,
+    }
+
+
+def build_corpus(app, problem_count, user_count, seed):
+    from app.db import db
+    from app.problem import Problem
+    from app.user import User
+
+    with app.app_context():
+        existing = Problem.query.count()
+        if existing == problem_count:
+            click.echo(f"Reusing corpus of {existing} problems")
+        else:
+            if existing:
+                raise click.ClickException(f"Database already holds {existing} problems; delete it or pick another --workdir")
+            rng = random.Random(seed)
+            started = time.perf_counter()
+            for start in range(0, problem_count, INSERT_BATCH):
+                rows = [synthetic_problem(rng, i) for i in range(start, min(start + INSERT_BATCH, problem_count))]
+                db.session.execute(Problem.__table__.insert(), rows)
+                db.session.commit()
+            click.echo(f"Generated {problem_count} problems in {time.perf_counter() - started:.1f}s")
+
+        user_ids = []
+        for i in range(user_count):
+            email = f"loadtest{i}@example.invalid"
+            user = User.query.filter_by(email=email).first()
+            if not user:
+                user = User(email=email)
+                db.session.add(user)
+                db.session.commit()
+            user_ids.append(user.id)
+        return user_ids
+
+
+def simulated_user(app, user_id, challenges, seed, timings, errors, lock):
+    """Play ``challenges`` full challenges as one logged-in user."""
+    rng = random.Random(seed)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)  # What login_user() stores; skips the Google flow
+        session['_fresh'] = True
+
+    def timed(route, call):
+        started = time.perf_counter()
+        try:
+            response = call()
+        except Exception as e:
+            with lock:
+                errors[route].append(str(e))
+            return None
+        elapsed = time.perf_counter() - started
+        with lock:
+            timings[route].append(elapsed)
+            if response.status_code >= 400:
+                errors[route].append(f"HTTP {response.status_code}")
+        return response
+
+    for _ in range(challenges):
+        response = timed('/play', lambda: client.get('/play'))
+        if response is None or response.status_code != 302 or '/problem/' not in response.location:
+            continue
+        challenge_id = response.location.split('/problem/')[1].split('/')[0]
+
+        problem_index = 0
+        while True:
+            response = timed('/problem/<id>/<n>', lambda: client.get(f'/problem/{challenge_id}/{problem_index}'))
+            if response is None or response.status_code != 200:
+                break  # Redirected back to the dashboard after the last problem
+            answer = rng.choice(['YES', 'NO'])
+            timed('/submit_response', lambda: client.post('/submit_response', json={
+                'challenge_id': challenge_id, 'problem_index': problem_index, 'response': answer}))
+            problem_index += 1
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(app, user_ids, challenges, seed):
+    timings = defaultdict(list)
+    errors = defaultdict(list)
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=simulated_user, args=(app, user_id, challenges, seed + i, timings, errors, lock))
+        for i, user_id in enumerate(user_ids)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    report = {'wall_seconds': wall, 'routes': {}}
+    for route in ROUTES:
+        values = sorted(timings[route])
+        report['routes'][route] = {
+            'requests': len(values),
+            'errors': len(errors[route]),
+            'throughput_rps': len(values) / wall if wall else 0.0,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+        }
+    total = sum(len(v) for v in timings.values())
+    report['total_requests'] = total
+    report['throughput_rps'] = total / wall if wall else 0.0
+    report['sample_errors'] = {route: errs[:5] for route, errs in errors.items()}
+    report['user_cache'] = app.extensions['user_cache'].stats()
+    return report
+
+
+def print_report(problem_count, report):
+    click.echo(f"\n{problem_count} problems: {report['total_requests']} requests in {report['wall_seconds']:.1f}s "
+               f"({report['throughput_rps']:.1f} req/s)")
+    click.echo(f"{'route':<20}{'reqs':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in report['routes'].items():
+        click.echo(f"{route:<20}{stats['requests']:>8}{stats['errors']:>8}{stats['throughput_rps']:>10.1f}"
+                   f"{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    cache = report['user_cache']
+    click.echo(f"user cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%} hit rate)")
+    for route, errs in report['sample_errors'].items():
+        if errs:
+            click.echo(f"  {route} errors, e.g.: {errs}")
+
+
+@click.command()
+@click.option('--problems', type=int, multiple=True, default=[10000], show_default=True,
+              help="Corpus size to test; repeat for several (e.g. 10000, 100000, 1000000)")
+@click.option('--users', type=int, default=8, show_default=True, help="Concurrent simulated users")
+@click.option('--challenges', type=int, default=2, show_default=True, help="Full challenges played per user")
+@click.option('--workdir', type=click.Path(file_okay=False), default='loadtest', show_default=True,
+              help="Where the generated databases are kept between runs")
+@click.option('--seed', type=int, default=1, show_default=True)
+@click.option('--output', type=click.Path(dir_okay=False), help="Also write the report as JSON")
+def load_test(problems, users, challenges, workdir, seed, output):
+    """Drive concurrent simulated users against synthetic problem corpora."""
+    from app.flask_app import create_app
+
+    logging.getLogger('app.logger').setLevel(logging.WARNING)
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {}
+    for problem_count in problems:
+        db_path = os.path.abspath(os.path.join(workdir, f"loadtest_{problem_count}.db"))
+        app = create_app(make_config(db_path))
+        user_ids = build_corpus(app, problem_count, users, seed)
+        report = run_load(app, user_ids, challenges, seed)
+        print_report(problem_count, report)
+        results[problem_count] = report
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({'users': users, 'challenges': challenges, 'seed': seed, 'results': results}, f, indent=2)
+        click.echo(f"\nReport written to {output}")
+
+
+if __name__ == "__main__":
+    load_test()
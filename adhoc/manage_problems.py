@@ -1,11 +1,33 @@
+import hashlib
+import json
+import multiprocessing
 import os
+import re
+import sys
+import threading
+import time
 import click
 import logging
+from datetime import datetime
 from enum import Enum
-from sgfmill import sgf, sgf_moves
+from sgfmill import sgf
 
 INPUT_DIR = 'sgf/raw'
 OUTPUT_DIR = 'sgf/processed'
+# Lives outside OUTPUT_DIR because the importer deletes processed files once loaded
+MANIFEST_PATH = 'sgf/manifest.json'
+MANIFEST_SAVE_EVERY = 500
+DB_BATCH_SIZE = 1000
+ARCHIVE_WINDOW_PER_JOB = 64  # Archive members in flight per worker, so reading never runs far ahead
+VERIFY_NODES = None  # Solver node budget per problem when --verify is on; None skips verification
+REJECT_UNVERIFIED = False  # Also drop problems the solver could not decide within the budget
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.board import board_from_sgf_game  # noqa: E402
+from app.life_and_death import PROVEN, DISPROVEN, UNKNOWN, solve  # noqa: E402
+from app.position_hash import marked_ko_point  # noqa: E402
+from sgf_archives import ARCHIVE_ERRORS, iter_games, iter_sgf_members, member_source  # noqa: E402
 
 
 class VerbosityLevel(Enum):
@@ -36,34 +58,72 @@ def read_sgf(file_path):
         return sgf.Sgf_game.from_bytes(f.read())
 
 
-def find_solution_path(node, path=None):
-    if path is None:
-        path = []
+KILL_KEYWORDS = ('killed', 'dead')
 
-    current_path = path + [node]
 
-    log_message(f"Checking node: {node.get_move()}", VerbosityLevel.DEBUG)
+class NodeInfo:
+    """What a single post-order pass learned about one node of the variation tree."""
+    __slots__ = ('depth', 'is_correct', 'leads_to_correct', 'mentions_kill')
 
-    if node.has_property('C'):
-        comment = ''.join(node.get('C'))
-        log_message(f"Comment found: {comment}", VerbosityLevel.DEBUG)
-        if 'Correct' in comment:
-            log_message(f"Correct solution found at move {node.get_move()}", VerbosityLevel.INFO)
-            return current_path
+    def __init__(self, depth, comment):
+        lowered = comment.lower()
+        self.depth = depth
+        self.is_correct = 'Correct' in comment
+        self.leads_to_correct = self.is_correct
+        self.mentions_kill = any(keyword in lowered for keyword in KILL_KEYWORDS)
 
-    for child in node:
-        solution = find_solution_path(child, current_path)
-        if solution:
-            return solution
 
-    return None
+def annotate_tree(root):
+    """Label every node below ``root`` in one iterative post-order pass.
+
+    Returns a dict of node -> NodeInfo.  ``leads_to_correct`` is true when the
+    node or any descendant carries a "Correct" comment, so the solution path,
+    tenuki check and problem type all become lookups instead of fresh tree walks.
+    """
+    annotation = {}
+    stack = [(root, 0, False)]
+    while stack:
+        node, depth, children_done = stack.pop()
+        if children_done:
+            info = annotation[node]
+            if not info.is_correct:
+                info.leads_to_correct = any(annotation[child].leads_to_correct for child in node)
+            continue
+
+        comment = ''.join(node.get('C')) if node.has_property('C') else ''
+        annotation[node] = NodeInfo(depth, comment)
+        stack.append((node, depth, True))
+        for child in node:
+            stack.append((child, depth + 1, False))
+
+    log_message(f"Annotated {len(annotation)} nodes", VerbosityLevel.DEBUG)
+    return annotation
+
 
+def find_solution_path(node, annotation=None):
+    """Path from ``node`` to the first "Correct" node in depth-first order, or None."""
+    if annotation is None:
+        annotation = annotate_tree(node)
 
-def has_tenuki_paths(node):
+    if not annotation[node].leads_to_correct:
+        return None
+
+    path = [node]
+    while not annotation[node].is_correct:
+        node = next(child for child in node if annotation[child].leads_to_correct)
+        path.append(node)
+
+    log_message(f"Correct solution found at move {node.get_move()}", VerbosityLevel.INFO)
+    return path
+
+
+def has_tenuki_paths(node, annotation=None):
     log_message(f"Checking for tenuki paths in node: {node.get_move()}", VerbosityLevel.DEBUG)
+    if annotation is None:
+        annotation = annotate_tree(node)
 
     for child in node:
-        if not find_solution_path(child):
+        if not annotation[child].leads_to_correct:
             log_message(f"Tenuki path found at move: {child.get_move()}", VerbosityLevel.DEBUG)
             return True
 
@@ -71,17 +131,12 @@ def has_tenuki_paths(node):
     return False
 
 
-def determine_problem_type(solution_path):
+def determine_problem_type(solution_path, annotation=None):
     log_message("Entering determine_problem_type function", VerbosityLevel.DEBUG)
+    if annotation is None:
+        annotation = annotate_tree(solution_path[0])
 
-    is_kill_problem = False
-    for node in solution_path:
-        if node.has_property('C'):
-            comment = ''.join(node.get('C'))
-            log_message(f"Checking comment: {comment}", VerbosityLevel.DEBUG)
-            if 'killed' in comment.lower() or 'dead' in comment.lower():
-                is_kill_problem = True
-                break
+    is_kill_problem = any(annotation[node].mentions_kill for node in solution_path)
 
     problem_type = 'kill' if is_kill_problem else 'save'
 
@@ -91,8 +146,13 @@ def determine_problem_type(solution_path):
     return problem_type
 
 
-def create_output_sgf_string(input_game, solution_path, is_tenuki=False):
-    log_message("Entering create_output_sgf_string function", VerbosityLevel.DEBUG)
+def create_problem_record(input_game, solution_path, is_tenuki=False, annotation=None):
+    """Build one problem as a structured record, with its SGF text alongside the fields the importer needs.
+
+    The keys match the Problem columns, so a record can go straight into the
+    database without the SGF being written out and parsed back in.
+    """
+    log_message("Entering create_problem_record function", VerbosityLevel.DEBUG)
 
     size = input_game.get_size()
     root = input_game.get_root()
@@ -101,8 +161,7 @@ def create_output_sgf_string(input_game, solution_path, is_tenuki=False):
     def to_sgf_coord(row, col):
         return f"{chr(97 + col)}{chr(97 + row)}"
 
-    # Get the board state from SGFMill
-    board, plays = sgf_moves.get_setup_and_moves(input_game)
+    board, plays = board_from_sgf_game(input_game)
 
     ko_point = None
     if is_tenuki and plays:
@@ -112,15 +171,9 @@ def create_output_sgf_string(input_game, solution_path, is_tenuki=False):
         log_message(f"Played tenuki move: {color} at {to_sgf_coord(row, col)}", VerbosityLevel.DEBUG)
 
     # Get stones from the board
-    black_stones = []
-    white_stones = []
-    for row in range(size):
-        for col in range(size):
-            color = board.get(row, col)
-            if color == 'b':
-                black_stones.append(to_sgf_coord(row, col))
-            elif color == 'w':
-                white_stones.append(to_sgf_coord(row, col))
+    black_points, white_points = board.stone_lists()
+    black_stones = [to_sgf_coord(row, col) for row, col in black_points]
+    white_stones = [to_sgf_coord(row, col) for row, col in white_points]
 
     log_message(f"Black stones: {black_stones}", VerbosityLevel.DEBUG)
     log_message(f"White stones: {white_stones}", VerbosityLevel.DEBUG)
@@ -137,7 +190,7 @@ def create_output_sgf_string(input_game, solution_path, is_tenuki=False):
 
     # Determine color to play and problem type
     color_to_play = 'W' if is_tenuki else 'B'
-    problem_type = determine_problem_type(solution_path)
+    problem_type = determine_problem_type(solution_path, annotation)
     if is_tenuki:
         problem_type = 'save' if problem_type == 'kill' else 'kill'
 
@@ -147,6 +200,7 @@ def create_output_sgf_string(input_game, solution_path, is_tenuki=False):
     sgf_string += f"PL[{color_to_play}]"
 
     # Add SO if present in the original SGF
+    source = None
     if root.has_property('SO'):
         source = ''.join(root.get('SO'))
         log_message(f"Source property found: {source}", VerbosityLevel.DEBUG)
@@ -173,63 +227,428 @@ def create_output_sgf_string(input_game, solution_path, is_tenuki=False):
     sgf_string += ")"
 
     log_message(f"Final SGF string: {sgf_string}", VerbosityLevel.DEBUG)
-    log_message("Exiting create_output_sgf_string function", VerbosityLevel.DEBUG)
-
-    return sgf_string
-
+    log_message("Exiting create_problem_record function", VerbosityLevel.DEBUG)
+
+    correct_response = 'NO' if is_tenuki else 'YES'
+    return {
+        'problem_type': 'tsumego',
+        'color_to_move': color_to_play.lower(),
+        'correct_response_play': correct_response,
+        'correct_response_tenuki': 'YES' if is_tenuki else 'NO',
+        'sgf_content': sgf_string,
+        'source': source,
+        'position_key': board.position_key(color_to_play),
+    }
+
+
+def verify_record(record, problem_type):
+    """Check a record's answer with the life-and-death solver: PROVEN/DISPROVEN verdict matches, or not.
+
+    Returns (ok, status).  ``ok`` is None when the solver could not decide, either
+    because the group is not enclosed or the node budget ran out.
+    """
+    game = sgf.Sgf_game.from_string(record['sgf_content'])
+    board, _ = board_from_sgf_game(game)
+    # A tenuki problem starts just after a capture: the immediate recapture is illegal
+    ko_point = marked_ko_point(game)
+    if ko_point is not None:
+        board.ko = board.point(*ko_point)
+    goal = 'kill' if problem_type == 'kill' else 'live'
+    solution = solve(board, record['color_to_move'], goal, max_nodes=VERIFY_NODES)
+    log_message(f"Solver: {record['color_to_move']} to {goal} -> {solution.status} "
+                f"after {solution.nodes} nodes, target {solution.target}, move {solution.move}", VerbosityLevel.DEBUG)
+    if solution.status == UNKNOWN:
+        return None, solution.status
+    expected = PROVEN if record['correct_response_play'] == 'YES' else DISPROVEN
+    return solution.status == expected, solution.status
+
+
+def create_output_sgf_string(input_game, solution_path, is_tenuki=False, annotation=None):
+    return create_problem_record(input_game, solution_path, is_tenuki, annotation)['sgf_content']
+
+
+def convert_sgf(file_path, write_files=True):
+    """Convert one input file into its main and tenuki problem records.
+
+    Each record's ``board_image`` is the output file name; the file itself is
+    only written to OUTPUT_DIR when ``write_files`` is set.
+    """
+    log_message(f"Processing {file_path}", VerbosityLevel.INFO)
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return convert_game(read_sgf(file_path), base_name, write_files, file_path)
+
+
+def convert_game(input_game, base_name, write_files=True, label=None):
+    """Convert an already parsed game; output files are named after ``base_name``."""
+    label = label or base_name
+    root = input_game.get_root()
 
-def process_sgf(file_path):
+    log_message(f"Annotating variation tree", VerbosityLevel.INFO)
+    annotation = annotate_tree(root)
+
+    log_message(f"Searching for solution path", VerbosityLevel.INFO)
+    solution_path = find_solution_path(root, annotation)
+    if not solution_path:
+        raise ValueError("No solution found in the SGF")
+
+    log_message(f"Checking for tenuki paths", VerbosityLevel.INFO)
+    if not has_tenuki_paths(root, annotation):
+        raise ValueError("No tenuki paths found in the SGF")
+
+    records = []
+    seen_keys = set()
+    main_type = determine_problem_type(solution_path, annotation)
+
+    def add_record(record, output_file_name, problem_type):
+        if record['position_key'] in seen_keys:
+            log_message(f"Skipping {output_file_name}: same position as an earlier problem", VerbosityLevel.INFO)
+            return
+        if VERIFY_NODES:
+            ok, status = verify_record(record, problem_type)
+            if ok is False or (ok is None and REJECT_UNVERIFIED):
+                reason = f"solver {status}, expected {record['correct_response_play']}" if ok is False else "solver undecided"
+                if output_file_name.endswith('_main.sgf'):
+                    raise ValueError(f"Main problem rejected: {reason}")
+                log_message(f"Rejecting {output_file_name}: {reason}", VerbosityLevel.WARNING)
+                return
+        seen_keys.add(record['position_key'])
+        record['board_image'] = output_file_name
+        records.append(record)
+        if write_files:
+            output_file_path = os.path.join(OUTPUT_DIR, output_file_name)
+            with open(output_file_path, 'w', encoding='utf-8') as f:
+                f.write(record['sgf_content'])
+            log_message(f"Generated problem SGF: {output_file_path}", VerbosityLevel.INFO)
+
+    # Create main problem
+    add_record(create_problem_record(input_game, solution_path, is_tenuki=False, annotation=annotation),
+               f"{base_name}_main.sgf", main_type)
+
+    # Create tenuki problems
+    # solution_path[1] is the only root child that can be on the solution path
+    solution_child = solution_path[1] if len(solution_path) > 1 else None
+    tenuki_count = 0
+    for child in root:
+        if child is not solution_child:
+            log_message(f"Processing tenuki path: {child.get_move()}", VerbosityLevel.INFO)
+            tenuki_solution_path = [root, child]
+            # The question create_problem_record asks for a tenuki problem
+            tenuki_type = 'save' if determine_problem_type(tenuki_solution_path, annotation) == 'kill' else 'kill'
+            add_record(create_problem_record(input_game, tenuki_solution_path, is_tenuki=True, annotation=annotation),
+                       f"{base_name}_tenuki_{tenuki_count}.sgf", tenuki_type)
+            tenuki_count += 1
+
+    log_message(f"Successfully processed {label}. Generated {len(records)} problem(s).", VerbosityLevel.INFO)
+    return records
+
+
+def process_sgf(file_path, write_files=True, importer=None):
     try:
-        log_message(f"Processing {file_path}", VerbosityLevel.INFO)
-        input_game = read_sgf(file_path)
-
-        log_message(f"Searching for solution path", VerbosityLevel.INFO)
-        solution_path = find_solution_path(input_game.get_root())
-        if not solution_path:
-            raise ValueError("No solution found in the SGF")
-
-        log_message(f"Checking for tenuki paths", VerbosityLevel.INFO)
-        if not has_tenuki_paths(input_game.get_root()):
-            raise ValueError("No tenuki paths found in the SGF")
-
-        # Create main problem
-        output_sgf = create_output_sgf_string(input_game, solution_path, is_tenuki=False)
-        output_file_name = os.path.splitext(os.path.basename(file_path))[0] + '_main.sgf'
-        output_file_path = os.path.join(OUTPUT_DIR, output_file_name)
-        with open(output_file_path, 'w', encoding='utf-8') as f:
-            f.write(output_sgf)
-        log_message(f"Generated main problem SGF: {output_file_path}", VerbosityLevel.INFO)
-
-        # Create tenuki problems
-        tenuki_count = 0
-        for child in input_game.get_root():
-            if child not in solution_path:
-                log_message(f"Processing tenuki path: {child.get_move()}", VerbosityLevel.INFO)
-                tenuki_solution_path = [input_game.get_root(), child]
-                tenuki_sgf = create_output_sgf_string(input_game, tenuki_solution_path, is_tenuki=True)
-                tenuki_file_name = f"{os.path.splitext(os.path.basename(file_path))[0]}_tenuki_{tenuki_count}.sgf"
-                tenuki_file_path = os.path.join(OUTPUT_DIR, tenuki_file_name)
-                with open(tenuki_file_path, 'w', encoding='utf-8') as f:
-                    f.write(tenuki_sgf)
-                log_message(f"Generated tenuki problem SGF: {tenuki_file_path}", VerbosityLevel.INFO)
-                tenuki_count += 1
-
-        log_message(f"Successfully processed {file_path}. Generated {tenuki_count + 1} problem(s).",
-                    VerbosityLevel.INFO)
-        return True, tenuki_count + 1  # +1 for the main problem
+        records = convert_sgf(file_path, write_files)
+        if importer:
+            importer.add(records)
+        return True, len(records)
     except Exception as e:
         log_message(f"Error processing SGF file: {file_path}. Error: {str(e)}", VerbosityLevel.ERROR)
         return False, 0
 
 
+def file_digest(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """The manifest maps input content hash -> outputs/destinations/error, plus a stat cache so unchanged files aren't re-hashed."""
+    if not os.path.exists(path):
+        return {'version': 2, 'inputs': {}, 'files': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+
+
+def recorded_destinations(record):
+    # Version 1 manifests predate --to-db, so their inputs only went to the output directory
+    return set(record.get('destinations', ['files']))
+
+
+def find_pending_files(manifest, retry_failed=False, destinations=('files',)):
+    """Return (pending [(filename, digest)], unchanged count) for the files in INPUT_DIR.
+
+    An input counts as unchanged only if an earlier run already sent its
+    problems to every one of ``destinations`` ('files' and/or 'db').
+    """
+    pending = []
+    unchanged = 0
+    files = {}
+    for entry in os.scandir(INPUT_DIR):
+        if not entry.name.endswith('.sgf'):
+            continue
+        stat = entry.stat()
+        cached = manifest['files'].get(entry.name)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            digest = cached['hash']
+        else:
+            digest = file_digest(entry.path)
+        files[entry.name] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest}
+
+        record = manifest['inputs'].get(digest)
+        if record and not (retry_failed and record['error']) and set(destinations) <= recorded_destinations(record):
+            unchanged += 1
+        else:
+            pending.append((entry.name, digest))
+
+    # Forget inputs that have been removed or changed since
+    present = {cached['hash'] for cached in files.values()}
+    manifest['inputs'] = {digest: record for digest, record in manifest['inputs'].items() if digest in present}
+    manifest['files'] = files
+    manifest['version'] = 2
+    return pending, unchanged
+
+
+def init_worker(verbosity, verify_nodes=None, reject_unverified=False):
+    # Pool workers may be spawned rather than forked, so they need the CLI's settings re-applied
+    global VERIFY_NODES, REJECT_UNVERIFIED
+    VerbosityLevel.current = VerbosityLevel[verbosity.upper()]
+    logger.setLevel(getattr(logging, verbosity.upper()))
+    VERIFY_NODES = verify_nodes
+    REJECT_UNVERIFIED = reject_unverified
+
+
+def convert_for_manifest(task):
+    filename, digest, write_files = task
+    try:
+        return filename, digest, convert_sgf(os.path.join(INPUT_DIR, filename), write_files), None
+    except Exception as e:
+        log_message(f"Error processing SGF file: {filename}. Error: {str(e)}", VerbosityLevel.ERROR)
+        return filename, digest, [], str(e)
+
+
+class DatabaseImporter:
+    """Buffers problem records and inserts them into the Problem table in batches.
+
+    Runs in the parent process only, so SQLite sees a single writer however
+    many conversion workers there are.
+    """
+
+    def __init__(self, batch_size=DB_BATCH_SIZE):
+        from app.flask_app import create_app
+        from app.problem import Problem
+
+        self.problem_model = Problem
+        self.app = create_app()
+        self.batch_size = batch_size
+        self.pending = []
+        self.seen_keys = set()
+        self.inserted = 0
+        self.duplicates = 0
+
+    def add(self, records):
+        for record in records:
+            # Symmetric duplicates from different input files never reach the database
+            if record['position_key'] in self.seen_keys:
+                self.duplicates += 1
+                continue
+            self.seen_keys.add(record['position_key'])
+            self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.app.app_context():
+            inserted = self.problem_model.insert_records(self.pending)
+        self.inserted += inserted
+        self.duplicates += len(self.pending) - inserted
+        self.pending = []
+
+
+def process_all(verbosity, jobs, retry_failed=False, write_files=True, importer=None):
+    manifest = load_manifest()
+    started = time.perf_counter()
+    destinations = (['files'] if write_files else []) + (['db'] if importer else [])
+    pending, unchanged = find_pending_files(manifest, retry_failed, destinations)
+    log_message(f"{len(pending)} new or changed file(s), {unchanged} unchanged", VerbosityLevel.INFO)
+
+    successful = 0
+    failed_files = []
+    total_problems = 0
+    if pending:
+        with multiprocessing.Pool(jobs, initializer=init_worker,
+                                  initargs=(verbosity, VERIFY_NODES, REJECT_UNVERIFIED)) as pool:
+            chunksize = max(1, min(64, len(pending) // (jobs * 4)))
+            tasks = [(filename, digest, write_files) for filename, digest in pending]
+            results = pool.imap_unordered(convert_for_manifest, tasks, chunksize=chunksize)
+            for done, (filename, digest, records, error) in enumerate(results, 1):
+                if importer:
+                    importer.add(records)
+                previous = manifest['inputs'].get(digest)
+                # A failed input is only retried with --retry-failed, whichever destinations it was meant for
+                done_before = recorded_destinations(previous) if previous else set()
+                manifest['inputs'][digest] = {
+                    'file': filename,
+                    'outputs': [record['board_image'] for record in records],
+                    'destinations': sorted(done_before | set(destinations)),
+                    'error': error,
+                    'processed_at': datetime.now().isoformat(timespec='seconds'),
+                }
+                if error:
+                    failed_files.append(filename)
+                else:
+                    successful += 1
+                    total_problems += len(records)
+                if done % MANIFEST_SAVE_EVERY == 0:
+                    if importer:
+                        importer.flush()  # Never record an input as done before its problems are stored
+                    save_manifest(manifest)  # Keep progress if a long run is interrupted
+    if importer:
+        importer.flush()
+    save_manifest(manifest)
+
+    elapsed = time.perf_counter() - started
+    converted = successful + len(failed_files)
+    click.echo(f"Converted {converted} file(s) ({successful} ok, {len(failed_files)} failed), "
+               f"skipped {unchanged} unchanged, generated {total_problems} problem(s) "
+               f"in {elapsed:.1f}s with {jobs} worker(s): "
+               f"{converted / elapsed if elapsed else 0:.1f} files/s, {total_problems / elapsed if elapsed else 0:.1f} problems/s")
+    if importer:
+        click.echo(f"Inserted {importer.inserted} problem(s) into the database, skipped {importer.duplicates} duplicate(s)")
+    if failed_files:
+        log_message("Failed files:", VerbosityLevel.ERROR)
+        for file in failed_files:
+            log_message(file, VerbosityLevel.ERROR)
+
+
+def convert_archive_member(task):
+    """Convert every game in one archive member; returns (member name, records, game count, errors)."""
+    member_name, data, source, write_files = task
+    base_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', os.path.splitext(member_name)[0]).strip('_')
+    try:
+        games = list(iter_games(data))
+    except ValueError as e:
+        log_message(f"Error parsing SGF member: {member_name}. Error: {str(e)}", VerbosityLevel.ERROR)
+        return member_name, [], 0, [f"{member_name}: {e}"]
+
+    records = []
+    errors = []
+    for index, game in enumerate(games):
+        # Collection files get one problem set per game
+        suffix = f"_{index}" if len(games) > 1 else ''
+        label = f"{member_name}#{index}" if len(games) > 1 else member_name
+        game.get_root().set('SO', source + (f"#{index}" if len(games) > 1 else ''))
+        try:
+            records.extend(convert_game(game, base_name + suffix, write_files, label))
+        except Exception as e:
+            log_message(f"Error processing SGF game: {label}. Error: {str(e)}", VerbosityLevel.ERROR)
+            errors.append(f"{label}: {e}")
+    return member_name, records, len(games), errors
+
+
+def iter_archive_tasks(paths, source_prefix, write_files, window, archive_errors):
+    """Archive members as converter tasks; ``window`` is released once per finished task.
+
+    An archive that cannot be read is appended to ``archive_errors`` and the
+    rest of it skipped; members read before the error are still converted.
+    """
+    for path in paths:
+        archive_name = os.path.basename(os.path.normpath(path))
+        try:
+            for member_name, data in iter_sgf_members(path):
+                window.acquire()
+                yield member_name, data, member_source(archive_name, member_name, source_prefix), write_files
+        except ARCHIVE_ERRORS as e:
+            log_message(f"Error reading archive: {path}. Error: {str(e)}", VerbosityLevel.ERROR)
+            archive_errors.append(f"{path}: {e}")
+
+
+def process_archives(paths, verbosity, jobs, write_files=True, importer=None, source_prefix=None):
+    """Stream SGF games out of archives, collections or directories into the converter.
+
+    Nothing is extracted: members are read into memory, their source is set on
+    the parsed game, and the resulting records go to the output directory
+    and/or the importer.
+    """
+    started = time.perf_counter()
+    window = threading.BoundedSemaphore(max(1, jobs) * ARCHIVE_WINDOW_PER_JOB)
+    archive_errors = []
+    tasks = iter_archive_tasks(paths, source_prefix, write_files, window, archive_errors)
+
+    members = 0
+    games = 0
+    failed = []
+    total_problems = 0
+
+    def collect(results):
+        nonlocal members, games, total_problems
+        for member_name, records, game_count, errors in results:
+            window.release()
+            members += 1
+            games += game_count
+            total_problems += len(records)
+            failed.extend(errors)
+            if importer:
+                importer.add(records)
+
+    try:
+        if jobs > 1:
+            with multiprocessing.Pool(jobs, initializer=init_worker,
+                                      initargs=(verbosity, VERIFY_NODES, REJECT_UNVERIFIED)) as pool:
+                collect(pool.imap_unordered(convert_archive_member, tasks, chunksize=8))
+        else:
+            collect(map(convert_archive_member, tasks))
+    finally:
+        # Whatever stopped the run, keep the problems already converted
+        if importer:
+            importer.flush()
+
+    elapsed = time.perf_counter() - started
+    click.echo(f"Read {members} member(s) holding {games} game(s) ({len(failed)} failed), "
+               f"generated {total_problems} problem(s) in {elapsed:.1f}s with {jobs} worker(s): "
+               f"{games / elapsed if elapsed else 0:.1f} games/s, {total_problems / elapsed if elapsed else 0:.1f} problems/s")
+    if importer:
+        click.echo(f"Inserted {importer.inserted} problem(s) into the database, skipped {importer.duplicates} duplicate(s)")
+    if archive_errors:
+        log_message(f"Skipped the rest of {len(archive_errors)} unreadable archive(s):", VerbosityLevel.ERROR)
+        for error in archive_errors:
+            log_message(error, VerbosityLevel.ERROR)
+    if failed:
+        log_message("Failed games:", VerbosityLevel.ERROR)
+        for error in failed:
+            log_message(error, VerbosityLevel.ERROR)
+
+
 @click.command()
 @click.option('--one', type=click.Path(exists=True), help="Process a single SGF file")
-@click.option('--all', is_flag=True, help="Process all SGF files in the input directory")
+@click.option('--all', is_flag=True, help="Process new or changed SGF files in the input directory")
+@click.option('--archive', type=click.Path(exists=True), multiple=True,
+              help="Process every game in a .zip/.tar(.gz) archive, SGF collection file or directory; repeatable")
+@click.option('--source-prefix', help="With --archive, set SO to this prefix plus each member's path "
+                                      "(e.g. https://gogameguru.com/); default is archive/member")
+@click.option('--jobs', type=int, default=os.cpu_count(), show_default=True,
+              help="Worker processes used by --all and --archive")
+@click.option('--retry-failed', is_flag=True, help="With --all, also retry files that failed on an earlier run")
+@click.option('--to-db', is_flag=True, help="Insert the problems straight into the Problem table")
+@click.option('--write-files/--no-write-files', default=None,
+              help="Also export problem SGFs to the output directory (default: only without --to-db)")
+@click.option('--verify', is_flag=True, help="Check every problem's answer with the life-and-death solver "
+                                            "and drop problems it disagrees with")
+@click.option('--verify-nodes', type=int, default=20000, show_default=True, help="Solver node budget per problem")
+@click.option('--reject-unverified', is_flag=True, help="With --verify, also drop problems the solver cannot decide")
 @click.option('--verbosity', type=click.Choice(['error', 'warning', 'info', 'debug']), default='warning',
               help="Set the verbosity level")
-def manage_problems(one, all, verbosity):
-    global VerbosityLevel
+def manage_problems(one, all, archive, source_prefix, jobs, retry_failed, to_db, write_files,
+                    verify, verify_nodes, reject_unverified, verbosity):
+    global VerbosityLevel, VERIFY_NODES, REJECT_UNVERIFIED
     VerbosityLevel.current = VerbosityLevel[verbosity.upper()]
+    VERIFY_NODES = verify_nodes if verify else None
+    REJECT_UNVERIFIED = reject_unverified
 
     logger.setLevel(getattr(logging, verbosity.upper()))
 
@@ -239,43 +658,27 @@ def manage_problems(one, all, verbosity):
         os.makedirs(OUTPUT_DIR)
         log_message(f"Created output directory: {OUTPUT_DIR}", VerbosityLevel.INFO)
 
+    if write_files is None:
+        write_files = not to_db
+    importer = DatabaseImporter() if to_db and (one or all or archive) else None
+
     if one:
         log_message(f"Processing single file: {one}", VerbosityLevel.INFO)
-        result, problem_count = process_sgf(one)
+        result, problem_count = process_sgf(one, write_files, importer)
+        if importer:
+            importer.flush()
         if result:
             log_message(f"Successfully processed {one}. Generated {problem_count} problem(s).", VerbosityLevel.INFO)
         else:
             log_message(f"Failed to process {one}", VerbosityLevel.ERROR)
     elif all:
         log_message("Processing all SGF files in the input directory", VerbosityLevel.INFO)
-        successful = 0
-        failed = 0
-        total_problems = 0
-        failed_files = []
-        for filename in os.listdir(INPUT_DIR):
-            if filename.endswith('.sgf'):
-                file_path = os.path.join(INPUT_DIR, filename)
-                log_message(f"Processing file: {file_path}", VerbosityLevel.INFO)
-                result, problem_count = process_sgf(file_path)
-                if result:
-                    successful += 1
-                    total_problems += problem_count
-                    log_message(f"Successfully processed {filename}. Generated {problem_count} problem(s).",
-                                VerbosityLevel.INFO)
-                else:
-                    failed += 1
-                    failed_files.append(filename)
-                    log_message(f"Failed to process {filename}", VerbosityLevel.ERROR)
-        log_message(f"\nSummary: Processed {successful + failed} files.", VerbosityLevel.INFO)
-        log_message(f"Successful: {successful}", VerbosityLevel.INFO)
-        log_message(f"Failed: {failed}", VerbosityLevel.INFO)
-        log_message(f"Total problems generated: {total_problems}", VerbosityLevel.INFO)
-        if failed_files:
-            log_message("Failed files:", VerbosityLevel.ERROR)
-            for file in failed_files:
-                log_message(file, VerbosityLevel.ERROR)
+        process_all(verbosity, max(1, jobs), retry_failed, write_files, importer)
+    elif archive:
+        log_message(f"Processing SGF games from {len(archive)} archive(s)", VerbosityLevel.INFO)
+        process_archives(archive, verbosity, max(1, jobs), write_files, importer, source_prefix)
     else:
-        log_message("Please provide either --one <filename> or --all option.", VerbosityLevel.ERROR)
+        log_message("Please provide --one <filename>, --all or --archive <path>.", VerbosityLevel.ERROR)
 
 if __name__ == "__main__":
-    manage_problems()
\ No newline at end of file
+    manage_problems()
@@ -0,0 +1,63 @@
+"""Read SGF games straight out of archives and collection files.
+
+``iter_sgf_members`` yields the raw bytes of every ``.sgf`` member of a
+``.zip``, a tar file (plain, ``.gz``, ``.bz2`` or ``.xz``), a directory tree or
+a single file, without extracting anything to disk.  Tar files are read as a
+stream, so a compressed archive is decompressed exactly once, front to back.
+``iter_games`` splits one member into its games, since collection files hold
+many ``(;...)`` game trees back to back.
+"""
+import lzma
+import os
+import tarfile
+import zipfile
+import zlib
+
+from sgfmill import sgf, sgf_grammar
+
+
+# What a truncated or corrupt archive raises part way through iter_sgf_members
+ARCHIVE_ERRORS = (tarfile.TarError, zipfile.BadZipFile, zlib.error, lzma.LZMAError, EOFError, OSError)
+
+
+def is_sgf_name(name):
+    return name.lower().endswith('.sgf')
+
+
+def iter_sgf_members(path):
+    """Yield (member name, bytes) for every SGF file in ``path``."""
+    if os.path.isdir(path):
+        for root, _, files in os.walk(path):
+            for file in sorted(files):
+                if is_sgf_name(file):
+                    full_path = os.path.join(root, file)
+                    with open(full_path, 'rb') as f:
+                        yield os.path.relpath(full_path, path).replace(os.sep, '/'), f.read()
+    elif zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_sgf_name(info.filename):
+                    yield info.filename, archive.read(info)
+    elif tarfile.is_tarfile(path):
+        # 'r|*' reads sequentially and detects the compression itself
+        with tarfile.open(path, 'r|*') as archive:
+            for member in archive:
+                if member.isfile() and is_sgf_name(member.name):
+                    yield member.name, archive.extractfile(member).read()
+    else:
+        with open(path, 'rb') as f:
+            yield os.path.basename(path), f.read()
+
+
+def iter_games(data):
+    """Yield every game in the SGF collection ``data`` as an sgfmill ``Sgf_game``."""
+    for coarse_game in sgf_grammar.parse_sgf_collection(data):
+        yield sgf.Sgf_game.from_coarse_game_tree(coarse_game)
+
+
+def member_source(archive_name, member_name, source_prefix=None):
+    """The SO value for a member: ``source_prefix`` + its path, or else archive/member."""
+    stem = member_name[:-len('.sgf')] if is_sgf_name(member_name) else member_name
+    if source_prefix:
+        return source_prefix + stem
+    return f"{archive_name}/{stem}"
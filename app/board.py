@@ -0,0 +1,335 @@
+"""Array-backed Go board for bulk replay.
+
+sgfmill's ``Board`` recomputes groups by flood fill on every move.  ``GoBoard``
+keeps the position in a flat, edge-padded list and tracks every group's stones
+and liberties incrementally, so a move only touches its neighbours.  It also
+keeps an app.position_hash.PositionHasher current, which gives both the
+Zobrist hash of the position and its canonical key, plus an optional
+positional-superko history and an undo stack; ``snapshot``/``restore`` copy
+the whole state for search code that wants to branch.
+
+Coordinates and colours follow sgfmill: ``(row, col)`` with row 0 at the
+bottom, and colours ``'b'``/``'w'``.  Illegal moves raise ``IllegalMove``, a
+``ValueError`` like sgfmill's.
+"""
+from functools import lru_cache
+
+from app.position_hash import PositionHasher, stone_keys
+
+EMPTY, BLACK, WHITE, EDGE = 0, 1, 2, 3
+_COLOR_CODES = {'b': BLACK, 'w': WHITE}
+_COLOR_NAMES = {BLACK: 'b', WHITE: 'w'}
+
+MAX_BOARD_SIZE = 25
+_HASH_MASK = (1 << 64) - 1  # PositionHasher.hashes holds the position as it stands in its low 64 bits
+
+
+@lru_cache(maxsize=None)
+def _point_keys(size):
+    """PositionHasher stone keys indexed [colour code][padded point], 0 off the board."""
+    stride = size + 1
+    keys = stone_keys(size)
+    table = [None, [0] * ((size + 2) * stride + 1), [0] * ((size + 2) * stride + 1)]
+    for row in range(size):
+        for col in range(size):
+            p = (row + 1) * stride + col
+            table[BLACK][p] = keys['b'][row * size + col]
+            table[WHITE][p] = keys['w'][row * size + col]
+    return table
+
+
+class IllegalMove(ValueError):
+    pass
+
+
+class GoBoard:
+    def __init__(self, size=19, superko=False):
+        if not 1 <= size <= MAX_BOARD_SIZE:
+            raise ValueError(f"Unsupported board size: {size}")
+        self.side = size
+        # One padding column is shared between the right edge of a row and the left edge of the next
+        self.stride = size + 1
+        self.color = [EDGE] * ((size + 2) * self.stride + 1)
+        for row in range(size):
+            start = (row + 1) * self.stride
+            self.color[start:start + size] = [EMPTY] * size
+        self.group = [0] * len(self.color)   # representative point of each stone's group; 0 for empty points
+        self.stones = {}                     # representative -> list of points
+        self.libs = {}                       # representative -> set of liberty points
+        self.ko = None
+        self.hasher = PositionHasher(size)
+        self._keys = _point_keys(size)
+        self.superko = superko
+        self.history = {self.hash} if superko else None
+        self._undo = []
+
+    @property
+    def hash(self):
+        """Zobrist hash of the stones on the board."""
+        return self.hasher.hashes & _HASH_MASK
+
+    # Coordinates
+
+    def point(self, row, col):
+        return (row + 1) * self.stride + col
+
+    def coords(self, point):
+        return point // self.stride - 1, point % self.stride
+
+    # Queries and exports
+
+    def get(self, row, col):
+        return _COLOR_NAMES.get(self.color[self.point(row, col)])
+
+    def list_stones(self):
+        """[(colour, (row, col))], like sgfmill's ``Board.list_occupied_points``."""
+        color = self.color
+        return [(_COLOR_NAMES[color[p]], self.coords(p))
+                for p in range(len(color)) if color[p] == BLACK or color[p] == WHITE]
+
+    def stone_lists(self):
+        """(black points, white points) as lists of (row, col)."""
+        black, white = [], []
+        for name, point in self.list_stones():
+            (black if name == 'b' else white).append(point)
+        return black, white
+
+    def ko_point(self):
+        return self.coords(self.ko) if self.ko is not None else None
+
+    def liberties(self, row, col):
+        p = self.point(row, col)
+        if self.color[p] not in (BLACK, WHITE):
+            return 0
+        return len(self.libs[self.group[p]])
+
+    def position_key(self, to_move='b'):
+        """Canonical, symmetry-normalised key (see app.position_hash) of the current position."""
+        return self.hasher.key(to_move, self.ko_point())
+
+    # Setup
+
+    def setup(self, black=(), white=()):
+        """Place setup stones (no captures); raises IllegalMove if any group is left without liberties."""
+        for points, code in ((black, BLACK), (white, WHITE)):
+            for row, col in points:
+                p = self.point(row, col)
+                if self.color[p] in (BLACK, WHITE):
+                    self.hasher.hashes ^= self._keys[self.color[p]][p]
+                self.color[p] = code
+                self.hasher.hashes ^= self._keys[code][p]
+        self._rebuild_all()
+        if any(not libs for libs in self.libs.values()):
+            raise IllegalMove("setup position not legal")
+        self.ko = None
+        self._undo = []
+        if self.superko:
+            self.history = {self.hash}
+
+    # Moves
+
+    def play(self, row, col, color):
+        """Play a stone; returns the simple-ko point as (row, col), or None."""
+        self._play(self.point(row, col), _COLOR_CODES[color.lower()])
+        return self.ko_point()
+
+    def pass_move(self):
+        self._undo.append((None, None, (), self.ko, self.hasher.hashes))
+        self.ko = None
+
+    def _play(self, p, c):
+        color = self.color
+        if color[p] != EMPTY:
+            raise IllegalMove(f"point {self.coords(p)} is occupied")
+        if p == self.ko:
+            raise IllegalMove(f"point {self.coords(p)} is a ko")
+
+        opp = 3 - c
+        stride = self.stride
+        group = self.group
+        stones = self.stones
+        libs = self.libs
+        keys_opp = self._keys[opp]
+
+        undo_entry = (p, c, [], self.ko, self.hasher.hashes)
+        captured = undo_entry[2]
+        color[p] = c
+        group[p] = p
+        stones[p] = [p]
+        libs[p] = set()
+        mine = p
+        hashes = self.hasher.hashes ^ self._keys[c][p]
+
+        for n in (p - 1, p + 1, p - stride, p + stride):
+            nc = color[n]
+            if nc == EMPTY:
+                libs[mine].add(n)
+            elif nc == c:
+                other = group[n]
+                if other != mine:
+                    # Merge the smaller group into the larger one
+                    if len(stones[other]) > len(stones[mine]):
+                        mine, other = other, mine
+                    moved = stones.pop(other)
+                    for s in moved:
+                        group[s] = mine
+                    stones[mine].extend(moved)
+                    libs[mine] |= libs.pop(other)
+            elif nc == opp:
+                g = group[n]
+                g_libs = libs[g]
+                g_libs.discard(p)
+                if not g_libs:
+                    for s in stones[g]:
+                        color[s] = EMPTY
+                        group[s] = 0
+                        hashes ^= keys_opp[s]
+                        for nn in (s - 1, s + 1, s - stride, s + stride):
+                            if color[nn] == c:
+                                libs[group[nn]].add(s)
+                    captured.extend(stones.pop(g))
+                    del libs[g]
+
+        self.hasher.hashes = hashes
+        own_libs = libs[mine]
+        own_libs.discard(p)
+
+        if not own_libs:
+            self._revert(undo_entry)
+            raise IllegalMove(f"suicide at {self.coords(p)}")
+
+        if len(captured) == 1 and len(stones[mine]) == 1 and len(own_libs) == 1:
+            self.ko = captured[0]
+        else:
+            self.ko = None
+
+        if self.superko:
+            if self.hash in self.history:
+                self._revert(undo_entry)
+                raise IllegalMove(f"move at {self.coords(p)} repeats an earlier position")
+            self.history.add(self.hash)
+        self._undo.append(undo_entry)
+
+    def undo(self):
+        """Take back the last move or pass."""
+        entry = self._undo.pop()
+        if self.superko and entry[0] is not None:
+            self.history.discard(self.hash)
+        self._revert(entry)
+
+    def _revert(self, entry):
+        p, c, captured, previous_ko, previous_hashes = entry
+        self.ko = previous_ko
+        self.hasher.hashes = previous_hashes
+        if p is None:
+            return
+
+        color = self.color
+        stride = self.stride
+        opp = 3 - c
+        color[p] = EMPTY
+        for s in captured:
+            color[s] = opp
+
+        # Everything whose group or liberties the move changed: p's neighbours, the
+        # restored stones, and our groups that had gained liberties from the capture
+        seeds = [n for n in (p - 1, p + 1, p - stride, p + stride) if color[n] == BLACK or color[n] == WHITE]
+        seeds.extend(captured)
+        for s in captured:
+            seeds.extend(n for n in (s - 1, s + 1, s - stride, s + stride) if color[n] == c)
+
+        self.stones.pop(self.group[p], None)
+        self.libs.pop(self.group[p], None)
+        self.group[p] = 0
+        self._rebuild(seeds)
+
+    # Snapshots
+
+    def snapshot(self):
+        """An independent copy of the full state, for ``restore``."""
+        return (self.color[:], self.group[:], {g: s[:] for g, s in self.stones.items()},
+                {g: set(l) for g, l in self.libs.items()}, self.ko, self.hasher.hashes,
+                set(self.history) if self.superko else None, self._undo[:])
+
+    def restore(self, state):
+        color, group, stones, libs, self.ko, self.hasher.hashes, history, undo = state
+        self.color = color[:]
+        self.group = group[:]
+        self.stones = {g: s[:] for g, s in stones.items()}
+        self.libs = {g: set(l) for g, l in libs.items()}
+        self.history = set(history) if history is not None else None
+        self._undo = undo[:]
+
+    def copy(self):
+        board = GoBoard.__new__(GoBoard)
+        board.side = self.side
+        board.stride = self.stride
+        board.superko = self.superko
+        board.hasher = PositionHasher(self.side)
+        board._keys = self._keys
+        board.restore(self.snapshot())
+        return board
+
+    # Group bookkeeping
+
+    def _rebuild_all(self):
+        self.stones = {}
+        self.libs = {}
+        self._rebuild([p for p, code in enumerate(self.color) if code == BLACK or code == WHITE])
+
+    def _rebuild(self, seeds):
+        """Flood-fill the groups containing ``seeds`` and replace their bookkeeping."""
+        color = self.color
+        group = self.group
+        stride = self.stride
+        done = set()
+        stale = set()
+        rebuilt = []
+        for seed in seeds:
+            if seed in done:
+                continue
+            c = color[seed]
+            if c != BLACK and c != WHITE:
+                continue
+            members = [seed]
+            done.add(seed)
+            liberties = set()
+            i = 0
+            while i < len(members):
+                s = members[i]
+                i += 1
+                # Restored captures have no group; anything else names a live record of this group
+                if group[s]:
+                    stale.add(group[s])
+                for n in (s - 1, s + 1, s - stride, s + stride):
+                    nc = color[n]
+                    if nc == EMPTY:
+                        liberties.add(n)
+                    elif nc == c and n not in done:
+                        done.add(n)
+                        members.append(n)
+            rebuilt.append((seed, members, liberties))
+
+        # Drop every old record before adding new ones: a split group's old
+        # representative can be the new representative of one of its parts
+        for old in stale:
+            self.stones.pop(old, None)
+            self.libs.pop(old, None)
+        for seed, members, liberties in rebuilt:
+            for s in members:
+                group[s] = seed
+            self.stones[seed] = members
+            self.libs[seed] = liberties
+
+
+def board_from_sgf_game(game, superko=False):
+    """A GoBoard with the root's setup stones, plus the main-line plays, like sgf_moves.get_setup_and_moves."""
+    board = GoBoard(game.get_size(), superko=superko)
+    black, white, _ = game.get_root().get_setup_stones()
+    board.setup(black, white)
+    plays = []
+    for node in game.get_main_sequence()[1:]:
+        color, move = node.get_move()
+        if color is not None:
+            plays.append((color, move))
+    return board, plays
@@ -0,0 +1,195 @@
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db import db
+from app.challenge import Challenge, Response
+from app.export import iter_rows
+from app.logger import logger
+
+PRIOR_INFORMATION = 0.5   # precision of the N(0, 2) prior a new user or problem starts from
+MAX_INFORMATION = 50.0    # cap on carried-over precision, so abilities can still move as users improve
+DEFAULT_ITERATIONS = 50
+TOLERANCE = 1e-4          # logits; stop once no rating moves further than this in an iteration
+
+
+class UserRating(db.Model):
+    """Fitted ability of a user, in logits: P(correct) = sigmoid(ability - difficulty)."""
+    __tablename__ = 'user_rating'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    ability = db.Column(db.Float, nullable=False, default=0.0)
+    information = db.Column(db.Float, nullable=False, default=PRIOR_INFORMATION)
+    responses = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<UserRating user_id={self.user_id} ability={self.ability:.2f} responses={self.responses}>'
+
+
+class ProblemRating(db.Model):
+    """Fitted difficulty of a problem, in the same logit scale as UserRating.ability."""
+    __tablename__ = 'problem_rating'
+    problem_id = db.Column(UUID(as_uuid=True), db.ForeignKey('problem.id'), primary_key=True)
+    difficulty = db.Column(db.Float, nullable=False, default=0.0, index=True)
+    information = db.Column(db.Float, nullable=False, default=PRIOR_INFORMATION)
+    responses = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ProblemRating problem_id={self.problem_id} difficulty={self.difficulty:.2f} responses={self.responses}>'
+
+
+class CalibrationRun(db.Model):
+    """One calibration pass; the latest run's last_response_id is the incremental watermark."""
+    __tablename__ = 'calibration_run'
+    id = db.Column(db.Integer, primary_key=True)
+    last_response_id = db.Column(db.Integer, nullable=False)
+    responses = db.Column(db.Integer, nullable=False)
+    full = db.Column(db.Boolean, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+# numpy is imported by the functions that use it: flask_app loads this module
+# for its models and command, and web workers never calibrate
+
+def _sigmoid(x):
+    import numpy as np
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def fit_ratings(users, problems, correct, ability, user_information, difficulty, problem_information,
+                iterations=DEFAULT_ITERATIONS, tolerance=TOLERANCE):
+    """Fit a Rasch (1PL) model to one batch of responses.
+
+    ``users``/``problems`` are integer index arrays, one entry per response, into
+    the prior arrays ``ability``/``difficulty``; each rating is pulled towards
+    its prior with weight ``*_information``.  Alternates one Newton step for all
+    abilities with one for all difficulties, each a pair of bincounts over the
+    responses, so an iteration over a million responses takes milliseconds.
+
+    Returns (ability, user_information, difficulty, problem_information), the
+    informations updated to include this batch.
+    """
+    import numpy as np
+    correct = correct.astype(np.float64)
+    prior_ability, prior_difficulty = ability, difficulty
+    ability, difficulty = ability.copy(), difficulty.copy()
+    for iteration in range(iterations):
+        p = _sigmoid(ability[users] - difficulty[problems])
+        gradient = np.bincount(users, correct - p, len(ability)) - user_information * (ability - prior_ability)
+        curvature = np.bincount(users, p * (1 - p), len(ability)) + user_information
+        ability_step = gradient / curvature
+        ability += ability_step
+
+        p = _sigmoid(ability[users] - difficulty[problems])
+        gradient = np.bincount(problems, p - correct, len(difficulty)) - problem_information * (difficulty - prior_difficulty)
+        curvature = np.bincount(problems, p * (1 - p), len(difficulty)) + problem_information
+        difficulty_step = gradient / curvature
+        difficulty += difficulty_step
+
+        if max(np.abs(ability_step).max(initial=0), np.abs(difficulty_step).max(initial=0)) < tolerance:
+            break
+    logger.debug(f"Rating fit stopped after {iteration + 1} iterations")
+
+    p = _sigmoid(ability[users] - difficulty[problems])
+    weight = p * (1 - p)
+    return (ability, user_information + np.bincount(users, weight, len(ability)),
+            difficulty, problem_information + np.bincount(problems, weight, len(difficulty)))
+
+
+def load_responses(after_id=0, batch_size=50000):
+    """Responses above ``after_id`` as (user ids, problem ids, user index, problem index, correct, last id)."""
+    import numpy as np
+    user_index, problem_index = {}, {}
+    users, problems, correct = [], [], []
+    last_id = after_id
+    query = (select(Response.id, Challenge.user_id, Response.problem_id, Response.is_correct)
+             .join(Challenge, Response.challenge_id == Challenge.id))
+    for response_id, user_id, problem_id, is_correct in iter_rows(query, Response.id, after_id, batch_size):
+        users.append(user_index.setdefault(user_id, len(user_index)))
+        problems.append(problem_index.setdefault(problem_id, len(problem_index)))
+        correct.append(is_correct)
+        last_id = response_id
+    return (list(user_index), list(problem_index), np.array(users, dtype=np.intp),
+            np.array(problems, dtype=np.intp), np.array(correct, dtype=bool), last_id)
+
+
+def _priors(model, key_column, value_column, ids, full):
+    """Prior rating and information arrays for ``ids``, and the set of ids already stored."""
+    import numpy as np
+    values = np.zeros(len(ids))
+    information = np.full(len(ids), PRIOR_INFORMATION)
+    responses = np.zeros(len(ids), dtype=np.int64)
+    stored = set()
+    if not full and ids:
+        position = {key: i for i, key in enumerate(ids)}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for key, value, info, count in db.session.query(key_column, value_column, model.information,
+                                                            model.responses).filter(key_column.in_(chunk)):
+                i = position[key]
+                values[i], information[i], responses[i] = value, min(info, MAX_INFORMATION), count
+                stored.add(key)
+    return values, information, responses, stored
+
+
+def _write_back(model, key_name, value_name, ids, values, information, responses, stored):
+    updates, inserts = [], []
+    for key, value, info, count in zip(ids, values.tolist(), information.tolist(), responses.tolist()):
+        row = {key_name: key, value_name: value, 'information': info, 'responses': count}
+        (updates if key in stored else inserts).append(row)
+    if updates:
+        db.session.bulk_update_mappings(model, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(model, inserts)
+
+
+def calibrate(full=False, iterations=DEFAULT_ITERATIONS, batch_size=50000):
+    """Fit ratings to the responses since the last run, or to all of them with ``full``.
+
+    An incremental run starts each user and problem it touches from its stored
+    rating, weighted by the information behind it, so it gives close to the
+    answer a full refit would without rereading history.  Returns the number of
+    responses used.
+    """
+    import numpy as np
+    after_id = 0
+    if not full:
+        after_id = db.session.query(func.max(CalibrationRun.last_response_id)).scalar() or 0
+    user_ids, problem_ids, users, problems, correct, last_id = load_responses(after_id, batch_size)
+    if len(correct) == 0:
+        logger.info(f"No responses since id {after_id}; ratings unchanged")
+        return 0
+
+    ability, user_information, user_responses, stored_users = _priors(
+        UserRating, UserRating.user_id, UserRating.ability, user_ids, full)
+    difficulty, problem_information, problem_responses, stored_problems = _priors(
+        ProblemRating, ProblemRating.problem_id, ProblemRating.difficulty, problem_ids, full)
+
+    ability, user_information, difficulty, problem_information = fit_ratings(
+        users, problems, correct, ability, user_information, difficulty, problem_information, iterations)
+    user_responses += np.bincount(users, minlength=len(user_ids))
+    problem_responses += np.bincount(problems, minlength=len(problem_ids))
+
+    if full:
+        db.session.query(UserRating).delete()
+        db.session.query(ProblemRating).delete()
+    _write_back(UserRating, 'user_id', 'ability', user_ids, ability, user_information, user_responses, stored_users)
+    _write_back(ProblemRating, 'problem_id', 'difficulty', problem_ids, difficulty, problem_information,
+                problem_responses, stored_problems)
+    db.session.add(CalibrationRun(last_response_id=last_id, responses=len(correct), full=full))
+    db.session.commit()
+
+    logger.info(f"Calibrated {len(user_ids)} users and {len(problem_ids)} problems from {len(correct)} responses")
+    return len(correct)
+
+
+@click.command('calibrate-ratings')
+@click.option('--full', is_flag=True, help="Refit from the whole response history instead of since the last run")
+@click.option('--iterations', type=int, default=DEFAULT_ITERATIONS, show_default=True, help="Maximum Newton iterations")
+@with_appcontext
+def calibrate_ratings_command(full, iterations):
+    """Fit problem difficulty and user ability from the response table."""
+    count = calibrate(full=full, iterations=iterations)
+    click.echo(f"Calibrated ratings from {count} responses.")
@@ -42,3 +42,8 @@ class Response(db.Model):
     user_response_tenuki = db.Column(db.String(20), nullable=False)
     is_correct = db.Column(db.Boolean, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # One answer per problem per challenge; submit_response relies on it under concurrent submissions
+    __table_args__ = (
+        db.UniqueConstraint('challenge_id', 'problem_id', name='uq_response_challenge_problem'),
+    )
@@ -3,6 +3,19 @@ from datetime import datetime
 
 db = SQLAlchemy()
 
+
+def upsert(model):
+    """An INSERT for ``model`` that supports ``on_conflict_do_update`` on the bound database."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"No upsert for the {dialect} dialect")
+    return insert(model)
+
+
 class AccessLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
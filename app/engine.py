@@ -0,0 +1,538 @@
+import collections
+import itertools
+import json
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+from sgfmill import sgf
+
+from app.logger import logger
+
+LATENCY_WINDOW = 1000  # replies per lane kept for the latency percentiles
+
+# name -> settings.  Lanes are served in priority order; 'priority' is also passed to
+# KataGo, which searches higher-priority queries first among those it already holds.
+DEFAULT_LANES = {
+    'interactive': {'priority': 10, 'max_visits': None, 'max_in_flight': None},
+    'batch': {'priority': 0, 'max_visits': None, 'max_in_flight': 8},
+}
+
+GTP_COLUMNS = "ABCDEFGHJKLMNOPQRSTUVWXYZ"
+
+DEFAULT_MAX_PENDING = 256     # evaluations one process holds before refusing new ones
+DEFAULT_RESULT_TTL = 300      # seconds a finished evaluation is kept for polling
+
+
+class EngineError(Exception):
+    pass
+
+
+class EngineBusy(EngineError):
+    pass
+
+
+class Lane:
+    """One priority class of queries, with its limits and metrics."""
+
+    def __init__(self, name, priority=0, max_visits=None, max_in_flight=None):
+        self.name = name
+        self.priority = priority
+        self.max_visits = max_visits
+        self.max_in_flight = max_in_flight
+        self.queue = collections.deque()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.visits = 0  # root visits over all final replies
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)   # submitted -> final reply, seconds
+        self.queue_waits = collections.deque(maxlen=LATENCY_WINDOW)  # submitted -> written to the engine
+
+    def can_send(self):
+        return self.queue and (self.max_in_flight is None or self.in_flight < self.max_in_flight)
+
+    def snapshot(self):
+        latencies = sorted(self.latencies)
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+        return {
+            'queued': len(self.queue),
+            'in_flight': self.in_flight,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'visits': self.visits,
+            'p50_ms': percentile(0.50),
+            'p95_ms': percentile(0.95),
+            'p99_ms': percentile(0.99),
+            'mean_queue_wait_ms': sum(self.queue_waits) / len(self.queue_waits) * 1000 if self.queue_waits else None,
+        }
+
+
+class _Query:
+    __slots__ = ('payload', 'lane', 'future', 'expected', 'responses', 'submitted_at', 'written_at', 'on_update')
+
+    def __init__(self, payload, lane, on_update):
+        self.payload = payload
+        self.lane = lane
+        self.future = Future()
+        self.expected = len(payload.get('analyzeTurns') or [None])
+        self.responses = []
+        self.submitted_at = time.perf_counter()
+        self.written_at = None
+        self.on_update = on_update
+
+
+class EngineClient:
+    """Pipelined client for one ``katago analysis`` process, with priority lanes.
+
+    Many queries can be in flight at once; replies are matched back by id.  Each
+    query goes into a lane ('interactive' or 'batch' by default).  Queued queries
+    are always written to the engine in lane priority order, interactive queries
+    can be given their own visit cap, and a lane's ``max_in_flight`` caps how many
+    of its queries the engine holds at once, so a long batch run never fills the
+    engine's queue ahead of a web request.
+
+    With ``cache_size``, identical queries (apart from id and priority) are
+    answered from the last ``cache_size`` results, or share the reply of one
+    already in flight.  ``query_log`` names a file that every query and reply
+    is appended to as raw JSON lines.  ``tracer`` (an engine_trace.Tracer)
+    records the time each query spends in each phase.
+    """
+
+    def __init__(self, command, lanes=None, name='KataGo', cache_size=0, query_log=None, tracer=None):
+        self.command = command
+        self.name = name
+        self.lanes = {lane: Lane(lane, **settings) for lane, settings in (lanes or DEFAULT_LANES).items()}
+        self._by_priority = sorted(self.lanes.values(), key=lambda lane: -lane.priority)
+        self._condition = threading.Condition()
+        self._in_flight = {}
+        self._ids = itertools.count()
+        self._closed = False
+
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()  # query key -> final replies
+        self._shared = {}                        # query key -> Future of the query answering it
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._query_log = open(query_log, 'a', encoding='utf-8') if query_log else None
+        self._log_lock = threading.Lock()
+        self.tracer = tracer
+
+        # Engine busy time: any query written and not yet answered
+        self.started_at = time.perf_counter()
+        self._busy_seconds = 0.0
+        self._busy_since = None
+
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, text=True, bufsize=1)
+        self._threads = [threading.Thread(target=target, name=f"{name}-{target.__name__}", daemon=True)
+                         for target in (self._write_queries, self._read_replies, self._read_stderr)]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Started {name}: {' '.join(command)}")
+
+    def analyse(self, query, lane='batch', on_update=None):
+        """Queue a query; returns a Future of its final replies, one per analysed turn, in turn order.
+
+        ``on_update`` is called from the reader thread with each isDuringSearch reply.
+        """
+        lane = self.lanes[lane]
+        payload = dict(query)
+        if lane.max_visits:
+            payload['maxVisits'] = min(payload.get('maxVisits', lane.max_visits), lane.max_visits)
+        key = json.dumps(payload, sort_keys=True) if self.cache_size and not on_update else None
+        payload['id'] = f"{lane.name}-{next(self._ids)}"
+        if lane.priority:
+            payload.setdefault('priority', lane.priority)
+
+        item = _Query(payload, lane, on_update)
+        with self._condition:
+            if self._closed:
+                raise EngineError(f"{self.name} is closed")
+            if key is not None:
+                shared = self._cache_lookup(key)
+                if shared is not None:
+                    return shared
+                self._shared[key] = item.future
+                item.future.add_done_callback(lambda future: self._cache_store(key, future))
+            lane.queue.append(item)
+            lane.submitted += 1
+            self._condition.notify_all()
+        return item.future
+
+    def query(self, query, lane='batch', timeout=None):
+        return self.analyse(query, lane).result(timeout)
+
+    def metrics(self):
+        with self._condition:
+            return {name: lane.snapshot() for name, lane in self.lanes.items()}
+
+    def totals(self):
+        """Counters summed over lanes, plus engine busy time and cache use, for throughput monitoring."""
+        now = time.perf_counter()
+        with self._condition:
+            lanes = self.lanes.values()
+            busy = self._busy_seconds + (now - self._busy_since if self._busy_since is not None else 0.0)
+            return {
+                'uptime': now - self.started_at,
+                'busy_seconds': busy,
+                'queued': sum(len(lane.queue) for lane in lanes),
+                'in_flight': sum(lane.in_flight for lane in lanes),
+                'submitted': sum(lane.submitted for lane in lanes),
+                'completed': sum(lane.completed for lane in lanes),
+                'failed': sum(lane.failed for lane in lanes),
+                'visits': sum(lane.visits for lane in lanes),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+            }
+
+    def close(self, timeout=5):
+        """Stop accepting queries, let the engine finish what it holds, then shut it down."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            unsent = [item for lane in self.lanes.values() for item in lane.queue]
+            for lane in self.lanes.values():
+                lane.failed += len(lane.queue)
+                lane.queue.clear()
+            self._condition.notify_all()
+        for item in unsent:
+            item.future.set_exception(EngineError(f"{self.name} closed before the query was sent"))
+
+        self._threads[0].join(timeout)
+        try:
+            self.process.stdin.close()  # KataGo finishes the queries it has, then exits
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        for thread in self._threads[1:]:
+            thread.join(timeout)
+        if self._query_log:
+            self._query_log.close()
+        logger.info(f"Closed {self.name}")
+
+    # Result cache; called with the condition held
+
+    def _cache_lookup(self, key):
+        replies = self._cache.get(key)
+        if replies is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            future = Future()
+            future.set_result([dict(reply) for reply in replies])  # Callers may edit their replies
+            return future
+        original = self._shared.get(key)
+        if original is not None:
+            self.cache_hits += 1
+            future = Future()
+            original.add_done_callback(lambda done: _copy_outcome(done, future))
+            return future
+        self.cache_misses += 1
+        return None
+
+    def _cache_store(self, key, future):
+        with self._condition:
+            self._shared.pop(key, None)
+            if future.exception() is None:
+                self._cache[key] = [dict(reply) for reply in future.result()]
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+    def _log(self, direction, line):
+        if self._query_log:
+            with self._log_lock:
+                self._query_log.write(f'{{"t": {time.time():.6f}, "{direction}": {line}}}\n')
+
+    # Threads
+
+    def _next_query(self):
+        for lane in self._by_priority:
+            if lane.can_send():
+                return lane.queue.popleft()
+        return None
+
+    def _write_queries(self):
+        while True:
+            with self._condition:
+                item = self._next_query()
+                while item is None and not self._closed:
+                    self._condition.wait()
+                    item = self._next_query()
+                if item is None:
+                    return
+                item.lane.in_flight += 1
+                item.lane.queue_waits.append(time.perf_counter() - item.submitted_at)
+                if not self._in_flight:
+                    self._busy_since = time.perf_counter()
+                self._in_flight[item.payload['id']] = item
+            try:
+                if self.tracer:
+                    self._write_traced(item)
+                else:
+                    line = json.dumps(item.payload)
+                    self.process.stdin.write(line + "\n")
+                    self.process.stdin.flush()
+                    self._log('query', line)
+            except (OSError, ValueError) as e:
+                self._fail_in_flight(EngineError(f"Could not write to {self.name}: {e}"))
+                return
+
+    def _write_traced(self, item):
+        tracer = self.tracer
+        query_id = item.payload['id']
+        turns = item.payload.get('analyzeTurns')
+        tracer.async_span('queued', query_id, item.submitted_at, id=query_id, turns=turns)
+        with tracer.span('json.dumps', id=query_id, turns=turns):
+            line = json.dumps(item.payload)
+        with tracer.span('write', id=query_id, turns=turns, bytes=len(line) + 1):
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        item.written_at = tracer.now()
+        self._log('query', line)
+
+    def _read_replies(self):
+        tracer = self.tracer
+        readline = self.process.stdout.readline
+        while True:
+            started = tracer.now() if tracer else None
+            line = readline()
+            if not line:
+                break
+            read_at = tracer.now() if tracer else None
+            line = line.strip()
+            if not line:
+                continue
+            self._log('reply', line)
+            try:
+                reply = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"{self.name} returned invalid JSON: {line}")
+                continue
+            if tracer:
+                query_id, turn = reply.get('id'), reply.get('turnNumber')
+                tracer.complete('readline', started, read_at, id=query_id, turn=turn, bytes=len(line) + 1)
+                tracer.complete('json.loads', read_at, id=query_id, turn=turn)
+            with self._condition:
+                item = self._in_flight.get(reply.get('id'))
+            if item is None:
+                logger.warning(f"{self.name} reply for an unknown query: {line[:200]}")
+            elif 'error' in reply:
+                self._finish(item, EngineError(f"{self.name} rejected query: {reply['error']}"))
+            elif 'warning' in reply and 'turnNumber' not in reply:
+                logger.warning(f"{self.name} warning for query {reply['id']}: {reply['warning']}")
+            elif reply.get('isDuringSearch'):
+                if item.on_update:
+                    item.on_update(reply)
+            else:
+                item.responses.append(reply)
+                if len(item.responses) == item.expected:
+                    if tracer and item.written_at is not None:
+                        tracer.async_span('search', item.payload['id'], item.written_at, id=item.payload['id'],
+                                          turns=item.payload.get('analyzeTurns'),
+                                          visits=[r.get('rootInfo', {}).get('visits') for r in item.responses])
+                    self._finish(item)
+        try:
+            code = self.process.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            code = None
+        self._fail_in_flight(EngineError(f"{self.name} exited (code {code})"))
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            if line.strip():
+                logger.info(f"{self.name}: {line.strip()}")
+
+    def _finish(self, item, error=None):
+        with self._condition:
+            self._in_flight.pop(item.payload['id'], None)
+            if not self._in_flight and self._busy_since is not None:
+                self._busy_seconds += time.perf_counter() - self._busy_since
+                self._busy_since = None
+            item.lane.in_flight -= 1
+            if error:
+                item.lane.failed += 1
+            else:
+                item.lane.completed += 1
+                item.lane.visits += sum(reply.get('rootInfo', {}).get('visits', 0) for reply in item.responses)
+                item.lane.latencies.append(time.perf_counter() - item.submitted_at)
+            self._condition.notify_all()
+        if error:
+            item.future.set_exception(error)
+        else:
+            item.future.set_result(sorted(item.responses, key=lambda reply: reply.get('turnNumber', 0)))
+
+    def _fail_in_flight(self, error):
+        with self._condition:
+            self._closed = True
+            items = list(self._in_flight.values())
+            items.extend(item for lane in self.lanes.values() for item in lane.queue)
+            for lane in self.lanes.values():
+                lane.queue.clear()
+            self._condition.notify_all()
+        for item in items:
+            if item.payload['id'] in self._in_flight:
+                self._finish(item, error)
+            else:
+                item.lane.failed += 1
+                item.future.set_exception(error)
+
+
+def _copy_outcome(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result([dict(reply) for reply in source.result()])
+
+
+class EngineService:
+    """The app's shared EngineClient plus the evaluations waiting on it.
+
+    Engine-backed routes never wait for a search: ``submit`` queues the query in
+    the interactive lane and returns an id straight away, and the client polls
+    for the result.  The WSGI thread is free again as soon as the query is
+    queued, so one process can hold ``ENGINE_MAX_PENDING`` evaluations while
+    every other route keeps its normal latency.  The engine process itself is
+    only started by the first evaluation.
+    """
+
+    def __init__(self, app=None):
+        self.command = None
+        self.max_pending = DEFAULT_MAX_PENDING
+        self.result_ttl = DEFAULT_RESULT_TTL
+        self.lanes = DEFAULT_LANES
+        self._client = None
+        self._evaluations = {}  # id -> (future, submitted_at, owner)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        command = app.config.get('ENGINE_COMMAND')
+        self.command = shlex.split(command) if isinstance(command, str) else command
+        self.max_pending = app.config.get('ENGINE_MAX_PENDING', DEFAULT_MAX_PENDING)
+        self.result_ttl = app.config.get('ENGINE_RESULT_TTL', DEFAULT_RESULT_TTL)
+        self.lanes = {
+            'interactive': dict(DEFAULT_LANES['interactive'], max_visits=app.config.get('ENGINE_INTERACTIVE_MAX_VISITS')),
+            'batch': dict(DEFAULT_LANES['batch'],
+                          max_in_flight=app.config.get('ENGINE_BATCH_MAX_IN_FLIGHT', DEFAULT_LANES['batch']['max_in_flight'])),
+        }
+        app.extensions['engine'] = self
+
+    @property
+    def available(self):
+        return bool(self.command)
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None or self._client._closed:
+                if not self.command:
+                    raise EngineError("No ENGINE_COMMAND is configured")
+                try:
+                    self._client = EngineClient(self.command, self.lanes)
+                except OSError as e:
+                    raise EngineError(f"Could not start the engine: {e}") from e
+            return self._client
+
+    def submit(self, query, owner=None, lane='interactive'):
+        """Queue ``query`` and return an evaluation id for ``result``; raises EngineBusy when full."""
+        client = self.client
+        with self._lock:
+            self._prune()
+            pending = sum(1 for future, _, _ in self._evaluations.values() if not future.done())
+            if pending >= self.max_pending:
+                raise EngineBusy(f"{pending} evaluations are already waiting for the engine")
+            evaluation_id = uuid.uuid4().hex
+            self._evaluations[evaluation_id] = (client.analyse(query, lane), time.monotonic(), owner)
+        return evaluation_id
+
+    def result(self, evaluation_id, owner=None):
+        """The Future for an evaluation, or None if it is unknown, expired or someone else's."""
+        with self._lock:
+            entry = self._evaluations.get(evaluation_id)
+        if entry is None or entry[2] != owner:
+            return None
+        return entry[0]
+
+    def metrics(self):
+        with self._lock:
+            pending = sum(1 for future, _, _ in self._evaluations.values() if not future.done())
+            client = self._client
+        return {'pending_evaluations': pending, 'lanes': client.metrics() if client else {}}
+
+    def close(self):
+        with self._lock:
+            client, self._client = self._client, None
+        if client:
+            client.close()
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.result_ttl
+        expired = [key for key, (future, submitted_at, _) in self._evaluations.items()
+                   if future.done() and submitted_at < cutoff]
+        for key in expired:
+            del self._evaluations[key]
+
+
+def gtp_vertex(row, col):
+    """sgfmill (row, col), row 0 at the bottom, as a GTP vertex like 'D4'."""
+    return f"{GTP_COLUMNS[col]}{row + 1}"
+
+
+def pass_value_query(sgf_content, max_visits=None):
+    """One query for a problem position: turn 0 is the position itself, turn 1 is after the player to move passes."""
+    game = sgf.Sgf_game.from_string(sgf_content)
+    root = game.get_root()
+    black, white, _ = root.get_setup_stones()
+    to_move = (root.get('PL') if root.has_property('PL') else 'b').upper()
+    query = {
+        'initialStones': [['B', gtp_vertex(*p)] for p in black] + [['W', gtp_vertex(*p)] for p in white],
+        'initialPlayer': to_move,
+        'moves': [[to_move, 'pass']],
+        'rules': 'japanese',
+        'komi': game.get_komi(),
+        'boardXSize': game.get_size(),
+        'boardYSize': game.get_size(),
+        'analyzeTurns': [0, 1],
+    }
+    if max_visits:
+        query['maxVisits'] = max_visits
+    return query
+
+
+def pass_value(replies):
+    """Points the player to move loses by passing, from the two replies to a pass_value_query.
+
+    Assumes the engine reports scores from Black's point of view
+    (``reportAnalysisWinratesAs = BLACK``, KataGo's example analysis config).
+    Raises EngineError if either reply lacks the fields it needs.
+    """
+    try:
+        play, after_pass = replies
+        to_move = play['rootInfo']['currentPlayer']
+        sign = 1 if to_move == 'B' else -1
+        play_score = sign * play['rootInfo']['scoreLead']
+        pass_score = sign * after_pass['rootInfo']['scoreLead']
+    except (KeyError, TypeError, ValueError) as e:
+        raise EngineError(f"Malformed engine reply: {e!r}") from e
+    return {
+        'player': to_move,
+        'score_if_played': play_score,
+        'score_if_passed': pass_score,
+        'points': play_score - pass_score,
+        'visits': play['rootInfo'].get('visits'),
+    }
@@ -0,0 +1,135 @@
+"""Throughput monitoring for batch runs on an EngineClient.
+
+``ThroughputMonitor`` samples ``EngineClient.totals()`` every ``interval``
+seconds and reports, for the interval just ended:
+
+    positions/s, visits/s   answered queries (cache hits included) and root visits
+    queued, in_flight       queries waiting in the client and held by the engine
+    cache_hit_rate          share of lookups answered without the engine
+    idle                    share of the interval the engine had nothing to search
+    eta                     seconds to answer ``total`` queries at the run's mean rate
+    bound                   'engine' when the engine never ran dry while work was
+                            queued, 'client' when it sat idle waiting for queries
+
+Each sample is appended to ``metrics_file`` as a JSON line and summarised on
+one console status line on stderr.
+"""
+import json
+import sys
+import threading
+import time
+
+DEFAULT_INTERVAL = 5.0
+ENGINE_BOUND_IDLE = 0.05  # engine idle less than this with queries waiting: the engine is the bottleneck
+CLIENT_BOUND_IDLE = 0.25  # engine idle more than this: it is waiting on the client
+
+
+def bottleneck(idle, queued):
+    """'engine', 'client' or 'mixed' for one interval."""
+    if idle < ENGINE_BOUND_IDLE and queued:
+        return 'engine'
+    if idle > CLIENT_BOUND_IDLE:
+        return 'client'
+    return 'mixed'
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return '--:--'
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class ThroughputMonitor:
+    def __init__(self, client, total=None, interval=DEFAULT_INTERVAL, metrics_file=None, status=True):
+        self.client = client
+        self.total = total
+        self.interval = interval
+        self.metrics_file = metrics_file
+        self.status = status
+        self.samples = 0
+        self._start = None
+        self._previous = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._start = self._previous = self.client.totals()
+        self._thread = threading.Thread(target=self._run, name=f"{self.client.name}-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and report the whole run as a final sample."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        final = self.sample(self._start)
+        final['final'] = True
+        final['bound'] = bottleneck(final['idle'], True)  # The queue always drains by the end
+        self._report(final)
+        if self.status:
+            sys.stderr.write("\n")
+        return final
+
+    def sample(self, previous=None):
+        """Metrics for the time since ``previous`` (a totals() snapshot), by default the last sample."""
+        previous = previous or self._previous
+        current = self.client.totals()
+        self._previous = current
+        elapsed = max(current['uptime'] - previous['uptime'], 1e-9)
+        answered = current['completed'] + current['cache_hits']
+        positions = answered - previous['completed'] - previous['cache_hits']
+        busy = current['busy_seconds'] - previous['busy_seconds']
+        lookups = current['cache_hits'] + current['cache_misses'] - previous['cache_hits'] - previous['cache_misses']
+        idle = min(1.0, max(0.0, 1 - busy / elapsed))
+
+        run_seconds = current['uptime'] - self._start['uptime']
+        run_answered = answered - self._start['completed'] - self._start['cache_hits']
+        eta = None
+        if self.total is not None and run_answered:
+            eta = max(0, self.total - run_answered) * run_seconds / run_answered
+
+        return {
+            'time': time.time(),
+            'elapsed': round(run_seconds, 3),
+            'interval': round(elapsed, 3),
+            'answered': run_answered,
+            'total': self.total,
+            'positions_per_second': round(positions / elapsed, 2),
+            'visits_per_second': round((current['visits'] - previous['visits']) / elapsed, 1),
+            'queued': current['queued'],
+            'in_flight': current['in_flight'],
+            'failed': current['failed'] - previous['failed'],
+            'cache_hit_rate': round((current['cache_hits'] - previous['cache_hits']) / lookups, 3) if lookups else None,
+            'idle': round(idle, 3),
+            'eta': round(eta, 1) if eta is not None else None,
+            'bound': bottleneck(idle, current['queued']),
+        }
+
+    def status_line(self, metrics):
+        done = f"{metrics['answered']}/{metrics['total']}" if metrics['total'] is not None else str(metrics['answered'])
+        cache = f" cache {metrics['cache_hit_rate']:.0%}" if metrics['cache_hit_rate'] is not None else ''
+        return (f"{done} | {metrics['positions_per_second']:.1f} pos/s {metrics['visits_per_second']:.0f} visits/s | "
+                f"queued {metrics['queued']} in flight {metrics['in_flight']} | idle {metrics['idle']:.0%}{cache} | "
+                f"{metrics['bound']}-bound | ETA {format_duration(metrics['eta'])}")
+
+    def _report(self, metrics):
+        self.samples += 1
+        if self.metrics_file:
+            with open(self.metrics_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(metrics) + "\n")
+        if self.status:
+            sys.stderr.write("\r\033[K" + self.status_line(metrics))
+            sys.stderr.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._report(self.sample())
@@ -0,0 +1,72 @@
+"""Span tracing for engine queries, written in the Chrome trace event format.
+
+A ``Tracer`` passed to EngineClient (and to the analysis scripts) records how
+long each phase of a query takes, tagged with the query id and turn:
+
+    queued        waiting in the client for a free in-flight slot  (async)
+    json.dumps    serialising the query                            (writer thread)
+    write         writing it down the engine's stdin pipe          (writer thread)
+    search        from the write to the engine's final reply       (async)
+    readline      waiting for and reading one reply line           (reader thread)
+    json.loads    parsing the reply                                (reader thread)
+    wait, process a caller blocking on the result, and handling it (caller's thread)
+
+``save`` writes a {"traceEvents": [...]} file that chrome://tracing and
+https://ui.perfetto.dev open directly, one track per thread plus one per
+in-flight query.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    def __init__(self, path):
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        self._threads = {}
+        self._origin = time.perf_counter()
+
+    def now(self):
+        return time.perf_counter()
+
+    def _us(self, t):
+        return round((t - self._origin) * 1e6, 1)
+
+    def _tid(self):
+        tid = threading.get_ident()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        return tid
+
+    def complete(self, name, start, end=None, cat='engine', **args):
+        """Record a span on the current thread from ``start`` to ``end`` (perf_counter times, default now)."""
+        end = self.now() if end is None else end
+        self.events.append({'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid, 'tid': self._tid(),
+                            'ts': self._us(start), 'dur': round(self._us(end) - self._us(start), 1), 'args': args})
+
+    def async_span(self, name, span_id, start, end=None, cat='engine', **args):
+        """Record a span that is not tied to a thread, such as a query waiting on the engine."""
+        end = self.now() if end is None else end
+        common = {'name': name, 'cat': cat, 'id': span_id, 'pid': self.pid, 'tid': self.pid}
+        self.events.append(dict(common, ph='b', ts=self._us(start), args=args))
+        self.events.append(dict(common, ph='e', ts=self._us(end)))
+
+    @contextmanager
+    def span(self, name, cat='engine', **args):
+        """Time the block as one span; the block may add to the yielded args, e.g. a turn only known at the end."""
+        start = self.now()
+        try:
+            yield args
+        finally:
+            self.complete(name, start, cat=cat, **args)
+
+    def save(self):
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid, 'args': {'name': name}}
+                    for tid, name in list(self._threads.items())]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + list(self.events), 'displayTimeUnit': 'ms'}, f)
+        return len(self.events)
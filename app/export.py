@@ -0,0 +1,155 @@
+import csv
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from app.db import db, AccessLog
+from app.challenge import Challenge, Response
+from app.problem import Problem
+from app.logger import logger
+
+FORMATS = ('csv', 'jsonl')
+WATERMARK_FILE = 'watermark.json'
+DEFAULT_BATCH_SIZE = 5000
+
+
+def response_export():
+    columns = [
+        Response.id, Response.timestamp, Challenge.user_id, Response.challenge_id, Response.problem_id,
+        Response.user_response_play, Response.user_response_tenuki, Response.is_correct,
+        Problem.problem_type, Problem.color_to_move, Problem.correct_response_play,
+        Problem.correct_response_tenuki, Problem.source, Problem.position_key,
+    ]
+    query = (select(*columns)
+             .join(Challenge, Response.challenge_id == Challenge.id)
+             .join(Problem, Response.problem_id == Problem.id))
+    return query, Response.id
+
+
+def access_log_export():
+    return select(AccessLog.id, AccessLog.access_time, AccessLog.user_id, AccessLog.page), AccessLog.id
+
+
+# name -> function returning (select, id column); ids are the incremental watermark
+EXPORTS = {
+    'responses': response_export,
+    'access_log': access_log_export,
+}
+
+
+def iter_rows(query, id_column, after_id=0, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield the rows of ``query`` with ``id_column`` above ``after_id``, in id order.
+
+    Reads keyset pages of ``batch_size`` rows and ends the read transaction after
+    each one, so memory stays at one page and SQLite writers are never held up
+    for longer than a single page read.
+    """
+    last_id = after_id
+    while True:
+        rows = db.session.execute(query.where(id_column > last_id).order_by(id_column).limit(batch_size)).all()
+        db.session.commit()
+        if not rows:
+            return
+        yield from rows
+        last_id = rows[-1][0]
+
+
+def export_column_name(column):
+    # Problem columns sit beside the response's own, so they carry the table name
+    if column.table is Problem.__table__ and not column.name.startswith('problem_'):
+        return f"problem_{column.name}"
+    return column.name
+
+
+def export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def write_rows(path, file_format, header, rows):
+    """Write rows to a gzip CSV or JSONL file; returns (row count, last id)."""
+    count, last_id = 0, None
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f) if file_format == 'csv' else None
+        if writer:
+            writer.writerow(header)
+        for row in rows:
+            values = [export_value(value) for value in row]
+            if writer:
+                writer.writerow(values)
+            else:
+                f.write(json.dumps(dict(zip(header, values))) + "\n")
+            count += 1
+            last_id = row[0]
+    return count, last_id
+
+
+def load_watermarks(output_dir):
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_watermarks(output_dir, watermarks):
+    path = os.path.join(output_dir, WATERMARK_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def export_history(output_dir, tables=tuple(EXPORTS), file_format='csv', full=False, batch_size=DEFAULT_BATCH_SIZE):
+    """Export each table's rows added since its watermark into one new file per table.
+
+    A file is only renamed into place, and its watermark only advanced, once it
+    has been written completely, so an interrupted export is simply redone.
+    ``full`` starts the exported tables from the beginning; the watermarks of
+    tables not in ``tables`` are kept.  Returns {table: (path or None, rows written)}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    watermarks = load_watermarks(output_dir)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    results = {}
+    for table in tables:
+        query, id_column = EXPORTS[table]()
+        after_id = 0 if full else watermarks.get(table, {}).get('last_id', 0)
+        header = [export_column_name(column) for column in query.selected_columns]
+        path = os.path.join(output_dir, f"{table}-{stamp}.{file_format}.gz")
+
+        count, last_id = write_rows(path + '.partial', file_format, header,
+                                    iter_rows(query, id_column, after_id, batch_size))
+        if count == 0:
+            os.remove(path + '.partial')
+            results[table] = (None, 0)
+            logger.info(f"No new {table} rows since id {after_id}")
+            continue
+        os.replace(path + '.partial', path)
+        watermarks[table] = {'last_id': last_id, 'exported_at': datetime.utcnow().isoformat(), 'file': os.path.basename(path)}
+        save_watermarks(output_dir, watermarks)
+        results[table] = (path, count)
+        logger.info(f"Exported {count} {table} rows (ids {after_id + 1}-{last_id}) to {path}")
+    return results
+
+
+@click.command('export-history')
+@click.option('--output-dir', type=click.Path(file_okay=False), required=True, help="Where export files and the watermark go")
+@click.option('--table', 'tables', type=click.Choice(list(EXPORTS)), multiple=True, help="Tables to export (default: all)")
+@click.option('--format', 'file_format', type=click.Choice(FORMATS), default='csv', show_default=True)
+@click.option('--full', is_flag=True, help="Ignore the watermark and export everything")
+@click.option('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, show_default=True, help="Rows read per query")
+@with_appcontext
+def export_history_command(output_dir, tables, file_format, full, batch_size):
+    """Export response and access-log history since the last export, gzip-compressed."""
+    results = export_history(output_dir, tables or tuple(EXPORTS), file_format, full, batch_size)
+    for table, (path, count) in results.items():
+        click.echo(f"{table}: {count} rows" + (f" -> {path}" if path else ""))
@@ -4,18 +4,30 @@ from werkzeug.middleware.proxy_fix import ProxyFix  # Just in dev to handle ngro
 
 from flask import Flask, session
 from flask_login import LoginManager
+from sqlalchemy import inspect
 from app.logger import logger
 from app.db import db
 from app.user import User
 from config import Config
 from app.routes import bp as main_bp
-from app.problem import Problem
+from app.problem import Problem, backfill_position_keys_command
+from app.stats import rebuild_stats_command
+from app.leaderboard import Leaderboard, rebuild_leaderboard_command
+from app.export import export_history_command
+from app.calibration import calibrate_ratings_command
+from app.google_verifier import GoogleTokenVerifier
+from app.user_cache import UserCache
+from app.engine import EngineService
 from flask_migrate import Migrate
 
 login_manager = LoginManager()
 migrate = Migrate()
+google_verifier = GoogleTokenVerifier()
+user_cache = UserCache()
+engine_service = EngineService()
+leaderboard = Leaderboard()
 
-def create_app():
+def create_app(config_object='config.Config'):
     app = Flask(__name__)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)  # Just in dev to handle ngrok
 
@@ -24,7 +36,7 @@ def create_app():
     app.secret_key = os.environ.get("SECRET_KEY") or os.urandom(24)
 
     # Configure the app
-    app.config.from_object('config.Config')
+    app.config.from_object(config_object)
     logger.info(f"App instance path (after loading config): {app.instance_path}")
 
     print(f"GOOGLE_CLIENT_ID: {app.config.get('GOOGLE_CLIENT_ID')}")
@@ -38,10 +50,19 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)  # Initialize Flask-Migrate
     login_manager.init_app(app)
+    google_verifier.init_app(app)
+    user_cache.init_app(app)
+    engine_service.init_app(app)
+    leaderboard.init_app(app)
 
 
     # Register blueprints
     app.register_blueprint(main_bp)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(rebuild_leaderboard_command)
+    app.cli.add_command(export_history_command)
+    app.cli.add_command(calibrate_ratings_command)
+    app.cli.add_command(backfill_position_keys_command)
 
     # Add context processor
     @app.context_processor
@@ -49,22 +70,36 @@ def create_app():
         return dict(user_profile=session.get('user_profile', {}))
 
     with app.app_context():
-        db.create_all()
+        # Once Flask-Migrate manages the schema, create_all would only repeat its work
+        if not inspect(db.engine).has_table('alembic_version'):
+            db.create_all()
         Problem.load_sgf_files()
 
     return app
 
 
+_app = None
+
+
+def get_app():
+    """The app for this process, built on first use and then shared."""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+
+def __getattr__(name):
+    # ``app`` (and ``application_func`` for PythonAnywhere) used to be built at import time
+    if name in ('app', 'application_func'):
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 # User loader function for Flask-Login
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(user_id)  # Updated to query the database
-
-# Create the Flask app instance
-app = create_app()
+    return user_cache.get(user_id)  # Cached for USER_CACHE_TTL seconds
 
 if __name__ == '__main__':
-    app.run(debug=True)
-else:
-    # This block will be executed when running on PythonAnywhere
-    application_func = app
\ No newline at end of file
+    get_app().run(debug=True)
\ No newline at end of file
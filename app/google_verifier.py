@@ -0,0 +1,141 @@
+import json
+import re
+import threading
+import time
+
+from app.logger import logger
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+DEFAULT_CERT_TTL = 300       # seconds, used when the response has no max-age
+MIN_FORCED_REFRESH = 60      # seconds between refetches triggered by an unknown key id
+REFRESH_MARGIN = 0.1         # refresh this fraction of the TTL before expiry (capped at 5 minutes)
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class GoogleTokenVerifier:
+    """Verifies Google ID tokens against a cached copy of Google's signing certificates.
+
+    ``id_token.verify_oauth2_token`` downloads the certificate set on every call.
+    This keeps one pooled HTTP session, honours the Cache-Control max-age of the
+    certificate response and refreshes it on a background timer shortly before it
+    expires, so a login normally costs no outbound request at all.
+    """
+
+    def __init__(self, app=None):
+        self.certs_url = GOOGLE_CERTS_URL
+        self.session = None
+        self._request = None
+        self._certs = None
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._timer = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.certs_url = app.config.get('GOOGLE_CERTS_URL', GOOGLE_CERTS_URL)
+        app.extensions['google_verifier'] = self
+
+    def verify(self, credential, audience):
+        """Decode and verify ``credential``, returning the token's claims."""
+        from google.auth import exceptions, jwt
+
+        certs, fresh = self._get_certs()
+        try:
+            id_info = jwt.decode(credential, certs=certs, audience=audience)
+        except ValueError:
+            # Google may have rotated its keys since we cached them; refetch once, but
+            # not so often that junk tokens can turn us into a cert-download loop.
+            certs = None if fresh else self._refetch(certs)
+            if certs is None:
+                raise
+            id_info = jwt.decode(credential, certs=certs, audience=audience)
+
+        if id_info.get('iss') not in GOOGLE_ISSUERS:
+            raise exceptions.GoogleAuthError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS}")
+
+        return id_info
+
+    def refresh(self):
+        """Fetch the certificate set now and reschedule the background refresh."""
+        with self._lock:
+            return self._fetch()
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self.session:
+            self.session.close()
+
+    def _transport(self):
+        # requests and google.auth are slow to import, so wait for the first login
+        if self._request is None:
+            import requests
+            from google.auth.transport import requests as google_auth_requests
+
+            self.session = requests.Session()
+            self._request = google_auth_requests.Request(session=self.session)
+        return self._request
+
+    def _get_certs(self):
+        """The certificate set, and whether it was fetched for this call or while it waited."""
+        certs = self._certs
+        if certs is not None and time.monotonic() < self._expires_at:
+            return certs, False
+        with self._lock:
+            # Logins that found the cache expired together queue here; only the first fetches
+            if self._certs is not None and time.monotonic() < self._expires_at:
+                return self._certs, True
+            return self._fetch(), True
+
+    def _refetch(self, stale):
+        """Certificates to retry a token with after ``stale`` failed to verify it, or None."""
+        with self._lock:
+            if self._certs is not stale:
+                return self._certs  # Another login refetched while this one waited
+            if time.monotonic() - self._fetched_at < MIN_FORCED_REFRESH:
+                return None
+            return self._fetch()
+
+    def _fetch(self):
+        # Called with self._lock held
+        from google.auth import exceptions
+
+        response = self._transport()(self.certs_url, method='GET')
+        if response.status != 200:
+            raise exceptions.TransportError(f"Could not fetch certificates at {self.certs_url}")
+
+        certs = json.loads(response.data.decode('utf-8'))
+        ttl = self._max_age(response.headers.get('Cache-Control', ''))
+        now = time.monotonic()
+        self._certs = certs
+        self._fetched_at = now
+        self._expires_at = now + ttl
+        logger.debug(f"Fetched {len(certs)} Google signing certificates, caching for {ttl}s")
+        if ttl > MIN_FORCED_REFRESH:
+            self._schedule_refresh(ttl - min(ttl * REFRESH_MARGIN, 300))
+        return certs
+
+    def _schedule_refresh(self, delay):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._background_refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            # Keep serving the cached set until it expires; the next login fetches synchronously
+            logger.warning(f"Background refresh of Google certificates failed: {str(e)}")
+
+    @staticmethod
+    def _max_age(cache_control):
+        match = _MAX_AGE_RE.search(cache_control)
+        return int(match.group(1)) if match else DEFAULT_CERT_TTL
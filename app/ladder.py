@@ -0,0 +1,159 @@
+"""Ladder reading on GoBoard.
+
+``LadderReader.read`` plays out a ladder against the group at ``target``.
+The attacker only ever ataris on one of the group's two liberties; the
+defender extends on its last liberty or captures an adjacent attacker group
+that is itself in atari, which is how ladder breakers and counter-ataris are
+found.  Any stones already on the board in the ladder's path take part
+naturally: a friendly stone gives the extending group a third liberty, and an
+attacker stone takes one away.
+
+Results are memoised on the Zobrist hash of the whole position, the ko point,
+the side to move and the target, so reading the same position again, or
+reaching the same line twice within a read, costs a dictionary lookup.  Any
+stone added anywhere changes the hash, so after a move elsewhere on the board
+the ladder is read afresh: whether it works can depend on attacker groups far
+from its path, which is why the key is not narrowed to the ladder's region.
+"""
+from collections import namedtuple
+
+from app.board import EMPTY, BLACK, WHITE, IllegalMove
+
+DEFAULT_MAX_NODES = 2000
+CACHE_SIZE = 200000  # memoised positions kept before the table is cleared
+
+# captured: True if the ladder works, False if the group escapes, None if the
+# node budget ran out; plies: length of the main line read, up to the capture or
+# the escape; nodes: moves tried
+Ladder = namedtuple('Ladder', 'captured plies nodes')
+
+_OTHER = {'b': 'w', 'w': 'b'}
+
+
+class LadderReader:
+    def __init__(self, max_nodes=DEFAULT_MAX_NODES, cache_size=CACHE_SIZE):
+        self.max_nodes = max_nodes
+        self.cache_size = cache_size
+        self.cache = {}  # (hash, ko, attacker to move, target point) -> (captured, plies)
+        self.hits = 0
+        self._nodes = 0
+
+    def read(self, board, target, attacker_to_move=True):
+        """Read the ladder on the group at ``target`` (row, col); the board is left as it was.
+
+        With ``attacker_to_move`` the group should have two liberties (the
+        attacker ataris next), otherwise one (the defender runs next).
+        """
+        point = board.point(*target)
+        defender = board.get(*target)
+        if defender is None:
+            raise ValueError(f"No stone at {target}")
+        self._nodes = 0
+        try:
+            if attacker_to_move:
+                captured, plies = self._attack(board, point, _OTHER[defender])
+            else:
+                captured, plies = self._defend(board, point, defender)
+        except _OutOfNodes:
+            return Ladder(None, 0, self._nodes)
+        if len(self.cache) > self.cache_size:
+            self.cache.clear()
+        return Ladder(captured, plies, self._nodes)
+
+    def _liberties(self, board, point):
+        return board.libs[board.group[point]]
+
+    def _try(self, board, row_col, color):
+        self._nodes += 1
+        if self._nodes > self.max_nodes:
+            raise _OutOfNodes
+        try:
+            board.play(*row_col, color)
+            return True
+        except IllegalMove:
+            return False
+
+    def _attack(self, board, point, attacker):
+        """Attacker to move: (captured, plies)."""
+        liberties = self._liberties(board, point)
+        if len(liberties) <= 1:
+            return True, 1
+        if len(liberties) > 2:
+            return False, 0
+        key = (board.hash, board.ko, True, point)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        result = (False, 0)
+        for liberty in sorted(liberties):
+            if not self._try(board, board.coords(liberty), attacker):
+                continue
+            try:
+                captured, plies = self._defend(board, point, _OTHER[attacker])
+            finally:
+                board.undo()
+            if captured:
+                result = (True, plies + 1)
+                break
+            result = (False, max(result[1], plies + 1))  # The escape the attacker can delay longest
+        self.cache[key] = result
+        return result
+
+    def _defend(self, board, point, defender):
+        """Defender to move with the group in atari: (captured, plies)."""
+        liberties = self._liberties(board, point)
+        if len(liberties) >= 2:
+            return self._attack(board, point, _OTHER[defender]) if len(liberties) == 2 else (False, 0)
+        key = (board.hash, board.ko, False, point)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        # Capturing an adjacent attacker group in atari comes first: it is what breaks most ladders
+        color = board.color
+        attacker_code = 3 - color[point]
+        candidates = []
+        for stone in board.stones[board.group[point]]:
+            for n in (stone - 1, stone + 1, stone - board.stride, stone + board.stride):
+                if color[n] == attacker_code:
+                    attacker_libs = board.libs[board.group[n]]
+                    if len(attacker_libs) == 1:
+                        candidates.extend(p for p in attacker_libs if p not in candidates)
+        candidates.extend(p for p in liberties if p not in candidates)
+
+        longest = 1
+        for move in candidates:
+            if color[move] != EMPTY or not self._try(board, board.coords(move), defender):
+                continue
+            try:
+                remaining = len(self._liberties(board, point))
+                if remaining >= 3:
+                    captured, plies = False, 0
+                elif remaining == 2:
+                    captured, plies = self._attack(board, point, _OTHER[defender])
+                else:
+                    captured, plies = True, 1  # Self-atari
+            finally:
+                board.undo()
+            if not captured:
+                result = (False, plies + 1)
+                break
+            longest = max(longest, plies + 1)
+        else:
+            result = (True, longest)
+        self.cache[key] = result
+        return result
+
+
+class _OutOfNodes(Exception):
+    pass
+
+
+def ladder_candidates(board, attacker):
+    """Points (row, col) of the attacker's opponent groups that have exactly two liberties."""
+    defender_code = WHITE if attacker == 'b' else BLACK
+    return [board.coords(group) for group, libs in board.libs.items()
+            if len(libs) == 2 and board.color[group] == defender_code]
@@ -0,0 +1,208 @@
+import bisect
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from app.db import db, upsert
+from app.challenge import Challenge, Response
+from app.logger import logger
+
+WINDOWS = ('daily', 'weekly', 'all')
+ALL_TIME = date(1970, 1, 1)  # period_start of the single all-time period
+DEFAULT_REFRESH = 30         # seconds before a ranking is reloaded to pick up other processes' answers
+PENDING_KEY = 'leaderboard_pending'  # session.info key for scores waiting on the commit
+
+
+def period_start(window, when):
+    """First day of the ``window`` period containing ``when``; weeks start on Monday."""
+    day = when.date()
+    if window == 'daily':
+        return day
+    if window == 'weekly':
+        return day - timedelta(days=day.weekday())
+    if window == 'all':
+        return ALL_TIME
+    raise ValueError(f"Unknown leaderboard window {window!r}")
+
+
+class LeaderboardScore(db.Model):
+    """Correct answers per user per period; one row per (window, period, user)."""
+    __tablename__ = 'leaderboard_score'
+    window = db.Column(db.String(10), primary_key=True)
+    period_start = db.Column(db.Date, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    score = db.Column(db.Integer, nullable=False, default=0)
+    # When the current score was reached; earlier wins a tie
+    reached_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_leaderboard_score_ranking', 'window', 'period_start', 'score', 'reached_at'),
+    )
+
+    def __repr__(self):
+        return f'<LeaderboardScore {self.window} {self.period_start} user_id={self.user_id} score={self.score}>'
+
+
+class _Ranking:
+    """Users of one period in rank order, as a sorted list of (-score, reached_at, user_id)."""
+
+    def __init__(self, rows, loaded_at):
+        self.keys = sorted((-score, reached_at, user_id) for user_id, score, reached_at in rows)
+        self.by_user = {key[2]: key for key in self.keys}
+        self.loaded_at = loaded_at
+
+    def set(self, user_id, score, reached_at):
+        old = self.by_user.get(user_id)
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, old)]
+        key = (-score, reached_at, user_id)
+        bisect.insort(self.keys, key)
+        self.by_user[user_id] = key
+
+    def entry(self, index):
+        score, _, user_id = self.keys[index]
+        return {'rank': index + 1, 'user_id': user_id, 'score': -score}
+
+
+class Leaderboard:
+    """Daily, weekly and all-time rankings of correct answers.
+
+    Scores live in ``leaderboard_score`` and are bumped with relative upserts in
+    the answer's own transaction, like the stats tables.  Each process also keeps
+    every period it has been asked about as a sorted list, so top-N, a user's
+    rank and their neighbours are a bisect and a slice whatever the number of
+    answers.  Answers recorded in this process show up as soon as their
+    transaction commits (a rolled back answer never does); answers from other
+    processes once the ranking is older than ``LEADERBOARD_REFRESH``.
+    """
+
+    def __init__(self, app=None):
+        self.refresh = DEFAULT_REFRESH
+        self._rankings = {}  # (window, period_start) -> _Ranking
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.refresh = app.config.get('LEADERBOARD_REFRESH', DEFAULT_REFRESH)
+        if not event.contains(db.session, 'after_commit', self._apply_pending):
+            event.listen(db.session, 'after_commit', self._apply_pending)
+            event.listen(db.session, 'after_rollback', self._discard_pending)
+        app.extensions['leaderboard'] = self
+
+    def record_correct(self, user_id, when=None):
+        """Count one correct answer in every window.
+
+        The caller commits; the in-memory rankings only see the new scores once
+        that commit succeeds.
+        """
+        when = when or datetime.utcnow()
+        pending = db.session.info.setdefault(PENDING_KEY, [])
+        for window in WINDOWS:
+            start = period_start(window, when)
+            insert = upsert(LeaderboardScore).values(window=window, period_start=start, user_id=user_id,
+                                                     score=1, reached_at=when)
+            score = db.session.execute(insert.on_conflict_do_update(
+                index_elements=[LeaderboardScore.window, LeaderboardScore.period_start, LeaderboardScore.user_id],
+                set_=dict(score=LeaderboardScore.score + 1, reached_at=when),
+            ).returning(LeaderboardScore.score)).scalar_one()
+            pending.append((window, start, user_id, score, when))
+
+    def _apply_pending(self, session):
+        pending = session.info.pop(PENDING_KEY, ())
+        with self._lock:
+            for window, start, user_id, score, when in pending:
+                ranking = self._rankings.get((window, start))
+                if ranking is not None:
+                    ranking.set(user_id, score, when)
+
+    def _discard_pending(self, session):
+        session.info.pop(PENDING_KEY, None)
+
+    def top(self, window='all', count=10, when=None):
+        ranking = self._ranking(window, when)
+        with self._lock:
+            return [ranking.entry(i) for i in range(min(count, len(ranking.keys)))]
+
+    def rank(self, window, user_id, when=None):
+        """``{'rank', 'user_id', 'score'}`` for a user, or None if they have no score this period."""
+        ranking = self._ranking(window, when)
+        with self._lock:
+            key = ranking.by_user.get(user_id)
+            if key is None:
+                return None
+            return ranking.entry(bisect.bisect_left(ranking.keys, key))
+
+    def neighbours(self, window, user_id, count=2, when=None):
+        """The user's entry with up to ``count`` entries either side, in rank order."""
+        ranking = self._ranking(window, when)
+        with self._lock:
+            key = ranking.by_user.get(user_id)
+            if key is None:
+                return []
+            index = bisect.bisect_left(ranking.keys, key)
+            return [ranking.entry(i) for i in range(max(0, index - count), min(len(ranking.keys), index + count + 1))]
+
+    def clear(self):
+        with self._lock:
+            self._rankings.clear()
+
+    def _ranking(self, window, when):
+        start = period_start(window, when or datetime.utcnow())
+        now = time.monotonic()
+        with self._lock:
+            ranking = self._rankings.get((window, start))
+            if ranking is not None and now - ranking.loaded_at < self.refresh:
+                return ranking
+        rows = (db.session.query(LeaderboardScore.user_id, LeaderboardScore.score, LeaderboardScore.reached_at)
+                .filter(LeaderboardScore.window == window, LeaderboardScore.period_start == start)
+                .all())
+        ranking = _Ranking(rows, now)
+        with self._lock:
+            # Periods that have ended are never asked for again
+            for key in [key for key in self._rankings if key[0] == window and key[1] != start]:
+                del self._rankings[key]
+            self._rankings[(window, start)] = ranking
+        return ranking
+
+
+def rebuild_leaderboard(batch_size=1000):
+    """Recompute every period of every window from the correct answers in the response table."""
+    scores = {}
+    query = (
+        db.session.query(Challenge.user_id, Response.timestamp)
+        .join(Challenge, Response.challenge_id == Challenge.id)
+        .filter(Response.is_correct.is_(True), Response.timestamp.isnot(None))
+        .order_by(Response.timestamp, Response.id)
+        .yield_per(batch_size)
+    )
+    for user_id, timestamp in query:
+        for window in WINDOWS:
+            entry = scores.setdefault((window, period_start(window, timestamp), user_id), [0, timestamp])
+            entry[0] += 1
+            entry[1] = timestamp
+
+    db.session.query(LeaderboardScore).delete()
+    if scores:
+        db.session.bulk_insert_mappings(LeaderboardScore, [
+            dict(window=window, period_start=start, user_id=user_id, score=score, reached_at=reached_at)
+            for (window, start, user_id), (score, reached_at) in scores.items()
+        ])
+    db.session.commit()
+
+    logger.info(f"Rebuilt {len(scores)} leaderboard scores")
+    return len(scores)
+
+
+@click.command('rebuild-leaderboard')
+@with_appcontext
+def rebuild_leaderboard_command():
+    """Backfill leaderboard_score from the response table."""
+    count = rebuild_leaderboard()
+    current_app.extensions['leaderboard'].clear()
+    click.echo(f"Rebuilt {count} leaderboard scores.")
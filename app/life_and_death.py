@@ -0,0 +1,276 @@
+"""Proof-number search for enclosed life-and-death problems.
+
+``solve`` answers "can the player to move kill (or save) this group?" for
+corner and side problems where the group is shut in by the opponent's wall.
+The search only considers moves inside that enclosure (plus passing):
+
+    attacker wins  when the target group is captured
+    defender wins  when the target group is unconditionally alive (Benson's
+                   algorithm, restricted to the enclosure), or both sides pass
+
+Positional superko keeps every line finite, and a Zobrist-keyed transposition
+table shares solved positions between lines that transpose into each other.
+Results are only as good as the node budget: a search that runs out returns
+UNKNOWN, never a guess.  Like any transposition table combined with
+repetition rules, a cached result can in rare ko fights depend on the path
+that first reached it.
+"""
+from collections import namedtuple
+
+from app.board import EMPTY, BLACK, WHITE, EDGE, GoBoard, IllegalMove
+
+PROVEN, DISPROVEN, UNKNOWN = 'proven', 'disproven', 'unknown'
+GOALS = ('kill', 'live')
+DEFAULT_MAX_NODES = 20000
+MAX_ENCLOSURE = 48  # points; a target whose surroundings are larger is treated as open
+INFINITY = 1 << 30
+
+_CODES = {'b': BLACK, 'w': WHITE}
+_NAMES = {BLACK: 'b', WHITE: 'w'}
+
+# status: PROVEN (the player to move achieves the goal), DISPROVEN or UNKNOWN;
+# move: a winning (row, col), 'pass', or None; target: (row, col) of the group searched
+Solution = namedtuple('Solution', 'status move nodes target')
+
+
+def enclosure(board, target):
+    """Points reachable from the target group without crossing a settled opponent stone, or None if open.
+
+    Opponent stones in groups with two or fewer liberties are crossed, since the
+    defender may be able to capture them.
+    """
+    start = board.point(*target)
+    defender = board.color[start]
+    attacker = 3 - defender
+    color = board.color
+    stride = board.stride
+    seen = {start}
+    stack = [start]
+    while stack:
+        p = stack.pop()
+        for n in (p - 1, p + 1, p - stride, p + stride):
+            if n in seen or color[n] == EDGE:
+                continue
+            if color[n] == attacker and len(board.libs[board.group[n]]) > 2:
+                continue
+            seen.add(n)
+            if len(seen) > MAX_ENCLOSURE:
+                return None
+            stack.append(n)
+    return seen
+
+
+def find_target(board, defender):
+    """The defender's group to search: the enclosed one with fewest liberties, then most stones."""
+    code = _CODES[defender]
+    candidates = []
+    for group, stones in board.stones.items():
+        if board.color[group] != code:
+            continue
+        target = board.coords(group)
+        if enclosure(board, target) is not None:
+            candidates.append((len(board.libs[group]), -len(stones), target))
+    return min(candidates)[2] if candidates else None
+
+
+def benson_alive(board, target, universe):
+    """Whether the target's group is unconditionally alive, judged only inside ``universe``.
+
+    Regions that touch a point outside the universe count as open and never as eyes.
+    """
+    color = board.color
+    stride = board.stride
+    defender = color[board.point(*target)]
+    blocks = {board.group[p] for p in universe if color[p] == defender}
+
+    regions = []
+    seen = set()
+    for p in universe:
+        if p in seen or color[p] == defender:
+            continue
+        members, empties, neighbours, is_open = [p], [], set(), False
+        seen.add(p)
+        i = 0
+        while i < len(members):
+            q = members[i]
+            i += 1
+            if color[q] == EMPTY:
+                empties.append(q)
+            for n in (q - 1, q + 1, q - stride, q + stride):
+                nc = color[n]
+                if nc == EDGE:
+                    continue
+                if n not in universe:
+                    is_open = True
+                elif nc == defender:
+                    neighbours.add(board.group[n])
+                elif n not in seen:
+                    seen.add(n)
+                    members.append(n)
+        if not is_open:
+            regions.append((empties, neighbours))
+
+    # A region is healthy for a block when every empty point in it is one of the block's liberties
+    healthy = {block: [] for block in blocks}
+    for empties, neighbours in regions:
+        for block in neighbours:
+            libs = board.libs[block]
+            if all(p in libs for p in empties):
+                healthy[block].append(neighbours)
+
+    alive = set(blocks)
+    while True:
+        dead = {block for block in alive
+                if sum(1 for neighbours in healthy[block] if neighbours <= alive) < 2}
+        if not dead:
+            break
+        alive -= dead
+    return board.group[board.point(*target)] in alive
+
+
+class _Node:
+    __slots__ = ('move', 'parent', 'children', 'pn', 'dn', 'or_node', 'passes')
+
+    def __init__(self, move, parent, or_node, passes):
+        self.move = move
+        self.parent = parent
+        self.children = None
+        self.pn = 1
+        self.dn = 1
+        self.or_node = or_node
+        self.passes = passes
+
+
+class _Search:
+    def __init__(self, board, to_move, goal, target, universe, max_nodes):
+        self.board = board
+        self.player = to_move
+        self.opponent = 'w' if to_move == 'b' else 'b'
+        self.target_point = board.point(*target)
+        self.target = target
+        self.defender = board.color[self.target_point]
+        self.attacker_is_player = goal == 'kill'
+        self.universe = universe
+        self.moves = [p for p in universe]
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.table = {}  # (hash, colour to move, ko, passes) -> whether the player achieves the goal
+
+    def color_at(self, node):
+        return self.player if node.or_node else self.opponent
+
+    def key(self, node):
+        return self.board.hash, node.or_node, self.board.ko, node.passes
+
+    def outcome(self, passes):
+        """True if the player has won here, False if they have lost, None if play goes on."""
+        if self.board.color[self.target_point] != self.defender:
+            return self.attacker_is_player
+        if passes >= 2 or benson_alive(self.board, self.target, self.universe):
+            return not self.attacker_is_player
+        return None
+
+    def play(self, move, color):
+        if move is None:
+            self.board.pass_move()
+        else:
+            self.board.play(*self.board.coords(move), color)
+
+    def expand(self, node):
+        board = self.board
+        color = self.color_at(node)
+        children = []
+        for move in self.moves + [None]:
+            if move is not None and board.color[move] != EMPTY:
+                continue
+            try:
+                self.play(move, color)
+            except IllegalMove:
+                continue
+            child = _Node(move, node, not node.or_node, node.passes + 1 if move is None else 0)
+            self.nodes += 1
+            result = self.outcome(child.passes)
+            if result is None:
+                result = self.table.get(self.key(child))
+            if result is True:
+                child.pn, child.dn = 0, INFINITY
+            elif result is False:
+                child.pn, child.dn = INFINITY, 0
+            board.undo()
+            children.append(child)
+        node.children = children
+
+    def update(self, node):
+        children = node.children
+        if node.or_node:
+            node.pn = min(child.pn for child in children)
+            node.dn = min(INFINITY, sum(child.dn for child in children))
+        else:
+            node.pn = min(INFINITY, sum(child.pn for child in children))
+            node.dn = min(child.dn for child in children)
+        if node.pn == 0 or node.dn == 0:
+            self.table[self.key(node)] = node.pn == 0
+
+    def run(self):
+        root = _Node(None, None, True, 0)
+        result = self.outcome(0)
+        if result is not None:
+            return root, result
+        self.expand(root)
+        self.update(root)
+        while root.pn and root.dn and self.nodes < self.max_nodes:
+            # Descend to the most-proving leaf, playing the moves on the board
+            node = root
+            while node.children:
+                if node.or_node:
+                    node = next(child for child in node.children if child.pn == node.pn)
+                else:
+                    node = next(child for child in node.children if child.dn == node.dn)
+                self.play(node.move, self.color_at(node.parent))
+            self.expand(node)
+            # Back up proof numbers to the root, taking the moves back
+            while node is not root:
+                self.update(node)
+                if node.pn == 0 or node.dn == 0:
+                    node.children = ()  # Solved subtrees are never searched again
+                self.board.undo()
+                node = node.parent
+            self.update(root)
+        return root, (True if root.pn == 0 else False if root.dn == 0 else None)
+
+
+def solve(board, to_move, goal, target=None, max_nodes=DEFAULT_MAX_NODES):
+    """Can ``to_move`` ('b'/'w') achieve ``goal`` ('kill' or 'live') for the group at ``target``?
+
+    ``target`` defaults to ``find_target`` for the defending colour.  The board
+    is not changed.  Returns a Solution; status is UNKNOWN when the target is
+    not enclosed or the node budget runs out.
+    """
+    if goal not in GOALS:
+        raise ValueError(f"goal must be one of {GOALS}, not {goal!r}")
+    to_move = to_move.lower()
+    defender = to_move if goal == 'live' else ('w' if to_move == 'b' else 'b')
+    if target is None:
+        target = find_target(board, defender)
+        if target is None:
+            return Solution(UNKNOWN, None, 0, None)
+    elif board.get(*target) != defender:
+        raise ValueError(f"No {defender} stone at {target}")
+    universe = enclosure(board, target)
+    if universe is None:
+        return Solution(UNKNOWN, None, 0, target)
+
+    # Search on a private copy with positional superko, so every line ends
+    search_board = GoBoard(board.side, superko=True)
+    search_board.setup(*board.stone_lists())
+    search_board.ko = board.ko
+    search = _Search(search_board, to_move, goal, target, universe, max_nodes)
+    root, result = search.run()
+
+    if result is None:
+        return Solution(UNKNOWN, None, search.nodes, target)
+    move = None
+    if result and root.children:
+        winning = next(child for child in root.children if child.pn == 0)
+        move = 'pass' if winning.move is None else search_board.coords(winning.move)
+    return Solution(PROVEN if result else DISPROVEN, move, search.nodes, target)
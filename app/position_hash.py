@@ -0,0 +1,134 @@
+"""Canonical position keys for spotting duplicate problems.
+
+Two problems are the same if one can be turned into the other by rotating or
+reflecting the board and/or swapping the colours (including whose turn it is).
+Each position is Zobrist-hashed under all 16 of those variants at once, and
+the smallest of the 16 hashes is the canonical key.  The 16 hashes are packed
+into one integer, 64 bits per variant, so adding or removing a stone updates
+all of them with a single XOR: app.board.GoBoard keeps a PositionHasher
+current as it plays, captures and undoes moves.
+
+The random tables come from a fixed seed, so keys are stable across runs and
+can be stored in the database.
+"""
+import random
+from functools import lru_cache
+
+MAX_BOARD_SIZE = 25
+_MASK = (1 << 64) - 1
+
+_rng = random.Random(0x7375_6d65_676f)  # fixed: stored keys must never change
+_STONE = {color: [_rng.getrandbits(64) for _ in range(MAX_BOARD_SIZE * MAX_BOARD_SIZE)] for color in ('b', 'w')}
+_KO = [_rng.getrandbits(64) for _ in range(MAX_BOARD_SIZE * MAX_BOARD_SIZE)]
+_WHITE_TO_MOVE = _rng.getrandbits(64)
+_SIZE = [_rng.getrandbits(64) for _ in range(MAX_BOARD_SIZE + 1)]
+
+_OTHER = {'b': 'w', 'w': 'b'}
+_VARIANTS = 16
+
+
+def _transforms(size):
+    """The 8 board symmetries as functions of (row, col)."""
+    n = size - 1
+    return [
+        lambda r, c: (r, c),
+        lambda r, c: (c, n - r),
+        lambda r, c: (n - r, n - c),
+        lambda r, c: (n - c, r),
+        lambda r, c: (r, n - c),
+        lambda r, c: (n - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (n - c, n - r),
+    ]
+
+
+@lru_cache(maxsize=None)
+def stone_keys(size):
+    """{'b'/'w': [packed hashes of a stone at row * size + col]}, to XOR into ``PositionHasher.hashes``."""
+    transforms = _transforms(size)
+    keys = {}
+    for color, other in _OTHER.items():
+        table = []
+        for row in range(size):
+            for col in range(size):
+                packed = 0
+                for s, transform in enumerate(transforms):
+                    r, c = transform(row, col)
+                    index = r * MAX_BOARD_SIZE + c
+                    packed |= _STONE[color][index] << (128 * s) | _STONE[other][index] << (128 * s + 64)
+                table.append(packed)
+        keys[color] = table
+    return keys
+
+
+class PositionHasher:
+    """Zobrist hashes of one position under all 8 symmetries x 2 colourings.
+
+    ``hashes`` packs the 16 hashes into one integer; variant ``symmetry * 2 +
+    colours_swapped`` is bits 64 * variant and up.  Variant 0, the position as
+    it stands, is the plain Zobrist hash of its stones.
+    """
+
+    def __init__(self, size):
+        if not 1 <= size <= MAX_BOARD_SIZE:
+            raise ValueError(f"Unsupported board size: {size}")
+        self.size = size
+        self._transforms = _transforms(size)
+        self._stones = stone_keys(size)
+        self.hashes = sum(_SIZE[size] << (64 * variant) for variant in range(_VARIANTS))
+
+    def toggle_stone(self, row, col, color):
+        """Add a stone, or remove it if it is already there.  ``color`` is 'b' or 'w'."""
+        self.hashes ^= self._stones[color.lower()][row * self.size + col]
+
+    add_stone = toggle_stone
+    remove_stone = toggle_stone
+
+    def key(self, to_move='b', ko_point=None):
+        """The canonical key: the minimum hash over all 16 variants, as 16 hex digits."""
+        white_to_move = to_move.lower() == 'w'
+        hashes = self.hashes
+        best = None
+        for s, transform in enumerate(self._transforms):
+            ko = 0
+            if ko_point is not None:
+                r, c = transform(*ko_point)
+                ko = _KO[r * MAX_BOARD_SIZE + c]
+            for swapped in (0, 1):
+                value = ((hashes >> (64 * (2 * s + swapped))) & _MASK) ^ ko
+                if white_to_move != bool(swapped):
+                    value ^= _WHITE_TO_MOVE
+                if best is None or value < best:
+                    best = value
+        return f"{best:016x}"
+
+
+def position_key(size, black, white, to_move='b', ko_point=None):
+    """Canonical key for a position given as iterables of (row, col) points."""
+    hasher = PositionHasher(size)
+    for row, col in black:
+        hasher.add_stone(row, col, 'b')
+    for row, col in white:
+        hasher.add_stone(row, col, 'w')
+    return hasher.key(to_move, ko_point)
+
+
+def position_key_from_sgf(game):
+    """Canonical key for the setup position in an sgfmill ``Sgf_game``'s root node.
+
+    Uses AB/AW for the stones, PL for the player to move and MA as the ko point,
+    matching the problems written by the converter.
+    """
+    root = game.get_root()
+    black, white, _ = root.get_setup_stones()
+    to_move = root.get('PL') if root.has_property('PL') else 'b'
+    return position_key(game.get_size(), black, white, to_move, marked_ko_point(game))
+
+
+def marked_ko_point(game):
+    """The (row, col) the converter marks with MA as a problem's ko point, or None."""
+    root = game.get_root()
+    if not root.has_property('MA'):
+        return None
+    marked = root.get('MA')
+    return next(iter(marked)) if marked else None
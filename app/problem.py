@@ -1,3 +1,4 @@
+import click
 import hashlib
 import os
 from app.db import db
@@ -5,6 +6,8 @@ from sqlalchemy.dialects.postgresql import UUID
 import uuid
 from sgfmill import sgf
 from flask import current_app
+from flask.cli import with_appcontext
+from app.position_hash import position_key_from_sgf
 
 
 class Problem(db.Model):
@@ -17,13 +20,19 @@ class Problem(db.Model):
     correct_response_play = db.Column(db.String(20), nullable=False)
     correct_response_tenuki = db.Column(db.String(20), nullable=False)
     sgf_content = db.Column(db.Text, nullable=False)
+    source = db.Column(db.String(256), nullable=True)
+    # Canonical over board symmetries and colour swap, see app/position_hash.py
+    position_key = db.Column(db.String(16), index=True, nullable=True)
+
+    RECORD_FIELDS = ('problem_type', 'board_image', 'color_to_move', 'correct_response_play',
+                     'correct_response_tenuki', 'sgf_content', 'source', 'position_key')
 
     @staticmethod
     def generate_hash(sgf_content):
         return hashlib.sha256(sgf_content.encode()).hexdigest()
 
     def __init__(self, problem_type, board_image, color_to_move, correct_response_play, correct_response_tenuki,
-                 sgf_content):
+                 sgf_content, source=None, position_key=None):
         self.hash = self.generate_hash(sgf_content)
         self.problem_type = problem_type
         self.board_image = board_image
@@ -31,10 +40,45 @@ class Problem(db.Model):
         self.correct_response_play = correct_response_play
         self.correct_response_tenuki = correct_response_tenuki
         self.sgf_content = sgf_content
+        self.source = source
+        self.position_key = position_key
+
+    @classmethod
+    def insert_records(cls, records):
+        """Insert converter records (dicts keyed by RECORD_FIELDS) in one batch.
+
+        Records whose content hash or position key is already stored, or
+        repeated within the batch, are skipped.  Returns the number of rows inserted.
+        """
+        rows = {}
+        keys = set()
+        for record in records:
+            row = {field: record.get(field) for field in cls.RECORD_FIELDS}
+            if row['position_key'] is None:
+                row['position_key'] = position_key_from_sgf(sgf.Sgf_game.from_bytes(row['sgf_content'].encode()))
+            if row['position_key'] in keys:
+                continue
+            keys.add(row['position_key'])
+            row['id'] = uuid.uuid4()
+            row['hash'] = cls.generate_hash(row['sgf_content'])
+            rows.setdefault(row['hash'], row)
+
+        existing_hashes = {h for (h,) in db.session.query(cls.hash).filter(cls.hash.in_(list(rows)))}
+        existing_keys = {k for (k,) in db.session.query(cls.position_key).filter(cls.position_key.in_(list(keys)))}
+        new_rows = [row for content_hash, row in rows.items()
+                    if content_hash not in existing_hashes and row['position_key'] not in existing_keys]
+        if new_rows:
+            db.session.execute(cls.__table__.insert(), new_rows)
+        db.session.commit()
+        return len(new_rows)
 
     @classmethod
     def load_sgf_files(cls):
-        sgf_dir = os.path.join(current_app.root_path, '..', 'sgf', 'processed')
+        sgf_dir = current_app.config['SGF_PROCESSED_DIR']
+        if not os.path.isdir(sgf_dir):
+            current_app.logger.info(f"No SGF directory at {sgf_dir}, skipping import")
+            return
+
         loaded_count = 0
         for filename in os.listdir(sgf_dir):
             if filename.endswith('.sgf'):
@@ -56,11 +100,19 @@ class Problem(db.Model):
                     game = sgf.Sgf_game.from_bytes(sgf_content.encode())
                     root = game.get_root()
 
+                    # Rotations, reflections and colour swaps of an existing problem are duplicates too
+                    key = position_key_from_sgf(game)
+                    if cls.query.filter_by(position_key=key).first():
+                        current_app.logger.info(f"Problem with the same position already exists, skipping: {filename}")
+                        os.remove(file_path)
+                        continue
+
                     # Extract necessary information
                     problem_type = 'tsumego'  # Assuming all are tsumego problems for now
                     board_image = filename  # Using filename as board image for now
-                    color_to_move = root.get('PL')[0].lower()
-                    correct_response = 'YES' if 'Correct answer: YES' in root.get('C')[0] else 'NO'
+                    color_to_move = root.get('PL').lower()
+                    correct_response = 'YES' if 'Correct answer: YES' in root.get('C') else 'NO'
+                    source = root.get('SO') if root.has_property('SO') else None
 
                     # Create Problem instance
                     problem = cls(
@@ -69,7 +121,9 @@ class Problem(db.Model):
                         color_to_move=color_to_move,
                         correct_response_play=correct_response,
                         correct_response_tenuki='NO' if correct_response == 'YES' else 'YES',
-                        sgf_content=sgf_content
+                        sgf_content=sgf_content,
+                        source=source,
+                        position_key=key
                     )
 
                     db.session.add(problem)
@@ -84,4 +138,49 @@ class Problem(db.Model):
                     current_app.logger.error(f"Error processing {filename}: {str(e)}")
 
         current_app.logger.info(f"Loaded {loaded_count} new problems into the database.")
-        current_app.logger.info(f"Total problems in database: {cls.query.count()}")
\ No newline at end of file
+        current_app.logger.info(f"Total problems in database: {cls.query.count()}")
+
+def backfill_position_keys(batch_size=1000):
+    """Compute position keys for rows stored before the column existed.
+
+    Rows are walked in id order, so a row whose SGF cannot be parsed is logged,
+    left without a key and passed over rather than fetched again.
+
+    Returns (rows updated, rows that failed, number of keys shared by more than one problem).
+    """
+    updated = 0
+    failed = 0
+    last_id = None
+    while True:
+        query = Problem.query.filter(Problem.position_key.is_(None))
+        if last_id is not None:
+            query = query.filter(Problem.id > last_id)
+        problems = query.order_by(Problem.id).limit(batch_size).all()
+        if not problems:
+            break
+        for problem in problems:
+            try:
+                problem.position_key = position_key_from_sgf(sgf.Sgf_game.from_bytes(problem.sgf_content.encode()))
+                updated += 1
+            except Exception as e:
+                current_app.logger.warning(f"Could not compute a position key for problem {problem.id}: {str(e)}")
+                failed += 1
+        last_id = problems[-1].id
+        db.session.commit()
+
+    duplicated = (db.session.query(Problem.position_key)
+                  .filter(Problem.position_key.isnot(None))
+                  .group_by(Problem.position_key)
+                  .having(db.func.count() > 1)
+                  .count())
+    return updated, failed, duplicated
+
+
+@click.command('backfill-position-keys')
+@with_appcontext
+def backfill_position_keys_command():
+    """Fill in problem.position_key for existing rows and report duplicates."""
+    updated, failed, duplicated = backfill_position_keys()
+    click.echo(f"Computed {updated} position key(s); {duplicated} position(s) are stored more than once.")
+    if failed:
+        click.echo(f"{failed} problem(s) could not be parsed and still have no key; see the log.")
@@ -3,16 +3,16 @@ from flask import Blueprint, render_template, jsonify, flash
 from flask import redirect, url_for, session, request
 from flask import current_app
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_auth_requests
-from google_auth_oauthlib.flow import Flow
-from google.oauth2.credentials import Credentials
-from sqlalchemy.exc import NoResultFound
+from sqlalchemy.exc import IntegrityError, NoResultFound
 
 from app.challenge import Challenge, Response
 from app.challenge_manager import ChallengeManager
 from app.db import db, AccessLog
+from app.engine import EngineError, EngineBusy, pass_value, pass_value_query
+from app.stats import UserStats, record_response
+from app.leaderboard import WINDOWS
 from app.user import User
+import uuid
 from datetime import datetime
 from app.logger import logger
 
@@ -56,8 +56,8 @@ def google_login():
 
         client_id = current_app.config.get('GOOGLE_CLIENT_ID')
 
-        # Verify the JWT
-        id_info = id_token.verify_oauth2_token(credential, google_auth_requests.Request(), client_id)
+        # Verify the JWT against the cached Google signing certificates
+        id_info = current_app.extensions['google_verifier'].verify(credential, client_id)
 
         email = id_info.get('email')
         if not email:
@@ -80,6 +80,7 @@ def google_login():
             logger.info("Updating existing user's last login time")
             user.last_login = datetime.utcnow()
             db.session.commit()
+            current_app.extensions['user_cache'].invalidate(user.id)
             logger.info("User last login time updated and committed to database")
 
         # Log the login
@@ -125,7 +126,8 @@ def tos():
 def dashboard():
     user_profile = session.get('user_profile', {})
     logger.info(f"Debug - Dashboard User Profile: {user_profile}")  # Debug print
-    return render_template('dashboard.html')
+    stats = UserStats.query.get(current_user.id)  # Single primary-key read, maintained by submit_response
+    return render_template('dashboard.html', stats=stats)
 
 
 @bp.route('/login')
@@ -154,7 +156,7 @@ def play():
         flash(str(e), 'error')
         return redirect(url_for('main.dashboard'))
 
-@bp.route('/problem/<challenge_id>/<int:problem_index>')
+@bp.route('/problem/<uuid:challenge_id>/<int:problem_index>')
 @login_required
 def problem(challenge_id, problem_index):
     challenge = Challenge.query.get_or_404(challenge_id)
@@ -168,27 +170,99 @@ def problem(challenge_id, problem_index):
 @login_required
 def submit_response():
     data = request.get_json()
-    challenge_id = data.get('challenge_id')
+    challenge_id = uuid.UUID(data.get('challenge_id'))
     problem_index = data.get('problem_index')
     user_response = data.get('response')
 
     challenge = Challenge.query.get_or_404(challenge_id)
+    if challenge.user_id != current_user.id:
+        return jsonify({"error": "Not your challenge"}), 403
     problem = challenge.get_problem(problem_index)
-
-    is_correct = user_response == problem.correct_response
+    if problem is None:
+        return jsonify({"error": "No such problem"}), 404
+    is_correct = user_response == problem.correct_response_play
 
     response = Response(
         challenge_id=challenge_id,
         problem_id=problem.id,
-        user_response=user_response,
+        user_response_play=user_response,
+        user_response_tenuki='',
         is_correct=is_correct
     )
     db.session.add(response)
-    db.session.commit()
-
-    # Update the challenge's current problem index
+    # Each problem counts once towards stats and the leaderboard: the unique
+    # constraint turns a repeat, even a concurrent one, into an error here,
+    # before anything is counted
+    try:
+        db.session.flush()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({"error": "Problem already answered"}), 409
+    record_response(current_user.id, problem.id, is_correct)
+    if is_correct:
+        current_app.extensions['leaderboard'].record_correct(current_user.id)
+
+    # Update the challenge's current problem index in the same transaction
     challenge.current_problem_index = problem_index + 1
     db.session.commit()
 
     return jsonify({"success": True})
 
+@bp.route('/leaderboard')
+@login_required
+def leaderboard():
+    window = request.args.get('window', 'all')
+    if window not in WINDOWS:
+        return jsonify({"error": f"window must be one of {', '.join(WINDOWS)}"}), 400
+    count = min(request.args.get('count', 10, type=int), 100)
+
+    board = current_app.extensions['leaderboard']
+    top = board.top(window, count)
+    around_me = board.neighbours(window, current_user.id)
+    user_ids = {entry['user_id'] for entry in top + around_me}
+    names = dict(db.session.query(User.id, User.name).filter(User.id.in_(user_ids))) if user_ids else {}
+    for entry in top + around_me:
+        entry['name'] = names.get(entry['user_id'])
+
+    return jsonify({"window": window, "top": top, "me": board.rank(window, current_user.id), "around_me": around_me})
+
+@bp.route('/evaluate/<uuid:challenge_id>/<int:problem_index>', methods=['POST'])
+@login_required
+def evaluate(challenge_id, problem_index):
+    # Queues the search and returns at once; the page polls evaluation_status
+    engine = current_app.extensions['engine']
+    if not engine.available:
+        return jsonify({"error": "Engine analysis is not available"}), 503
+
+    challenge = Challenge.query.get_or_404(challenge_id)
+    if challenge.user_id != current_user.id:
+        return jsonify({"error": "Not your challenge"}), 403
+    problem = challenge.get_problem(problem_index)
+    if problem is None:
+        return jsonify({"error": "No such problem"}), 404
+
+    try:
+        evaluation_id = engine.submit(pass_value_query(problem.sgf_content), owner=current_user.id)
+    except EngineBusy as e:
+        logger.warning(f"Refusing evaluation: {e}")
+        return jsonify({"error": "The engine is busy, try again shortly"}), 503, {'Retry-After': '5'}
+    except EngineError as e:
+        logger.error(f"Could not queue evaluation: {e}")
+        return jsonify({"error": "Engine analysis is not available"}), 503
+
+    return jsonify({"evaluation_id": evaluation_id,
+                    "status_url": url_for('main.evaluation_status', evaluation_id=evaluation_id)}), 202
+
+@bp.route('/evaluation/<evaluation_id>')
+@login_required
+def evaluation_status(evaluation_id):
+    future = current_app.extensions['engine'].result(evaluation_id, owner=current_user.id)
+    if future is None:
+        return jsonify({"error": "Unknown evaluation"}), 404
+    if not future.done():
+        return jsonify({"status": "pending"})
+    try:
+        return jsonify({"status": "done", **pass_value(future.result())})
+    except EngineError as e:
+        logger.error(f"Evaluation {evaluation_id} failed: {e}")
+        return jsonify({"status": "failed", "error": "Engine analysis failed"}), 502
@@ -0,0 +1,131 @@
+import click
+from datetime import datetime
+from flask.cli import with_appcontext
+from sqlalchemy import case
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db import db, upsert
+from app.challenge import Challenge, Response
+from app.logger import logger
+
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
+    best_streak = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def accuracy(self):
+        return self.correct / self.attempts if self.attempts else 0.0
+
+    def __repr__(self):
+        return f'<UserStats user_id={self.user_id} {self.correct}/{self.attempts} streak={self.current_streak}>'
+
+
+class ProblemStats(db.Model):
+    __tablename__ = 'problem_stats'
+    problem_id = db.Column(UUID(as_uuid=True), db.ForeignKey('problem.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def solve_rate(self):
+        return self.correct / self.attempts if self.attempts else 0.0
+
+    def __repr__(self):
+        return f'<ProblemStats problem_id={self.problem_id} {self.correct}/{self.attempts}>'
+
+
+def record_response(user_id, problem_id, is_correct):
+    """Fold one answer into the aggregate tables.
+
+    Each table gets one INSERT ... ON CONFLICT DO UPDATE with relative
+    increments, so concurrent answers, including two first answers from the
+    same user, can neither lose an increment nor fail on the primary key.  The
+    caller commits, so the aggregates land in the same transaction as the
+    Response row.
+    """
+    hit = 1 if is_correct else 0
+    now = datetime.utcnow()
+
+    insert = upsert(UserStats).values(user_id=user_id, attempts=1, correct=hit,
+                                      current_streak=hit, best_streak=hit, updated_at=now)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_=dict(
+            attempts=UserStats.attempts + 1,
+            correct=UserStats.correct + hit,
+            # SET expressions all see the old row, so best_streak compares against the pre-update streak
+            current_streak=UserStats.current_streak + 1 if is_correct else 0,
+            best_streak=case(
+                (UserStats.current_streak + 1 > UserStats.best_streak, UserStats.current_streak + 1),
+                else_=UserStats.best_streak,
+            ) if is_correct else UserStats.best_streak,
+            updated_at=now,
+        ),
+    ))
+
+    insert = upsert(ProblemStats).values(problem_id=problem_id, attempts=1, correct=hit)
+    db.session.execute(insert.on_conflict_do_update(
+        index_elements=[ProblemStats.problem_id],
+        set_=dict(attempts=ProblemStats.attempts + 1, correct=ProblemStats.correct + hit),
+    ))
+
+
+def rebuild_stats(batch_size=1000):
+    """Recompute both aggregate tables from the full Response history.
+
+    Streams responses in answer order so memory is bounded by the number of
+    users and problems, not the number of answers.
+    """
+    users = {}
+    problems = {}
+
+    query = (
+        db.session.query(Challenge.user_id, Response.problem_id, Response.is_correct, Response.timestamp)
+        .join(Challenge, Response.challenge_id == Challenge.id)
+        .order_by(Response.timestamp, Response.id)
+        .yield_per(batch_size)
+    )
+    for user_id, problem_id, is_correct, timestamp in query:
+        user = users.setdefault(user_id, dict(user_id=user_id, attempts=0, correct=0,
+                                              current_streak=0, best_streak=0, updated_at=timestamp))
+        user['attempts'] += 1
+        user['updated_at'] = timestamp or user['updated_at']
+        if is_correct:
+            user['correct'] += 1
+            user['current_streak'] += 1
+            user['best_streak'] = max(user['best_streak'], user['current_streak'])
+        else:
+            user['current_streak'] = 0
+
+        problem = problems.setdefault(problem_id, dict(problem_id=problem_id, attempts=0, correct=0))
+        problem['attempts'] += 1
+        problem['correct'] += 1 if is_correct else 0
+
+    now = datetime.utcnow()
+    for user in users.values():
+        user['updated_at'] = user['updated_at'] or now
+
+    db.session.query(UserStats).delete()
+    db.session.query(ProblemStats).delete()
+    if users:
+        db.session.bulk_insert_mappings(UserStats, list(users.values()))
+    if problems:
+        db.session.bulk_insert_mappings(ProblemStats, list(problems.values()))
+    db.session.commit()
+
+    logger.info(f"Rebuilt statistics for {len(users)} users and {len(problems)} problems")
+    return len(users), len(problems)
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Backfill user_stats and problem_stats from the response table."""
+    user_count, problem_count = rebuild_stats()
+    click.echo(f"Rebuilt statistics for {user_count} users and {problem_count} problems.")
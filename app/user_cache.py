@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.db import db
+from app.user import User
+
+DEFAULT_TTL = 60          # seconds a cached user is trusted before it is re-read
+DEFAULT_MAX_SIZE = 10000  # users kept, least recently used dropped first
+
+
+class UserCache:
+    """Bounded, short-lived cache of User rows for the Flask-Login user loader.
+
+    Flask-Login loads the user on every authenticated request.  Cached users are
+    kept detached from any session and merged into the current one with
+    ``load=False``, so a hit costs no SQL and the request still gets an ordinary
+    session-bound User.  Anything that changes a user should call
+    ``invalidate``; other processes see the change within the TTL.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = DEFAULT_TTL
+        self.max_size = DEFAULT_MAX_SIZE
+        self._entries = OrderedDict()  # user id -> (expires_at, detached User)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get('USER_CACHE_TTL', DEFAULT_TTL)
+        self.max_size = app.config.get('USER_CACHE_SIZE', DEFAULT_MAX_SIZE)
+        app.extensions['user_cache'] = self
+
+    def get(self, user_id):
+        """The User with ``user_id`` attached to the current session, or None."""
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return db.session.merge(entry[1], load=False)
+            self.misses += 1
+
+        user = db.session.get(User, user_id)
+        if user is None or self.ttl <= 0:
+            return user
+        # Cache a detached copy; the request keeps the instance it loaded
+        db.session.expunge(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(int(user_id), None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
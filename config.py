@@ -18,8 +18,27 @@ class Config:
 
     GOOGLE_CLIENT_ID = os.environ.get('GOOGLE_CLIENT_ID')
     GOOGLE_CLIENT_SECRET = os.environ.get('GOOGLE_CLIENT_SECRET')
+    # Override to point login verification at a local stand-in certificate server
+    GOOGLE_CERTS_URL = os.environ.get('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
 
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'tsumego.db')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    SGF_PROCESSED_DIR = os.path.join(basedir, 'sgf', 'processed')
+
+    # Flask-Login's user loader keeps users in memory this long (0 disables the cache)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    USER_CACHE_SIZE = 10000
+
+    # Seconds an in-memory leaderboard is served before it is reloaded to see other processes' answers
+    LEADERBOARD_REFRESH = int(os.environ.get('LEADERBOARD_REFRESH', 30))
+
+    # KataGo analysis engine for /evaluate, e.g. "katago analysis -model m.bin.gz -config analysis.cfg".
+    # Started on the first evaluation; unset disables engine-backed routes.
+    ENGINE_COMMAND = os.environ.get('ENGINE_COMMAND')
+    ENGINE_MAX_PENDING = int(os.environ.get('ENGINE_MAX_PENDING', 256))  # Further evaluations get a 503
+    ENGINE_RESULT_TTL = 300  # Seconds a finished evaluation waits to be polled
+    ENGINE_INTERACTIVE_MAX_VISITS = int(os.environ.get('ENGINE_INTERACTIVE_MAX_VISITS', 200))
+    ENGINE_BATCH_MAX_IN_FLIGHT = 8
+
 logger.info(f"SQLALCHEMY_DATABASE_URI: {Config.SQLALCHEMY_DATABASE_URI}")
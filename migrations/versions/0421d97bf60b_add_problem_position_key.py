@@ -0,0 +1,34 @@
+"""add problem position key
+
+Revision ID: 0421d97bf60b
+Revises: b169c52b7e8e
+Create Date: 2026-10-19 07:53:18.640271
+
+Run ``flask backfill-position-keys`` afterwards to key existing problems.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0421d97bf60b'
+down_revision = 'b169c52b7e8e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = [column['name'] for column in inspector.get_columns('problem')]
+    indexes = [index['name'] for index in inspector.get_indexes('problem')]
+    with op.batch_alter_table('problem', schema=None) as batch_op:
+        if 'position_key' not in columns:
+            batch_op.add_column(sa.Column('position_key', sa.String(length=16), nullable=True))
+        if 'ix_problem_position_key' not in indexes:
+            batch_op.create_index(batch_op.f('ix_problem_position_key'), ['position_key'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('problem', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_problem_position_key'))
+        batch_op.drop_column('position_key')
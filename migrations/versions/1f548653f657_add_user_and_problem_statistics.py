@@ -0,0 +1,46 @@
+"""add user and problem statistics
+
+Revision ID: 1f548653f657
+Revises: 8974712e4f36
+Create Date: 2026-10-19 07:40:12.204518
+
+Run ``flask rebuild-stats`` afterwards to fill the tables from past responses.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f548653f657'
+down_revision = '8974712e4f36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skipped where db.create_all() already made them
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'user_stats' not in existing:
+        op.create_table('user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.Column('current_streak', sa.Integer(), nullable=False),
+        sa.Column('best_streak', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+    if 'problem_stats' not in existing:
+        op.create_table('problem_stats',
+        sa.Column('problem_id', sa.UUID(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('correct', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['problem_id'], ['problem.id'], ),
+        sa.PrimaryKeyConstraint('problem_id')
+        )
+
+
+def downgrade():
+    op.drop_table('problem_stats')
+    op.drop_table('user_stats')
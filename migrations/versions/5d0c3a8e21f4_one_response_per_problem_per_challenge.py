@@ -0,0 +1,35 @@
+"""one response per problem per challenge
+
+Revision ID: 5d0c3a8e21f4
+Revises: 9eef13d11e3b
+Create Date: 2026-10-19 09:04:52.173306
+
+Repeat answers recorded before this revision are deleted, keeping the first.
+They were counted in the aggregates, so run ``flask rebuild-stats``,
+``flask rebuild-leaderboard`` and ``flask calibrate-ratings --full`` afterwards.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d0c3a8e21f4'
+down_revision = '9eef13d11e3b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skipped where db.create_all() already made it
+    constraints = [constraint['name'] for constraint in sa.inspect(op.get_bind()).get_unique_constraints('response')]
+    if 'uq_response_challenge_problem' in constraints:
+        return
+    op.execute("DELETE FROM response WHERE id NOT IN "
+               "(SELECT MIN(id) FROM response GROUP BY challenge_id, problem_id)")
+    with op.batch_alter_table('response', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_response_challenge_problem', ['challenge_id', 'problem_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('response', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_response_challenge_problem', type_='unique')
@@ -0,0 +1,85 @@
+"""baseline schema
+
+Revision ID: 8974712e4f36
+Revises: 
+Create Date: 2026-10-19 07:23:31.519173
+
+Databases created by db.create_all() before migrations existed already have
+these tables; upgrading one creates only what is missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8974712e4f36'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'problem' not in existing:
+        op.create_table('problem',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('hash', sa.String(length=64), nullable=False),
+        sa.Column('problem_type', sa.String(length=50), nullable=False),
+        sa.Column('board_image', sa.String(length=256), nullable=False),
+        sa.Column('color_to_move', sa.String(length=10), nullable=False),
+        sa.Column('correct_response_play', sa.String(length=20), nullable=False),
+        sa.Column('correct_response_tenuki', sa.String(length=20), nullable=False),
+        sa.Column('sgf_content', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hash')
+        )
+    if 'user' not in existing:
+        op.create_table('user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=150), nullable=False),
+        sa.Column('name', sa.String(length=150), nullable=True),
+        sa.Column('profile_pic', sa.String(length=200), nullable=True),
+        sa.Column('last_login', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+    if 'access_log' not in existing:
+        op.create_table('access_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('access_time', sa.DateTime(), nullable=False),
+        sa.Column('page', sa.String(length=120), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'challenge' not in existing:
+        op.create_table('challenge',
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('problems', sa.PickleType(), nullable=False),
+        sa.Column('current_problem_index', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if 'response' not in existing:
+        op.create_table('response',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('challenge_id', sa.UUID(), nullable=False),
+        sa.Column('problem_id', sa.UUID(), nullable=False),
+        sa.Column('user_response_play', sa.String(length=20), nullable=False),
+        sa.Column('user_response_tenuki', sa.String(length=20), nullable=False),
+        sa.Column('is_correct', sa.Boolean(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['challenge_id'], ['challenge.id'], ),
+        sa.ForeignKeyConstraint(['problem_id'], ['problem.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('response')
+    op.drop_table('challenge')
+    op.drop_table('access_log')
+    op.drop_table('user')
+    op.drop_table('problem')
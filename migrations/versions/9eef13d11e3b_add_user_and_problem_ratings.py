@@ -0,0 +1,60 @@
+"""add user and problem ratings
+
+Revision ID: 9eef13d11e3b
+Revises: c74e90eba17d
+Create Date: 2026-10-19 08:31:07.514862
+
+Run ``flask calibrate-ratings --full`` afterwards to rate past responses.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9eef13d11e3b'
+down_revision = 'c74e90eba17d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skipped where db.create_all() already made them
+    existing = sa.inspect(op.get_bind()).get_table_names()
+    if 'user_rating' not in existing:
+        op.create_table('user_rating',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('ability', sa.Float(), nullable=False),
+        sa.Column('information', sa.Float(), nullable=False),
+        sa.Column('responses', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+        )
+    if 'problem_rating' not in existing:
+        op.create_table('problem_rating',
+        sa.Column('problem_id', sa.UUID(), nullable=False),
+        sa.Column('difficulty', sa.Float(), nullable=False),
+        sa.Column('information', sa.Float(), nullable=False),
+        sa.Column('responses', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['problem_id'], ['problem.id'], ),
+        sa.PrimaryKeyConstraint('problem_id')
+        )
+        with op.batch_alter_table('problem_rating', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_problem_rating_difficulty'), ['difficulty'], unique=False)
+    if 'calibration_run' not in existing:
+        op.create_table('calibration_run',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('last_response_id', sa.Integer(), nullable=False),
+        sa.Column('responses', sa.Integer(), nullable=False),
+        sa.Column('full', sa.Boolean(), nullable=False),
+        sa.Column('finished_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('calibration_run')
+    with op.batch_alter_table('problem_rating', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_problem_rating_difficulty'))
+
+    op.drop_table('problem_rating')
+    op.drop_table('user_rating')
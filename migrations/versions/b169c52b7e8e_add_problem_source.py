@@ -0,0 +1,28 @@
+"""add problem source
+
+Revision ID: b169c52b7e8e
+Revises: 1f548653f657
+Create Date: 2026-10-19 07:52:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b169c52b7e8e'
+down_revision = '1f548653f657'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = [column['name'] for column in sa.inspect(op.get_bind()).get_columns('problem')]
+    if 'source' not in columns:
+        with op.batch_alter_table('problem', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('source', sa.String(length=256), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('problem', schema=None) as batch_op:
+        batch_op.drop_column('source')
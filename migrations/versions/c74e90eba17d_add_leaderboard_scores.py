@@ -0,0 +1,46 @@
+"""add leaderboard scores
+
+Revision ID: c74e90eba17d
+Revises: 0421d97bf60b
+Create Date: 2026-10-19 08:12:41.381950
+
+Run ``flask rebuild-leaderboard`` afterwards to fill the table from past responses.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c74e90eba17d'
+down_revision = '0421d97bf60b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Skipped where db.create_all() already made it
+    inspector = sa.inspect(op.get_bind())
+    if 'leaderboard_score' not in inspector.get_table_names():
+        op.create_table('leaderboard_score',
+        sa.Column('window', sa.String(length=10), nullable=False),
+        sa.Column('period_start', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Integer(), nullable=False),
+        sa.Column('reached_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('window', 'period_start', 'user_id')
+        )
+        indexes = []
+    else:
+        indexes = [index['name'] for index in inspector.get_indexes('leaderboard_score')]
+    if 'ix_leaderboard_score_ranking' not in indexes:
+        with op.batch_alter_table('leaderboard_score', schema=None) as batch_op:
+            batch_op.create_index('ix_leaderboard_score_ranking', ['window', 'period_start', 'score', 'reached_at'],
+                                  unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leaderboard_score', schema=None) as batch_op:
+        batch_op.drop_index('ix_leaderboard_score_ranking')
+
+    op.drop_table('leaderboard_score')
@@ -1,6 +1,6 @@
-from app.flask_app import create_app
+from app.flask_app import get_app
 
-app = create_app()
+app = get_app()
 
 if __name__ == '__main__':
     app.run(debug=True)
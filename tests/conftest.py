@@ -0,0 +1,54 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db import db  # noqa: E402
+from app.flask_app import create_app  # noqa: E402
+from app.problem import Problem  # noqa: E402
+from app.user import User  # noqa: E402
+from config import Config  # noqa: E402
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        SGF_PROCESSED_DIR = str(tmp_path / 'sgf')
+        USER_CACHE_TTL = 0
+        LEADERBOARD_REFRESH = 3600
+        ENGINE_COMMAND = None
+
+    app = create_app(TestConfig)
+    app.extensions['leaderboard'].clear()
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+def make_user(email='player@example.invalid'):
+    user = User(email=email, name=email.split('@')[0])
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def make_problem(index=0, answer='YES'):
+    sgf_content = f"(;FF[4]GM[1]SZ[19]PL[B]C[Can B kill? Correct answer: {answer}]AB[aa]AW[ba]SO[test:{index}])"
+    problem = Problem(problem_type='kill', board_image=f"test_{index}.sgf", color_to_move='b',
+                      correct_response_play=answer, correct_response_tenuki='NO' if answer == 'YES' else 'YES',
+                      sgf_content=sgf_content)
+    db.session.add(problem)
+    db.session.commit()
+    return problem
+
+
+def logged_in_client(app, user):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)  # What login_user() stores; skips the Google flow
+        session['_fresh'] = True
+    return client
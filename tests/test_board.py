@@ -0,0 +1,92 @@
+import random
+
+import pytest
+from sgfmill import boards
+
+from app.board import BLACK, WHITE, GoBoard, IllegalMove
+from app.position_hash import position_key
+
+
+def assert_consistent(board):
+    """The incremental bookkeeping matches a board set up from scratch with the same stones."""
+    fresh = GoBoard(board.side)
+    fresh.setup(*board.stone_lists())
+    assert board.hash == fresh.hash
+    # The incrementally kept hasher gives the same key as hashing the stones from scratch
+    for to_move in 'bw':
+        assert board.position_key(to_move) == position_key(board.side, *board.stone_lists(), to_move, board.ko_point())
+    stones = [p for p, code in enumerate(board.color) if code in (BLACK, WHITE)]
+    assert sorted(s for members in board.stones.values() for s in members) == stones
+    assert set(board.stones) == set(board.libs)
+    for p in stones:
+        rep = board.group[p]
+        assert p in board.stones[rep]
+        assert board.libs[rep] == fresh.libs[fresh.group[p]]
+        assert sorted(board.stones[rep]) == sorted(fresh.stones[fresh.group[p]])
+
+
+def test_undo_after_recapture_keeps_unrelated_groups():
+    board = GoBoard(5)
+    moves = [((0, 4), 'w'), ((2, 3), 'b'), ((0, 3), 'b'), ((1, 4), 'b'), ((1, 3), 'b'), ((0, 4), 'b'), ((2, 4), 'b')]
+    for (row, col), color in moves:
+        board.play(row, col, color)
+    while board._undo:
+        board.undo()
+        assert_consistent(board)
+        for row in range(5):
+            for col in range(5):
+                board.liberties(row, col)
+    assert board.list_stones() == []
+
+
+def _replay(size, played):
+    reference = boards.Board(size)
+    for row, col, color in played:
+        reference.play(row, col, color)
+    return sorted(reference.list_occupied_points())
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_random_play_then_undo_matches_sgfmill(seed):
+    rng = random.Random(seed)
+    size = rng.choice((4, 5, 7))
+    board = GoBoard(size)
+    played = []  # Moves on the board now, to replay through sgfmill
+
+    for _ in range(60):
+        if played and rng.random() < 0.05:
+            board.undo()
+            played.pop()
+        else:
+            row, col, color = rng.randrange(size), rng.randrange(size), rng.choice('bw')
+            try:
+                board.play(row, col, color)
+            except IllegalMove:
+                continue
+            played.append((row, col, color))
+        assert_consistent(board)
+    assert sorted(board.list_stones()) == _replay(size, played)
+
+    # Taking everything back exercises undo across many captures and recaptures
+    while played:
+        board.undo()
+        played.pop()
+        assert_consistent(board)
+        assert sorted(board.list_stones()) == _replay(size, played)
+
+
+def test_copy_and_restore_keep_the_position_key():
+    board = GoBoard(9)
+    for row, col, color in [(2, 2, 'b'), (6, 6, 'w'), (2, 6, 'b')]:
+        board.play(row, col, color)
+    copy = board.copy()
+    state = board.snapshot()
+    key = board.position_key('w')
+
+    board.play(4, 4, 'w')
+    copy.play(5, 5, 'w')
+    assert copy.position_key('w') != key
+    board.restore(state)
+    assert board.position_key('w') == key
+    assert_consistent(board)
+    assert_consistent(copy)
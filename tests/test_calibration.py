@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from app.calibration import PRIOR_INFORMATION, fit_ratings  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_fit_ratings_orders_users_and_problems():
+    # User 0 solves everything, user 1 only the easy problem 0
+    users = np.array([0, 0, 1, 1, 0, 1], dtype=np.intp)
+    problems = np.array([0, 1, 0, 1, 1, 0], dtype=np.intp)
+    correct = np.array([True, True, True, False, True, True])
+    prior = np.full(2, PRIOR_INFORMATION)
+
+    ability, user_information, difficulty, _ = fit_ratings(users, problems, correct, np.zeros(2), prior,
+                                                           np.zeros(2), prior)
+
+    assert ability[0] > ability[1]
+    assert difficulty[1] > difficulty[0]
+    assert (user_information > prior).all()
+
+
+def test_web_app_does_not_import_numpy():
+    code = "import sys; import app.flask_app; sys.exit('numpy' in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code], cwd=ROOT).returncode == 0
@@ -0,0 +1,54 @@
+from concurrent.futures import Future
+
+import pytest
+
+from app.challenge import Challenge
+from app.db import db
+from app.engine import EngineError, pass_value
+
+from conftest import logged_in_client, make_problem, make_user
+
+
+def _reply(player='B', score=3.5):
+    return {'rootInfo': {'currentPlayer': player, 'scoreLead': score, 'visits': 100}}
+
+
+def test_pass_value_from_the_player_to_move():
+    assert pass_value([_reply('W', -2.0), _reply('W', 4.0)])['points'] == 6.0
+
+
+@pytest.mark.parametrize('replies', [[_reply(), {'error': 'bad query'}], [_reply()], None])
+def test_pass_value_rejects_malformed_replies(replies):
+    with pytest.raises(EngineError):
+        pass_value(replies)
+
+
+def _challenge(user):
+    challenge = Challenge(user.id, [make_problem().id])
+    db.session.add(challenge)
+    db.session.commit()
+    return challenge
+
+
+def test_evaluate_without_an_engine_binary(app):
+    engine = app.extensions['engine']
+    engine.command = ['/nonexistent/katago', 'analysis']
+    user = make_user()
+    challenge = _challenge(user)
+
+    response = logged_in_client(app, user).post(f"/evaluate/{challenge.id}/0")
+
+    assert response.status_code == 503
+
+
+def test_evaluation_status_with_a_malformed_reply(app, monkeypatch):
+    engine = app.extensions['engine']
+    future = Future()
+    future.set_result([_reply(), {'id': 'x', 'error': 'Could not parse'}])
+    user = make_user()
+    monkeypatch.setattr(engine, 'result', lambda evaluation_id, owner=None: future)
+
+    response = logged_in_client(app, user).get("/evaluation/abc")
+
+    assert response.status_code == 502
+    assert response.get_json()['status'] == 'failed'
@@ -0,0 +1,38 @@
+import gzip
+import json
+
+from app.challenge import Challenge, Response
+from app.db import AccessLog, db
+from app.export import WATERMARK_FILE, export_history
+
+from conftest import make_problem, make_user
+
+
+def _lines(path):
+    with gzip.open(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_full_export_of_one_table_keeps_the_other_watermarks(app, tmp_path):
+    user = make_user()
+    problem = make_problem()
+    challenge = Challenge(user.id, [problem.id])
+    db.session.add(challenge)
+    db.session.add(Response(challenge_id=challenge.id, problem_id=problem.id, user_response_play='YES',
+                            user_response_tenuki='NO', is_correct=True))
+    db.session.add_all([AccessLog(user_id=user.id, page='/'), AccessLog(user_id=user.id, page='/leaderboard')])
+    db.session.commit()
+    output_dir = str(tmp_path / 'export')
+
+    export_history(output_dir, file_format='jsonl')
+    results = export_history(output_dir, tables=('responses',), file_format='jsonl', full=True)
+    assert results['responses'][1] == 1
+
+    with open(tmp_path / 'export' / WATERMARK_FILE) as f:
+        assert set(json.load(f)) == {'responses', 'access_log'}
+
+    db.session.add(AccessLog(user_id=user.id, page='/stats'))
+    db.session.commit()
+    path, count = export_history(output_dir, tables=('access_log',), file_format='jsonl')['access_log']
+    assert count == 1
+    assert [row['page'] for row in _lines(path)] == ['/stats']
@@ -0,0 +1,161 @@
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+pytest.importorskip('google.auth')
+pytest.importorskip('cryptography')
+
+from cryptography import x509  # noqa: E402
+from cryptography.hazmat.primitives import hashes, serialization  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import rsa  # noqa: E402
+from cryptography.x509.oid import NameOID  # noqa: E402
+from google.auth import crypt, exceptions, jwt  # noqa: E402
+
+from app import google_verifier  # noqa: E402
+from app.google_verifier import GoogleTokenVerifier  # noqa: E402
+
+AUDIENCE = 'test-client-id.apps.googleusercontent.com'
+
+
+def _key_and_cert():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'test')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1)).sign(key, hashes.SHA256()))
+    key_pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                serialization.NoEncryption()).decode()
+    return key_pem, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+
+class CertServer:
+    """A stand-in for Google's certificate endpoint, serving whatever ``certs`` holds."""
+
+    def __init__(self):
+        self.certs = {}
+        self.requests = 0
+        self.delay = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.delay)
+                body = json.dumps(server.certs).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Cache-Control', 'public, max-age=3600')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/oauth2/v1/certs"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def add_key(self, key_id):
+        key_pem, cert_pem = _key_and_cert()
+        self.certs[key_id] = cert_pem
+        return crypt.RSASigner.from_string(key_pem, key_id=key_id)
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def cert_server():
+    server = CertServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def verifier(cert_server):
+    verifier = GoogleTokenVerifier()
+    verifier.certs_url = cert_server.url
+    yield verifier
+    verifier.close()
+
+
+def _token(signer, audience=AUDIENCE, issuer='https://accounts.google.com'):
+    now = int(time.time())
+    claims = {'iss': issuer, 'aud': audience, 'sub': '1234', 'email': 'player@example.invalid',
+              'iat': now, 'exp': now + 600}
+    return jwt.encode(signer, claims)
+
+
+def test_verify_fetches_certificates_once(cert_server, verifier):
+    signer = cert_server.add_key('key-1')
+
+    for _ in range(3):
+        assert verifier.verify(_token(signer), AUDIENCE)['email'] == 'player@example.invalid'
+    assert cert_server.requests == 1
+
+
+def test_verify_rejects_wrong_audience_and_issuer(cert_server, verifier):
+    signer = cert_server.add_key('key-1')
+
+    with pytest.raises(ValueError):
+        verifier.verify(_token(signer, audience='someone-else'), AUDIENCE)
+    with pytest.raises(exceptions.GoogleAuthError):
+        verifier.verify(_token(signer, issuer='https://evil.example'), AUDIENCE)
+
+
+def test_verify_refetches_after_key_rotation(cert_server, verifier, monkeypatch):
+    verifier.verify(_token(cert_server.add_key('key-1')), AUDIENCE)
+    rotated = cert_server.add_key('key-2')
+
+    # A token signed with a key we have not seen is only refetched for once per MIN_FORCED_REFRESH
+    with pytest.raises(ValueError):
+        verifier.verify(_token(rotated), AUDIENCE)
+    assert cert_server.requests == 1
+
+    monkeypatch.setattr(google_verifier, 'MIN_FORCED_REFRESH', 0)
+    assert verifier.verify(_token(rotated), AUDIENCE)['sub'] == '1234'
+    assert cert_server.requests == 2
+
+
+def _verify_concurrently(verifier, token, count=8):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(verifier.verify(token, AUDIENCE)['sub']))
+               for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_logins_racing_an_expired_cache_fetch_once(cert_server, verifier):
+    signer = cert_server.add_key('key-1')
+    verifier.verify(_token(signer), AUDIENCE)
+    verifier._expires_at = 0.0
+    cert_server.delay = 0.2
+
+    assert _verify_concurrently(verifier, _token(signer)) == ['1234'] * 8
+    assert cert_server.requests == 2
+
+
+def test_logins_racing_a_key_rotation_refetch_once(cert_server, verifier, monkeypatch):
+    verifier.verify(_token(cert_server.add_key('key-1')), AUDIENCE)
+    rotated = cert_server.add_key('key-2')
+    monkeypatch.setattr(google_verifier, 'MIN_FORCED_REFRESH', 0)
+    cert_server.delay = 0.2
+
+    assert _verify_concurrently(verifier, _token(rotated)) == ['1234'] * 8
+    assert cert_server.requests == 2
+
+
+def test_cache_control_max_age():
+    assert GoogleTokenVerifier._max_age('public, max-age=19427, must-revalidate') == 19427
+    assert GoogleTokenVerifier._max_age('no-cache') == google_verifier.DEFAULT_CERT_TTL
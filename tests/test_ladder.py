@@ -0,0 +1,76 @@
+import pytest
+
+from app.board import GoBoard
+from app.ladder import LadderReader, ladder_candidates
+
+# A white stone with two liberties, black to atari it; the ladder can run towards either far corner
+LADDER = [(9, 9, 'w'), (8, 9, 'b'), (9, 8, 'b'), (10, 10, 'b')]
+
+
+def _snapshot(board):
+    return board.hash, {group: set(libs) for group, libs in board.libs.items()}, list(board.color)
+
+
+def _board(stones):
+    board = GoBoard(19)
+    for row, col, color in stones:
+        board.play(row, col, color)
+    return board
+
+
+def test_ladder_works_on_an_empty_board_and_leaves_it_unchanged():
+    board = _board(LADDER)
+    before = _snapshot(board)
+
+    ladder = LadderReader().read(board, (9, 9))
+
+    assert ladder.captured is True
+    assert ladder.plies > 20
+    assert _snapshot(board) == before
+
+
+def test_breakers_on_both_diagonals_let_the_group_escape():
+    assert LadderReader().read(_board(LADDER + [(5, 13, 'w')]), (9, 9)).captured is True
+    assert LadderReader().read(_board(LADDER + [(5, 13, 'w'), (13, 5, 'w')]), (9, 9)).captured is False
+
+
+def test_repeated_read_is_answered_from_the_cache():
+    reader = LadderReader()
+    board = _board(LADDER)
+    first = reader.read(board, (9, 9))
+
+    board.play(0, 18, 'w')  # Outside the ladder's path, but a different position
+    board.undo()
+    second = reader.read(board, (9, 9))
+
+    assert second.captured == first.captured and second.plies == first.plies
+    assert second.nodes < first.nodes
+    assert reader.hits
+
+
+def test_move_elsewhere_is_read_afresh():
+    # The memo is keyed on the whole position, so a later breaker is never answered from a stale entry
+    reader = LadderReader()
+    board = _board(LADDER + [(5, 13, 'w')])
+    assert reader.read(board, (9, 9)).captured is True
+
+    board.play(0, 18, 'b')
+    # Same work as a reader with an empty memo
+    assert reader.read(board, (9, 9)) == LadderReader().read(board, (9, 9))
+
+    board.play(13, 5, 'w')
+    assert reader.read(board, (9, 9)).captured is False
+
+
+def test_node_budget_gives_an_unknown_result():
+    assert LadderReader(max_nodes=5).read(_board(LADDER), (9, 9)).captured is None
+
+
+def test_read_needs_a_stone():
+    with pytest.raises(ValueError):
+        LadderReader().read(_board(LADDER), (0, 0))
+
+
+def test_ladder_candidates():
+    assert ladder_candidates(_board(LADDER), 'b') == [(9, 9)]
+    assert ladder_candidates(_board(LADDER), 'w') == []
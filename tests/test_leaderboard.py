@@ -0,0 +1,56 @@
+from datetime import datetime
+
+from app.db import db
+from app.leaderboard import LeaderboardScore, period_start
+
+from conftest import make_user
+
+MONDAY = datetime(2026, 10, 19, 9, 30)
+
+
+def test_period_start():
+    sunday = datetime(2026, 10, 25, 23, 59)
+    assert period_start('daily', sunday).isoformat() == '2026-10-25'
+    assert period_start('weekly', sunday) == MONDAY.date()
+
+
+def test_record_correct_upserts_within_one_transaction(app):
+    board = app.extensions['leaderboard']
+    user = make_user()
+
+    board.record_correct(user.id, MONDAY)
+    board.record_correct(user.id, MONDAY)
+    db.session.commit()
+
+    scores = {row.window: row.score for row in LeaderboardScore.query.filter_by(user_id=user.id)}
+    assert scores == {'daily': 2, 'weekly': 2, 'all': 2}
+
+
+def test_ranking_only_sees_committed_answers(app):
+    board = app.extensions['leaderboard']
+    alice, bob = make_user('alice@example.invalid'), make_user('bob@example.invalid')
+    board.record_correct(alice.id, MONDAY)
+    db.session.commit()
+    assert board.top('all', when=MONDAY) == [{'rank': 1, 'user_id': alice.id, 'score': 1}]
+
+    board.record_correct(bob.id, MONDAY)
+    board.record_correct(bob.id, MONDAY)
+    db.session.rollback()
+    assert board.rank('all', bob.id, when=MONDAY) is None
+
+    board.record_correct(bob.id, MONDAY)
+    db.session.commit()
+    board.record_correct(bob.id, MONDAY)
+    db.session.commit()
+    assert [entry['user_id'] for entry in board.top('all', when=MONDAY)] == [bob.id, alice.id]
+    assert board.rank('all', alice.id, when=MONDAY) == {'rank': 2, 'user_id': alice.id, 'score': 1}
+
+
+def test_earlier_score_wins_a_tie(app):
+    board = app.extensions['leaderboard']
+    alice, bob = make_user('alice@example.invalid'), make_user('bob@example.invalid')
+    board.record_correct(bob.id, MONDAY)
+    board.record_correct(alice.id, MONDAY.replace(minute=31))
+    db.session.commit()
+
+    assert [entry['user_id'] for entry in board.neighbours('daily', alice.id, when=MONDAY)] == [bob.id, alice.id]
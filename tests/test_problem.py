@@ -0,0 +1,18 @@
+from app.db import db
+from app.problem import Problem, backfill_position_keys
+
+from conftest import make_problem
+
+
+def test_backfill_skips_unparseable_rows(app):
+    good = [make_problem(index) for index in range(3)]
+    broken = Problem(problem_type='kill', board_image='broken.sgf', color_to_move='b', correct_response_play='YES',
+                     correct_response_tenuki='NO', sgf_content='not an sgf')
+    db.session.add(broken)
+    db.session.commit()
+
+    updated, failed, _ = backfill_position_keys(batch_size=1)
+
+    assert (updated, failed) == (3, 1)
+    assert all(db.session.get(Problem, problem.id).position_key for problem in good)
+    assert db.session.get(Problem, broken.id).position_key is None
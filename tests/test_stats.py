@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.challenge import Challenge, Response
+from app.db import db
+from app.stats import ProblemStats, UserStats, record_response
+
+from conftest import logged_in_client, make_problem, make_user
+
+
+def test_record_response_inserts_then_increments(app):
+    user = make_user()
+    problem = make_problem()
+
+    for is_correct in (True, True, False, True):
+        record_response(user.id, problem.id, is_correct)
+        db.session.commit()
+
+    stats = db.session.get(UserStats, user.id)
+    assert (stats.attempts, stats.correct, stats.current_streak, stats.best_streak) == (4, 3, 1, 2)
+    problem_stats = db.session.get(ProblemStats, problem.id)
+    assert (problem_stats.attempts, problem_stats.correct) == (4, 3)
+
+
+def test_record_response_first_answers_in_one_transaction(app):
+    # Two first answers before any commit: the second must update, not insert again
+    user = make_user()
+    problem = make_problem()
+    record_response(user.id, problem.id, True)
+    record_response(user.id, problem.id, True)
+    db.session.commit()
+
+    assert db.session.get(UserStats, user.id).attempts == 2
+    assert db.session.get(ProblemStats, problem.id).correct == 2
+
+
+def _challenge(user, problems):
+    challenge = Challenge(user.id, [problem.id for problem in problems])
+    db.session.add(challenge)
+    db.session.commit()
+    return challenge
+
+
+def test_submit_response_counts_each_problem_once(app):
+    user = make_user()
+    challenge = _challenge(user, [make_problem(0), make_problem(1)])
+    client = logged_in_client(app, user)
+    answer = {'challenge_id': str(challenge.id), 'problem_index': 0, 'response': 'YES'}
+
+    assert client.post('/submit_response', json=answer).status_code == 200
+    assert client.post('/submit_response', json=answer).status_code == 409
+    assert db.session.get(UserStats, user.id).correct == 1
+    assert app.extensions['leaderboard'].rank('all', user.id)['score'] == 1
+
+
+def test_response_is_unique_per_challenge_and_problem(app):
+    # What a second, concurrent submission runs into after both passed every check
+    user = make_user()
+    problem = make_problem()
+    challenge = _challenge(user, [problem])
+    for _ in range(2):
+        db.session.add(Response(challenge_id=challenge.id, problem_id=problem.id, user_response_play='YES',
+                                user_response_tenuki='', is_correct=True))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+
+
+def test_submit_response_rejects_other_users_challenge(app):
+    owner, other = make_user('owner@example.invalid'), make_user('other@example.invalid')
+    challenge = _challenge(owner, [make_problem(0)])
+    client = logged_in_client(app, other)
+
+    response = client.post('/submit_response', json={'challenge_id': str(challenge.id), 'problem_index': 0,
+                                                     'response': 'YES'})
+    assert response.status_code == 403
+    assert db.session.get(UserStats, other.id) is None